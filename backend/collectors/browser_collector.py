@@ -1,30 +1,244 @@
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from threading import Lock
 from time import time
+from typing import Iterable, Optional, Sequence, Set, Tuple
 
-@dataclass
+import numpy as np
+
+from context_engine.symbols import symbols
+from features.rolling import EventTimes
+
+# Per-tab browser state
+# ----------------------
+# The extension POSTs once a second for the active tab: its domain / title,
+# the times of the scroll / key events since its last POST (content.js
+# drains them), the tab switches since then, closed tabs, and which tabs
+# are audible. Per tab id the collector keeps a TabState: bounded event
+# rings (EVENT_CAPACITY events, HISTORY_SEC seconds), so a tab switch
+# neither resets nor mixes the history the way cumulative counters did.
+# POSTs without event times (older extension, runtime.loadtest) fall back
+# to the counter deltas spread evenly since the tab's last update; a new
+# page in the tab (or a first POST) only sets the counters' baseline, so a
+# switch between pages never reads as a burst of events.
+#
+# Tabs are kept in LRU order (active and audible tabs are touched on every
+# POST): closed tabs are dropped when reported, tabs unseen for STALE_SEC
+# and the least recently seen beyond MAX_TABS are evicted. Switching the
+# active tab is a dict lookup and a pointer swap.
+#
+# Between ticks the collector also accumulates tab switches, the scroll /
+# key events received, and seconds with audio playing in a tab other than
+# the active one (or in any tab), read by the tick loop with
+# activity_and_reset(). The raw archive keeps the per-tick event counts and
+# tab id, which is what SessionPipeline replays.
+
+EVENT_CAPACITY = 1024
+HISTORY_SEC = 120.0
+MAX_TABS = 16
+STALE_SEC = 600.0
+# without a POST for this long the extension (browser) is gone: its last
+# audio state stops counting
+POST_STALE_SEC = 5.0
+
+_EMPTY = np.zeros(0, dtype=np.float64)
+_EMPTY.flags.writeable = False
+
+
+@dataclass(slots=True)
 class BrowserSnapshot:
     domain: str = ""
     title: str = ""
     scroll_count: int = 0
     key_count: int = 0
     ts: float = 0.0
+    # context_engine.symbols ids of domain (as sent) / title
+    domain_id: int = 0
+    title_id: int = 0
+    tab_id: int = 0
+    # event times (seconds, oldest first) of the tab, read-only copies
+    scroll_ts: np.ndarray = field(default_factory=lambda: _EMPTY)
+    key_ts: np.ndarray = field(default_factory=lambda: _EMPTY)
+
+
+def _frozen(a: np.ndarray) -> np.ndarray:
+    a = a.copy()
+    a.flags.writeable = False
+    return a
+
+
+@dataclass(slots=True)
+class TabActivity:
+    tab_switches: int = 0
+    scroll_events: int = 0
+    key_events: int = 0
+    audible_sec: float = 0.0              # some tab playing audio
+    background_audible_sec: float = 0.0   # a tab other than the active one
+
+
+class TabState:
+    """Scroll / key event times of one tab and when it was last seen."""
+
+    def __init__(self, capacity: int = EVENT_CAPACITY, horizon: float = HISTORY_SEC):
+        self.scroll = EventTimes(capacity, horizon)
+        self.keys = EventTimes(capacity, horizon)
+        self.last_update: Optional[float] = None
+        self.last_seen = 0.0
+        self._counts = (0, 0)
+        self._page: Optional[int] = None
+
+    def add_events(self, scroll_ts: Sequence[float], key_ts: Sequence[float], now: float):
+        self.scroll.extend(scroll_ts, now)
+        self.keys.extend(key_ts, now)
+        self.last_update = now
+
+    def add_event_counts(self, scrolls: int, keys: int, since: float, now: float):
+        """Events known only by count, spread evenly over (since, now]."""
+        since = max(since, now - HISTORY_SEC)
+        self.add_events(_spread(scrolls, since, now), _spread(keys, since, now), now)
+
+    def add_counts(self, scroll_count: int, key_count: int, now: float, page: int = 0) -> Tuple[int, int]:
+        """
+        Cumulative counters of the page `page` (its domain's symbol id) →
+        events since the last update. Returns the (scroll, key) events added.
+        """
+        prev_scroll, prev_keys = self._counts
+        self._counts = (scroll_count, key_count)
+        if page != self._page:
+            # first sight of this page: its counters ran before we saw it
+            self._page = page
+            self.last_update = now
+            return 0, 0
+        # a counter below its last value restarted from 0 (page reload)
+        dscroll = scroll_count - prev_scroll if scroll_count >= prev_scroll else scroll_count
+        dkeys = key_count - prev_keys if key_count >= prev_keys else key_count
+        self.add_event_counts(dscroll, dkeys, self.last_update, now)
+        return dscroll, dkeys
+
+    def snapshot_arrays(self):
+        return _frozen(self.scroll.values()), _frozen(self.keys.values())
+
+
+def _spread(n: int, start: float, end: float) -> np.ndarray:
+    if n <= 0:
+        return _EMPTY
+    return np.linspace(start, end, n + 1)[1:]
+
 
 class BrowserCollector:
     def __init__(self):
         self._lock = Lock()
         self._snap = BrowserSnapshot()
+        self._tabs: "OrderedDict[int, TabState]" = OrderedDict()
+        self._active_id: Optional[int] = None
+        self._audible: Set[int] = set()
 
-    def update(self, domain: str, title: str, scroll_count: int, key_count: int):
+        self._activity = TabActivity()
+        self._last_post = 0.0
+        self._accounted_at = time()
+
+    def update(
+        self,
+        domain: str,
+        title: str,
+        scroll_count: int,
+        key_count: int,
+        tab_id: int = 0,
+        scroll_ts: Optional[Sequence[float]] = None,
+        key_ts: Optional[Sequence[float]] = None,
+        tab_switches: Optional[int] = None,
+        closed_tabs: Iterable[int] = (),
+        audible_tabs: Iterable[int] = (),
+    ):
+        domain_id = symbols.intern(domain or "")
+        title_id = symbols.intern(title or "")
+        scroll_count = int(scroll_count or 0)
+        key_count = int(key_count or 0)
+        now = time()
         with self._lock:
+            self._account(now)
+            self._last_post = now
+
+            # older extensions don't count switches: a new active id is one
+            switched = self._active_id is not None and tab_id != self._active_id
+            self._activity.tab_switches += max(tab_switches or 0, int(switched))
+
+            for closed in closed_tabs:
+                self._tabs.pop(closed, None)
+            self._audible = {t for t in audible_tabs if t is not None}
+            for audible in self._audible:
+                self._touch(audible, now)
+
+            tab = self._touch(tab_id, now)
+            self._active_id = tab_id
+            self._evict(now)
+
+            if scroll_ts is None and key_ts is None:
+                scrolls, keys = tab.add_counts(scroll_count, key_count, now, page=domain_id)
+            else:
+                scroll_ts = scroll_ts or ()
+                key_ts = key_ts or ()
+                tab.add_events(scroll_ts, key_ts, now)
+                scrolls, keys = len(scroll_ts), len(key_ts)
+            self._activity.scroll_events += scrolls
+            self._activity.key_events += keys
+            scroll_arr, key_arr = tab.snapshot_arrays()
+
             self._snap = BrowserSnapshot(
-                domain=domain or "",
-                title=title or "",
-                scroll_count=int(scroll_count or 0),
-                key_count=int(key_count or 0),
-                ts=time(),
+                domain=symbols.string(domain_id),
+                title=symbols.string(title_id),
+                scroll_count=scroll_count,
+                key_count=key_count,
+                ts=now,
+                domain_id=domain_id,
+                title_id=title_id,
+                tab_id=tab_id,
+                scroll_ts=scroll_arr,
+                key_ts=key_arr,
             )
 
+    def _touch(self, tab_id: int, now: float) -> TabState:
+        tab = self._tabs.get(tab_id)
+        if tab is None:
+            tab = self._tabs[tab_id] = TabState()
+        else:
+            self._tabs.move_to_end(tab_id)
+        tab.last_seen = now
+        return tab
+
+    def _evict(self, now: float):
+        # LRU order: stale tabs are at the front, the active one (just
+        # touched) at the back
+        tabs = self._tabs
+        while len(tabs) > 1:
+            tab = next(iter(tabs.values()))
+            if len(tabs) <= MAX_TABS and now - tab.last_seen < STALE_SEC:
+                break
+            tabs.popitem(last=False)
+
+    def _account(self, now: float):
+        # credit the time since the last call to the audio state of the last
+        # POST, up to POST_STALE_SEC past it
+        until = min(now, self._last_post + POST_STALE_SEC)
+        dt = until - self._accounted_at
+        self._accounted_at = now
+        if dt <= 0 or not self._audible:
+            return
+        self._activity.audible_sec += dt
+        if self._audible - {self._active_id}:
+            self._activity.background_audible_sec += dt
+
+    def activity_and_reset(self) -> TabActivity:
+        """Tab switches and audio time since the previous call."""
+        with self._lock:
+            self._account(time())
+            activity = self._activity
+            self._activity = TabActivity()
+            return activity
+
+    def tab_count(self) -> int:
+        return len(self._tabs)
+
     def snapshot(self) -> BrowserSnapshot:
         with self._lock:
             return self._snap
@@ -1,6 +1,6 @@
 import time
 import threading
-from dataclasses import dataclass
+from dataclasses import replace
 from collections import deque
 from typing import Optional
 
@@ -8,14 +8,51 @@ import cv2
 import numpy as np
 import mediapipe as mp
 
+from collectors.snapshots import CameraSnapshot
 
-@dataclass
-class CameraSnapshot:
-    face_present: float        # 0..1
-    gaze_on_screen: float      # 0..1 (proxy)
-    head_motion: float         # 0..1 (proxy)
-    blink_rate_60s: float      # blinks per 60s window
-    yawn_prob: float           # 0..1 (proxy)
+
+class _FrameAccumulator:
+    """
+    Running count, sum and max of the per-frame metrics (face_present,
+    gaze_on_screen, head_motion, yawn_prob) between two ticks. O(1): no
+    frame values are kept.
+    """
+
+    __slots__ = ("frames", "sums", "maxes")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.sums = [0.0, 0.0, 0.0, 0.0]
+        self.maxes = [0.0, 0.0, 0.0, 0.0]
+
+    def add(self, values):
+        self.frames += 1
+        sums = self.sums
+        maxes = self.maxes
+        for i, v in enumerate(values):
+            sums[i] += v
+            if v > maxes[i]:
+                maxes[i] = v
+
+    def snapshot(self, blink_rate_60s: float) -> CameraSnapshot:
+        n = self.frames
+        sums = self.sums
+        maxes = self.maxes
+        return CameraSnapshot(
+            face_present=sums[0] / n,
+            gaze_on_screen=sums[1] / n,
+            head_motion=sums[2] / n,
+            blink_rate_60s=blink_rate_60s,
+            yawn_prob=sums[3] / n,
+            frames=n,
+            face_present_max=maxes[0],
+            gaze_on_screen_max=maxes[1],
+            head_motion_max=maxes[2],
+            yawn_prob_max=maxes[3],
+        )
 
 
 def _l2(a, b) -> float:
@@ -45,6 +82,10 @@ class CameraCollector:
         self._running = False
         self._thread: Optional[threading.Thread] = None
 
+        # duty cycling (runtime.duty_cycle): paused releases the device
+        self._paused = False
+        self._wake = threading.Event()
+
         # last computed snapshot
         self._snap = CameraSnapshot(
             face_present=0.0,
@@ -54,6 +95,9 @@ class CameraCollector:
             yawn_prob=0.0,
         )
 
+        # frames since the last snapshot_and_reset()
+        self._acc = _FrameAccumulator()
+
         # internal state
         self._prev_nose = None
         self._blink_closed = False
@@ -74,30 +118,91 @@ class CameraCollector:
         if self._running:
             return
         self._running = True
-        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread = threading.Thread(target=self._run, name="camera", daemon=True)
         self._thread.start()
 
     def stop(self):
         self._running = False
+        self._wake.set()
         if self._thread:
             self._thread.join(timeout=2)
 
+    def set_fps(self, fps: int):
+        self.target_fps = fps
+
+    def pause(self):
+        """Release the camera until resume(); snapshots read as no face."""
+        with self._lock:
+            self._paused = True
+            self._wake.clear()
+            self._acc.reset()
+            self._snap = CameraSnapshot(
+                face_present=0.0,
+                gaze_on_screen=0.0,
+                head_motion=0.0,
+                blink_rate_60s=float(len(self._blink_times)),
+                yawn_prob=0.0,
+            )
+
+    def resume(self):
+        with self._lock:
+            self._paused = False
+            self._wake.set()
+
     def snapshot(self) -> CameraSnapshot:
+        """The last processed frame."""
         with self._lock:
             return self._snap
 
-    def _run(self):
-        # Use CAP_DSHOW on Windows to avoid long camera open delays sometimes
-        self._cap = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
-        if not self._cap.isOpened():
-            # keep running but output zeros
-            while self._running:
-                time.sleep(1)
-            return
+    def snapshot_and_reset(self) -> CameraSnapshot:
+        """
+        Mean / max over every frame processed since the previous call (the
+        tick loop's), then start over. With no new frame (camera slower than
+        the tick, paused, absent) the last frame's values, with frames=0.
+        """
+        with self._lock:
+            acc = self._acc
+            if not acc.frames:
+                return replace(self._snap, frames=0)
+            snap = acc.snapshot(self._snap.blink_rate_60s)
+            acc.reset()
+            return snap
+
+    def get_state(self) -> dict:
+        with self._lock:
+            return {"blink_times": list(self._blink_times)}
+
+    def set_state(self, state: dict):
+        # blink timestamps are absolute; anything older than 60s is pruned
+        cutoff = time.time() - 60.0
+        with self._lock:
+            self._blink_times = deque(t for t in state["blink_times"] if t >= cutoff)
 
-        frame_interval = 1.0 / max(1, self.target_fps)
+    def _release(self):
+        if self._cap:
+            self._cap.release()
+            self._cap = None
+
+    def _run(self):
+        no_camera = False
 
         while self._running:
+            if self._paused or no_camera:
+                self._release()
+                self._prev_nose = None
+                self._blink_closed = False
+                self._wake.wait(1.0)
+                continue
+
+            if self._cap is None:
+                # Use CAP_DSHOW on Windows to avoid long camera open delays sometimes
+                self._cap = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
+                if not self._cap.isOpened():
+                    # keep running but output zeros
+                    no_camera = True
+                    continue
+
+            frame_interval = 1.0 / max(1, self.target_fps)
             t0 = time.time()
             ok, frame = self._cap.read()
             if not ok or frame is None:
@@ -188,17 +293,24 @@ class CameraCollector:
                 blink_rate_60s = float(len(self._blink_times))
 
             with self._lock:
+                if self._paused:
+                    continue  # frame read before pause(): keep its zeros
                 self._snap = CameraSnapshot(
                     face_present=face_present,
                     gaze_on_screen=gaze_on_screen,
                     head_motion=head_motion,
                     blink_rate_60s=blink_rate_60s,
                     yawn_prob=yawn_prob,
+                    frames=1,
+                    face_present_max=face_present,
+                    gaze_on_screen_max=gaze_on_screen,
+                    head_motion_max=head_motion,
+                    yawn_prob_max=yawn_prob,
                 )
+                self._acc.add((face_present, gaze_on_screen, head_motion, yawn_prob))
 
             elapsed = time.time() - t0
             sleep_for = max(0.0, frame_interval - elapsed)
             time.sleep(sleep_for)
 
-        if self._cap:
-            self._cap.release()
+        self._release()
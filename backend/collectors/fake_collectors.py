@@ -0,0 +1,142 @@
+import random
+import threading
+from typing import Optional
+
+from collectors.idle_tracker import FakeIdleBackend, IdleTracker
+from collectors.snapshots import CameraSnapshot, InputSnapshot, WindowSnapshot
+from context_engine.symbols import symbols
+
+# --------------------------------------------------
+# Fake collectors (no OS hooks, no camera)
+# --------------------------------------------------
+#
+# Drop-in replacements for the real collectors, selected in main.py with
+# EARNBREAK_FAKE_COLLECTORS=1. They produce plausible random activity so the
+# whole pipeline can run headless, e.g. under runtime.loadtest.
+
+
+class FakeInputCollector:
+    def __init__(self, track_mouse: bool = True, idle_tracker: Optional[IdleTracker] = None, seed: int = 0):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.track_mouse = track_mouse
+        self._idle = FakeIdleBackend()
+        self.idle_tracker = idle_tracker or IdleTracker(self._idle)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def snapshot_and_reset(self) -> InputSnapshot:
+        with self._lock:
+            keys = self._rng.choice((0, 0, 1, 3, 6, 12))
+            mouse = self._rng.uniform(0, 400) if self._rng.random() < 0.6 else 0.0
+            if keys or mouse:
+                self._idle.touch()
+            return InputSnapshot(
+                keystrokes=keys,
+                mouse_distance=mouse if self.track_mouse else 0.0,
+                idle_seconds=self.idle_tracker.idle_seconds() or 0.0,
+            )
+
+
+class FakeWindowCollector:
+    APPS = [
+        ("code.exe", "main.py - EarnBreak", False),
+        ("chrome.exe", "Stack Overflow", True),
+        ("chrome.exe", "YouTube", True),
+        ("slack.exe", "general", False),
+    ]
+
+    def __init__(self, seed: int = 0, switch_prob: float = 0.05):
+        self._rng = random.Random(seed)
+        self.switch_prob = switch_prob
+        self._current = self.APPS[0]
+        self._last_app_id = None
+        self._last_title_id = None
+        self._last_app = None
+        self._last_title = None
+
+    def snapshot(self) -> WindowSnapshot:
+        if self._rng.random() < self.switch_prob:
+            self._current = self._rng.choice(self.APPS)
+        app, title, is_browser = self._current
+        app_id = symbols.intern(app)
+        title_id = symbols.intern(title)
+        app = symbols.string(app_id)
+        title = symbols.string(title_id)
+
+        # as WindowCollector: a pruned symbol re-interned is not a change
+        snap = WindowSnapshot(
+            app=app,
+            title=title,
+            app_changed=app_id != self._last_app_id and app != self._last_app,
+            title_changed=title_id != self._last_title_id and title != self._last_title,
+            is_browser=is_browser,
+            app_id=app_id,
+            title_id=title_id,
+        )
+        self._last_app_id = app_id
+        self._last_title_id = title_id
+        self._last_app = app
+        self._last_title = title
+        return snap
+
+
+class FakeCameraCollector:
+    def __init__(self, camera_index: int = 0, fps: int = 10, seed: int = 0):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._paused = False
+        self.fps = fps
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def set_fps(self, fps: int):
+        self.fps = fps
+
+    def pause(self):
+        self._paused = True
+
+    def resume(self):
+        self._paused = False
+
+    def snapshot(self) -> CameraSnapshot:
+        with self._lock:
+            return self._frames(1)
+
+    def snapshot_and_reset(self) -> CameraSnapshot:
+        """As if `fps` frames were processed since the last tick."""
+        with self._lock:
+            return self._frames(self.fps)
+
+    def _frames(self, n: int) -> CameraSnapshot:
+        if self._paused:
+            return CameraSnapshot(0.0, 0.0, 0.0, 0.0, 0.0)
+        rng = self._rng
+        present = [1.0 if rng.random() < 0.9 else 0.0 for _ in range(n)]
+        gaze = [p * rng.uniform(0.5, 1.0) for p in present]
+        motion = [p * rng.uniform(0.0, 0.3) for p in present]
+        return CameraSnapshot(
+            face_present=sum(present) / n,
+            gaze_on_screen=sum(gaze) / n,
+            head_motion=sum(motion) / n,
+            blink_rate_60s=rng.uniform(8, 20),
+            yawn_prob=0.0,
+            frames=n,
+            face_present_max=max(present),
+            gaze_on_screen_max=max(gaze),
+            head_motion_max=max(motion),
+        )
+
+    def get_state(self) -> dict:
+        return {"blink_times": []}
+
+    def set_state(self, state: dict):
+        pass
@@ -0,0 +1,174 @@
+import ctypes
+import ctypes.util
+import sys
+import time
+from typing import Optional
+
+# --------------------------------------------------
+# OS idle time (seconds since the last user input)
+# --------------------------------------------------
+#
+# The OS already keeps a "last input" counter for every keyboard, mouse and
+# touch event. Reading it once per tick is a single cheap call, so idle time
+# no longer needs a timestamp taken in every pynput callback, and the input
+# collector can skip mouse-move hooks entirely (InputCollector(track_mouse=False)).
+#
+# Backends:
+#   Windows  user32.GetLastInputInfo
+#   macOS    CoreGraphics CGEventSourceSecondsSinceLastEventType
+#   X11      libXss XScreenSaverQueryInfo
+#   fake     FakeIdleBackend (tests / headless runs)
+#
+# Where none is available IdleTracker.available is False and callers fall
+# back to their own activity tracking.
+
+
+class _WindowsBackend:
+    def __init__(self):
+        from ctypes import wintypes
+
+        class LASTINPUTINFO(ctypes.Structure):
+            _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+        self._info = LASTINPUTINFO()
+        self._info.cbSize = ctypes.sizeof(LASTINPUTINFO)
+        self._get_last_input = ctypes.windll.user32.GetLastInputInfo
+        self._tick_count = ctypes.windll.kernel32.GetTickCount
+        self._tick_count.restype = wintypes.DWORD
+
+    def idle_seconds(self) -> Optional[float]:
+        if not self._get_last_input(ctypes.byref(self._info)):
+            return None
+        # both counters are 32-bit milliseconds and wrap after ~49.7 days
+        return ((self._tick_count() - self._info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+
+class _MacBackend:
+    _COMBINED_SESSION_STATE = 0
+    _ANY_INPUT_EVENT = 0xFFFFFFFF
+
+    def __init__(self):
+        cg = ctypes.cdll.LoadLibrary(
+            "/System/Library/Frameworks/CoreGraphics.framework/CoreGraphics"
+        )
+        self._since_last = cg.CGEventSourceSecondsSinceLastEventType
+        self._since_last.argtypes = [ctypes.c_int32, ctypes.c_uint32]
+        self._since_last.restype = ctypes.c_double
+
+    def idle_seconds(self) -> Optional[float]:
+        return float(self._since_last(self._COMBINED_SESSION_STATE, self._ANY_INPUT_EVENT))
+
+
+class _XScreenSaverInfo(ctypes.Structure):
+    _fields_ = [
+        ("window", ctypes.c_ulong),
+        ("state", ctypes.c_int),
+        ("kind", ctypes.c_int),
+        ("til_or_since", ctypes.c_ulong),
+        ("idle", ctypes.c_ulong),
+        ("event_mask", ctypes.c_ulong),
+    ]
+
+
+class _X11Backend:
+    def __init__(self):
+        xlib_path = ctypes.util.find_library("X11")
+        xss_path = ctypes.util.find_library("Xss")
+        if not xlib_path or not xss_path:
+            raise OSError("libX11/libXss not found")
+        xlib = ctypes.cdll.LoadLibrary(xlib_path)
+        xss = ctypes.cdll.LoadLibrary(xss_path)
+
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(_XScreenSaverInfo)
+        xss.XScreenSaverQueryInfo.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_ulong,
+            ctypes.POINTER(_XScreenSaverInfo),
+        ]
+
+        self._display = xlib.XOpenDisplay(None)
+        if not self._display:
+            raise OSError("no X display")
+        self._root = xlib.XDefaultRootWindow(self._display)
+        self._info = xss.XScreenSaverAllocInfo()
+        self._query = xss.XScreenSaverQueryInfo
+
+    def idle_seconds(self) -> Optional[float]:
+        if not self._query(self._display, self._root, self._info):
+            return None
+        return self._info.contents.idle / 1000.0
+
+
+class FakeIdleBackend:
+    """Scripted idle time: touch() marks input, advance() moves the clock."""
+
+    def __init__(self, clock=None):
+        self._external_clock = clock
+        self._offset = 0.0
+        self._last_input = self._now()
+
+    def _now(self) -> float:
+        base = self._external_clock() if self._external_clock else time.monotonic()
+        return base + self._offset
+
+    def touch(self):
+        self._last_input = self._now()
+
+    def advance(self, seconds: float):
+        self._offset += seconds
+
+    def set_idle(self, seconds: float):
+        self._last_input = self._now() - seconds
+
+    def idle_seconds(self) -> Optional[float]:
+        return max(0.0, self._now() - self._last_input)
+
+
+def _os_backend():
+    if sys.platform == "win32":
+        candidates = (_WindowsBackend,)
+    elif sys.platform == "darwin":
+        candidates = (_MacBackend,)
+    else:
+        candidates = (_X11Backend,)
+
+    for backend in candidates:
+        try:
+            b = backend()
+            if b.idle_seconds() is not None:
+                return b
+        except (OSError, AttributeError):
+            continue
+    return None
+
+
+class IdleTracker:
+    """
+    Seconds since the last user input, read from the OS once per call.
+    Pass backend=FakeIdleBackend() in tests; by default the platform
+    backend is probed once and `available` says whether it works.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else _os_backend()
+        self.failures = 0
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def idle_seconds(self) -> Optional[float]:
+        if self.backend is None:
+            return None
+        try:
+            idle = self.backend.idle_seconds()
+        except OSError:
+            idle = None
+        if idle is None:
+            self.failures += 1
+            return None
+        return max(0.0, idle)
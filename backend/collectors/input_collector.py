@@ -2,35 +2,49 @@ import time
 import threading
 from pynput import keyboard, mouse
 from collections import deque
-from dataclasses import dataclass
+from typing import Optional
 
-@dataclass
-class InputSnapshot:
-    keystrokes: int
-    mouse_distance: float
-    idle_seconds: float
+from collectors.idle_tracker import IdleTracker
+from collectors.snapshots import InputSnapshot
 
 
 class InputCollector:
-    def __init__(self):
+    """
+    Counts keystrokes and mouse travel between snapshots.
+
+    Idle time comes from the OS idle counter (collectors.idle_tracker) when
+    one is available, so the hooks only count. With track_mouse=False no
+    mouse hook is installed at all (mouse_distance stays 0); that reduced
+    mode needs the OS idle counter, otherwise mouse activity would be
+    invisible to idle time and the mouse hook is kept anyway.
+    """
+
+    def __init__(self, track_mouse: bool = True, idle_tracker: Optional[IdleTracker] = None):
         self._lock = threading.Lock()
         self.keystrokes = 0
         self.mouse_distance = 0.0
         self.last_activity = time.time()
 
         self._last_mouse_pos = None
+        self._last_idle = 0.0
+
+        self.idle_tracker = idle_tracker if idle_tracker is not None else IdleTracker()
+        self._own_idle = not self.idle_tracker.available
+        self.track_mouse = track_mouse or self._own_idle
 
         self.key_listener = keyboard.Listener(on_press=self._on_key)
-        self.mouse_listener = mouse.Listener(on_move=self._on_move)
+        self.mouse_listener = mouse.Listener(on_move=self._on_move) if self.track_mouse else None
 
     def start(self):
         self.key_listener.start()
-        self.mouse_listener.start()
+        if self.mouse_listener:
+            self.mouse_listener.start()
 
     def stop(self):
         try:
             self.key_listener.stop()
-            self.mouse_listener.stop()
+            if self.mouse_listener:
+                self.mouse_listener.stop()
         except Exception:
             pass
 
@@ -38,7 +52,8 @@ class InputCollector:
     def _on_key(self, key):
         with self._lock:
             self.keystrokes += 1
-            self.last_activity = time.time()
+            if self._own_idle:
+                self.last_activity = time.time()
 
     def _on_move(self, x, y):
         with self._lock:
@@ -47,12 +62,18 @@ class InputCollector:
                 dy = y - self._last_mouse_pos[1]
                 self.mouse_distance += (dx**2 + dy**2) ** 0.5
             self._last_mouse_pos = (x, y)
-            self.last_activity = time.time()
+            if self._own_idle:
+                self.last_activity = time.time()
 
     def snapshot_and_reset(self) -> InputSnapshot:
+        idle = self.idle_tracker.idle_seconds()
         with self._lock:
-            now = time.time()
-            idle = max(0.0, now - self.last_activity)
+            if idle is None:
+                if self._own_idle:
+                    idle = max(0.0, time.time() - self.last_activity)
+                else:
+                    idle = self._last_idle  # transient OS read failure
+            self._last_idle = idle
 
             snap = InputSnapshot(
                 keystrokes=self.keystrokes,
@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+
+# --------------------------------------------------
+# Per-tick collector snapshots
+# --------------------------------------------------
+#
+# What the collectors hand to the tick loop. Kept free of OS / camera
+# imports so the fake collectors (and anything replaying ticks) share the
+# exact same records as the real ones.
+
+
+@dataclass(slots=True)
+class InputSnapshot:
+    keystrokes: int
+    mouse_distance: float
+    idle_seconds: float
+
+
+@dataclass(slots=True)
+class WindowSnapshot:
+    app: str
+    title: str
+    app_changed: bool
+    title_changed: bool
+    is_browser: bool
+    # context_engine.symbols ids of app / title
+    app_id: int = 0
+    title_id: int = 0
+
+
+# frozen: one instance is shared between the camera thread and the tick loop
+@dataclass(frozen=True, slots=True)
+class CameraSnapshot:
+    # from snapshot_and_reset(): means over the frames processed since the
+    # previous call; from snapshot(): the last frame's values
+    face_present: float        # 0..1
+    gaze_on_screen: float      # 0..1 (proxy)
+    head_motion: float         # 0..1 (proxy)
+    blink_rate_60s: float      # blinks per 60s window
+    yawn_prob: float           # 0..1 (proxy)
+
+    frames: int = 0            # frames behind the values
+    face_present_max: float = 0.0
+    gaze_on_screen_max: float = 0.0
+    head_motion_max: float = 0.0
+    yawn_prob_max: float = 0.0
@@ -70,20 +70,17 @@
 import pygetwindow as gw
 import win32process
 import psutil
-from dataclasses import dataclass
 
-
-@dataclass
-class WindowSnapshot:
-    app: str
-    title: str
-    app_changed: bool
-    title_changed: bool
-    is_browser: bool
+from collectors.snapshots import WindowSnapshot
+from context_engine.symbols import symbols
 
 
 class WindowCollector:
     def __init__(self):
+        self.last_app_id = None
+        self.last_title_id = None
+        # kept with the ids: an id pruned while the window didn't change
+        # (e.g. a long suspend) comes back as a new id for the same string
         self.last_app = None
         self.last_title = None
 
@@ -119,9 +116,17 @@ class WindowCollector:
             except Exception:
                 pass
 
-            app_changed = app != self.last_app
-            title_changed = title != self.last_title
-
+            app_id = symbols.intern(app)
+            title_id = symbols.intern(title)
+            app = symbols.string(app_id)
+            title = symbols.string(title_id)
+            # ids are never reused: only a new id can be a change, and the
+            # string tells a real one from a re-interned pruned symbol
+            app_changed = app_id != self.last_app_id and app != self.last_app
+            title_changed = title_id != self.last_title_id and title != self.last_title
+
+            self.last_app_id = app_id
+            self.last_title_id = title_id
             self.last_app = app
             self.last_title = title
 
@@ -131,6 +136,8 @@ class WindowCollector:
                 app_changed=app_changed,
                 title_changed=title_changed,
                 is_browser=is_browser,
+                app_id=app_id,
+                title_id=title_id,
             )
 
         except Exception:
@@ -0,0 +1,300 @@
+# context_engine/rules.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from runtime import log
+
+# --------------------------------------------
+# User-defined taxonomy rules
+# --------------------------------------------
+#
+# Rules live in a JSON file (see taxonomy_rules.json):
+#
+#   "apps":    {context: [process names]}          -> hashed map
+#   "titles":  [{context, keywords: [...]}, ...]   -> keyword automaton
+#   "domains": {browser_category: [domains]}       -> hashed map
+#
+# Title groups are checked in file order: the first group wins, exactly like
+# the old TITLE_PRIMARY_PATTERNS / TITLE_BREAK_PATTERNS chain. Keywords match
+# on word boundaries (same as the old r"\b...\b" regexes).
+# A domain written as "*.example.com" also matches every subdomain.
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "taxonomy_rules.json")
+DEFAULT_CACHE_PATH = "data/taxonomy_rules.cache"
+
+# bump when the compiled layout changes so stale caches are ignored
+COMPILER_VERSION = 1
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over lowercase keywords.
+    One pass over the title finds every keyword occurrence, independent of
+    the number of rules. Each keyword carries a priority (lower wins).
+    """
+
+    def __init__(self, keywords: List[Tuple[str, int, str]]):
+        # keywords: (keyword, priority, value)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int, str]]] = [[]]  # (length, priority, value)
+
+        for kw, prio, value in keywords:
+            kw = kw.lower().strip()
+            if not kw:
+                continue
+            node = 0
+            for ch in kw:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(kw), prio, value))
+
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def best_match(self, text: str) -> Optional[str]:
+        """Value of the highest-priority keyword found on word boundaries."""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        best_prio = None
+        best_value = None
+        node = 0
+        n = len(text)
+
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+
+            for length, prio, value in out[node]:
+                if best_prio is not None and prio >= best_prio:
+                    continue
+                start = i - length + 1
+                if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+                    continue
+                if i + 1 < n and _is_word_char(text[i + 1]) and _is_word_char(ch):
+                    continue
+                best_prio = prio
+                best_value = value
+
+        return best_value
+
+
+class TaxonomyRuleSet:
+    """Compiled, immutable rule set. Swapped as a whole on reload."""
+
+    def __init__(
+        self,
+        app_map: Dict[str, str],
+        title_matcher: KeywordAutomaton,
+        domain_map: Dict[str, str],
+        domain_suffix_map: Dict[str, str],
+        source_hash: str = "",
+    ):
+        self.app_map = app_map
+        self.title_matcher = title_matcher
+        self.domain_map = domain_map
+        self.domain_suffix_map = domain_suffix_map
+        self.source_hash = source_hash
+
+    @classmethod
+    def compile(cls, spec: dict, source_hash: str = "") -> "TaxonomyRuleSet":
+        app_map: Dict[str, str] = {}
+        for ctx, procs in (spec.get("apps") or {}).items():
+            for proc in procs:
+                app_map.setdefault(proc.lower().strip(), ctx)
+
+        keywords: List[Tuple[str, int, str]] = []
+        for group in spec.get("titles") or []:
+            ctx = group["context"]
+            for kw in group.get("keywords", []):
+                keywords.append((kw, len(keywords), ctx))
+
+        domain_map: Dict[str, str] = {}
+        domain_suffix_map: Dict[str, str] = {}
+        for category, domains in (spec.get("domains") or {}).items():
+            for d in domains:
+                d = d.lower().strip()
+                if d.startswith("*."):
+                    domain_suffix_map.setdefault(d[2:], category)
+                else:
+                    domain_map.setdefault(d, category)
+
+        return cls(
+            app_map=app_map,
+            title_matcher=KeywordAutomaton(keywords),
+            domain_map=domain_map,
+            domain_suffix_map=domain_suffix_map,
+            source_hash=source_hash,
+        )
+
+    def app_context(self, app: str) -> Optional[str]:
+        return self.app_map.get(app)
+
+    def title_context(self, title: str) -> Optional[str]:
+        return self.title_matcher.best_match(title)
+
+    def domain_category(self, domain: str) -> Optional[str]:
+        cat = self.domain_map.get(domain)
+        if cat is not None or not self.domain_suffix_map:
+            return cat
+
+        # walk parent domains: a.b.example.com -> b.example.com -> example.com
+        d = domain
+        while d:
+            cat = self.domain_suffix_map.get(d)
+            if cat is not None:
+                return cat
+            dot = d.find(".")
+            if dot < 0:
+                break
+            d = d[dot + 1:]
+        return None
+
+
+class TaxonomyRuleStore:
+    """
+    Loads the rules file, caches the compiled rule set on disk and
+    hot-swaps it when the file changes.
+
+    Readers just take `store.current` once per tick; the swap is a single
+    reference assignment, so the tick loop never waits on a reload.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_RULES_PATH,
+        cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+        poll_interval: float = 2.0,
+    ):
+        self.path = path
+        self.cache_path = cache_path
+        self.poll_interval = poll_interval
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stamp = None
+
+        self._current = self._load()
+
+    @property
+    def current(self) -> TaxonomyRuleSet:
+        return self._current
+
+    # -------------------------
+    # Loading / caching
+    # -------------------------
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _load(self) -> TaxonomyRuleSet:
+        self._stamp = self._file_stamp()
+
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        source_hash = hashlib.sha1(raw + str(COMPILER_VERSION).encode()).hexdigest()
+
+        cached = self._read_cache(source_hash)
+        if cached is not None:
+            return cached
+
+        rules = TaxonomyRuleSet.compile(json.loads(raw), source_hash=source_hash)
+        self._write_cache(rules)
+        return rules
+
+    def _read_cache(self, source_hash: str) -> Optional[TaxonomyRuleSet]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, "rb") as f:
+                rules = pickle.load(f)
+        except Exception:
+            return None
+        if getattr(rules, "source_hash", None) != source_hash:
+            return None
+        return rules
+
+    def _write_cache(self, rules: TaxonomyRuleSet):
+        if not self.cache_path:
+            return
+        try:
+            cache_dir = os.path.dirname(self.cache_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            tmp = self.cache_path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(rules, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+    def reload(self) -> bool:
+        """Recompile from disk. Keeps the old rules if the file is broken."""
+        try:
+            rules = self._load()
+        except Exception as e:
+            log.event("taxonomy.reload_failed", f"keeping previous rules: {e}", level="WARNING")
+            return False
+        self._current = rules
+        return True
+
+    # -------------------------
+    # Watching
+    # -------------------------
+
+    def start_watching(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            stamp = self._file_stamp()
+            if stamp is not None and stamp != self._stamp:
+                self.reload()
@@ -0,0 +1,99 @@
+import threading
+import weakref
+from typing import Callable, Dict, List, Set
+
+# --------------------------------------------
+# Shared symbol table for app / title / domain strings
+# --------------------------------------------
+#
+# Collectors intern the strings they read (WindowSnapshot.app/title,
+# BrowserSnapshot.domain/title) at the boundary and hand out integer ids
+# plus the one canonical str object per value. Downstream code compares and
+# keys caches by id (context_engine.taxonomy.map_to_context,
+# features.browser_intent) instead of re-normalizing and hashing strings
+# every tick.
+#
+# Ids are never reused, so a stale id can only miss, not alias: holders
+# keep the string too and re-intern on a miss. prune() forgets symbols that
+# weren't interned for `keep_epochs` prune cycles; caches keyed by ids
+# register on_prune() to drop them too (bound methods are held weakly, so
+# per-session engines don't pin themselves). Id 0 is always "".
+
+EMPTY = 0
+
+
+class SymbolTable:
+    def __init__(self, keep_epochs: int = 2):
+        self.keep_epochs = keep_epochs
+
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {"": EMPTY}
+        self._strs: Dict[int, str] = {EMPTY: ""}
+        self._last_used: Dict[int, int] = {}
+        self._next_id = 1
+        self._epoch = 0
+        self._on_prune: List[Callable] = []     # refs to callbacks
+
+        self.pruned = 0
+
+    def intern(self, s: str) -> int:
+        if not s:
+            return EMPTY
+        with self._lock:
+            sid = self._ids.get(s)
+            if sid is None:
+                sid = self._next_id
+                self._next_id += 1
+                self._ids[s] = sid
+                self._strs[sid] = s
+            self._last_used[sid] = self._epoch
+            return sid
+
+    def string(self, sid: int) -> str:
+        return self._strs[sid]
+
+    def get(self, sid: int, default: str = "") -> str:
+        return self._strs.get(sid, default)
+
+    def __len__(self) -> int:
+        return len(self._strs)
+
+    def on_prune(self, callback: Callable[[Set[int]], None]):
+        self._on_prune = [ref for ref in self._on_prune if ref() is not None]
+        if hasattr(callback, "__self__"):
+            self._on_prune.append(weakref.WeakMethod(callback))
+        else:
+            self._on_prune.append(lambda: callback)
+
+    def prune(self) -> int:
+        """Start a new epoch and forget symbols unused for keep_epochs."""
+        with self._lock:
+            self._epoch += 1
+            cutoff = self._epoch - self.keep_epochs
+            dead = {sid for sid, used in self._last_used.items() if used < cutoff}
+            for sid in dead:
+                del self._last_used[sid]
+                del self._ids[self._strs.pop(sid)]
+            self.pruned += len(dead)
+
+        if dead:
+            live = []
+            for ref in self._on_prune:
+                callback = ref()
+                if callback is not None:
+                    callback(dead)
+                    live.append(ref)
+            self._on_prune = live
+        return len(dead)
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self._strs),
+            "next_id": self._next_id,
+            "epoch": self._epoch,
+            "pruned": self.pruned,
+        }
+
+
+# process-wide table shared by collectors, features and the context engine
+symbols = SymbolTable()
@@ -1,8 +1,12 @@
 # context_engine/taxonomy.py
 from __future__ import annotations
 
-import re
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from context_engine.rules import TaxonomyRuleSet, TaxonomyRuleStore
+from context_engine.symbols import symbols
 
 # --------------------------------------------
 # Context definitions
@@ -19,44 +23,28 @@ UNKNOWN = "unknown"
 
 PRIMARY_CONTEXTS = {WORK_PRIMARY}
 
+# Fixed interning order: context ids index DIST_MATRIX and per-window counters.
+CONTEXTS = [
+    WORK_PRIMARY,
+    WORK_SUPPORT,
+    SOCIAL,
+    PASSIVE_MEDIA,
+    BROWSER_OTHER,
+    BREAK,
+    UNKNOWN,
+]
+CONTEXT_IDS: Dict[str, int] = {c: i for i, c in enumerate(CONTEXTS)}
+NUM_CONTEXTS = len(CONTEXTS)
+
 # --------------------------------------------
-# App/process → context mapping (strong signal)
+# App / title / domain rules (user-defined)
 # --------------------------------------------
 
-APP_PROCESS_MAP: Dict[str, str] = {
-    # Code editors / IDEs
-    "code.exe": WORK_PRIMARY,
-    "pycharm.exe": WORK_PRIMARY,
-    "idea.exe": WORK_PRIMARY,
-    "intellij.exe": WORK_PRIMARY,
-
-    # Terminals
-    "cmd.exe": WORK_PRIMARY,
-    "powershell.exe": WORK_PRIMARY,
-    "wt.exe": WORK_PRIMARY,
-
-    # Office / writing
-    "excel.exe": WORK_PRIMARY,
-    "powerpnt.exe": WORK_PRIMARY,
-    "winword.exe": WORK_PRIMARY,
-    "notion.exe": WORK_PRIMARY,
-    "obsidian.exe": WORK_PRIMARY,
-}
-
-# (Optional) title patterns for extra robustness
-TITLE_PRIMARY_PATTERNS = [
-    r"\bvisual studio code\b",
-    r"\bvscode\b",
-    r"\bpycharm\b",
-    r"\bintellij\b",
-    r"\bterminal\b",
-    r"\bpowershell\b",
-]
+# Process names, title keywords and browser domains live in
+# taxonomy_rules.json and are compiled by context_engine.rules.
+# The store watches the file and hot-swaps the compiled rules.
+rule_store = TaxonomyRuleStore()
 
-TITLE_BREAK_PATTERNS = [
-    r"\bbreak\b",
-    r"\blocked\b",
-]
 
 def is_primary_context(ctx: str) -> bool:
     return ctx in PRIMARY_CONTEXTS
@@ -67,6 +55,7 @@ def map_to_context(
     window_title: str,
     browser_category: str,
     is_browser: bool,
+    rules: Optional[TaxonomyRuleSet] = None,
 ) -> str:
     """
     Decide semantic context.
@@ -78,22 +67,20 @@ def map_to_context(
     """
     app = (app or "").lower().strip()
     title = (window_title or "").lower().strip()
+    rules = rules or rule_store.current
 
     # -------------------------
     # Non-browser apps (strong signal)
     # -------------------------
     if not is_browser:
-        if app in APP_PROCESS_MAP:
-            return APP_PROCESS_MAP[app]
+        ctx = rules.app_context(app)
+        if ctx is not None:
+            return ctx
 
         # Title heuristics (useful if process name is unknown)
-        for pat in TITLE_PRIMARY_PATTERNS:
-            if re.search(pat, title):
-                return WORK_PRIMARY
-
-        for pat in TITLE_BREAK_PATTERNS:
-            if re.search(pat, title):
-                return BREAK
+        ctx = rules.title_context(title)
+        if ctx is not None:
+            return ctx
 
         return UNKNOWN
 
@@ -112,11 +99,51 @@ def map_to_context(
     return UNKNOWN
 
 
+# (app_id, title_id, browser_category, is_browser) -> context, for one
+# compiled rule set; ids come from context_engine.symbols
+_context_cache: Dict[tuple, str] = {}
+_context_cache_rules: Optional[TaxonomyRuleSet] = None
+MAX_CONTEXT_CACHE = 4096
+
+
+def map_ids_to_context(app_id: int, title_id: int, browser_category: str, is_browser: bool) -> str:
+    """map_to_context() on interned app / title ids, memoized per rule set."""
+    global _context_cache_rules
+
+    rules = rule_store.current
+    if rules is not _context_cache_rules or len(_context_cache) >= MAX_CONTEXT_CACHE:
+        _context_cache.clear()
+        _context_cache_rules = rules
+
+    # browsers are decided by category alone
+    key = (0, 0, browser_category, True) if is_browser else (app_id, title_id, None, False)
+    ctx = _context_cache.get(key)
+    if ctx is None:
+        ctx = _context_cache[key] = map_to_context(
+            app=symbols.get(app_id),
+            window_title=symbols.get(title_id),
+            browser_category=browser_category,
+            is_browser=is_browser,
+            rules=rules,
+        )
+    return ctx
+
+
+def _drop_pruned(ids):
+    for key in [k for k in _context_cache if k[0] in ids or k[1] in ids]:
+        del _context_cache[key]
+
+
+symbols.on_prune(_drop_pruned)
+
+
 # --------------------------------------------
 # Semantic distance matrix (0 = same, 1 = very different)
 # Keep it partial; we provide a sane default.
 # --------------------------------------------
 
+DEFAULT_DISTANCE = 0.6
+
 DIST: Dict[Tuple[str, str], float] = {
     (WORK_PRIMARY, WORK_PRIMARY): 0.0,
     (WORK_PRIMARY, WORK_SUPPORT): 0.2,
@@ -148,4 +175,22 @@ DIST: Dict[Tuple[str, str], float] = {
 def semantic_distance(a: str, b: str) -> float:
     if a == b:
         return 0.0
-    return DIST.get((a, b), 0.6)
+    return DIST.get((a, b), DEFAULT_DISTANCE)
+
+
+# Dense form of DIST for the hot path: DIST_MATRIX[context_id(a), context_id(b)]
+
+def _build_dist_matrix() -> np.ndarray:
+    m = np.full((NUM_CONTEXTS, NUM_CONTEXTS), DEFAULT_DISTANCE, dtype=np.float64)
+    np.fill_diagonal(m, 0.0)
+    for (a, b), d in DIST.items():
+        m[CONTEXT_IDS[a], CONTEXT_IDS[b]] = d
+    return m
+
+
+DIST_MATRIX = _build_dist_matrix()
+
+
+def context_id(ctx: str) -> int:
+    # contexts not in CONTEXTS (e.g. from a custom rules file) count as unknown
+    return CONTEXT_IDS.get(ctx, CONTEXT_IDS[UNKNOWN])
@@ -1,26 +1,87 @@
 from dataclasses import dataclass
 import time
+from typing import Dict, Optional, Tuple
 from collections import defaultdict
 
-WORK_SUPPORT_DOMAINS = {
-    "chat.openai.com", "docs.python.org", "developer.mozilla.org",
-    "stackoverflow.com", "github.com"
-}
-SEARCH_DOMAINS = {"google.com", "duckduckgo.com", "bing.com"}
-SOCIAL_DOMAINS = {"instagram.com", "tiktok.com", "x.com", "twitter.com", "reddit.com"}
-VIDEO_DOMAINS = {"youtube.com", "netflix.com", "twitch.tv"}
+import numpy as np
+
+from context_engine.symbols import symbols
+from context_engine.taxonomy import rule_store
+
+# Domain → category sets live in context_engine/taxonomy_rules.json
 
 
 def normalize_domain(domain: str) -> str:
     return domain.lower().replace("www.", "").strip()
 
 
-@dataclass
+# frozen: instances are cached and handed out again (NEUTRAL, unchanged results)
+@dataclass(frozen=True, slots=True)
 class BrowserIntent:
     domain: str
     category: str
     doomscroll_prob: float
-    reasons: list[str]
+    reasons: Tuple[str, ...]
+
+
+NEUTRAL = BrowserIntent(domain="", category="non_browser", doomscroll_prob=0.0, reasons=())
+
+_HIGH_SCROLL = ("High scrolling + low typing + long dwell",)
+_PASSIVE_SCROLL = ("Sustained passive scrolling",)
+_LONG_DWELL = ("Long dwell with no interaction",)
+_FEED_RHYTHM = ("Steady scroll-and-glance rhythm",)
+
+# Scoring runs over the active tab's event times (BrowserSnapshot.scroll_ts /
+# key_ts, see collectors.browser_collector) instead of per-tick counter
+# deltas:
+#   velocity   events/s over the last SHORT_SEC and LONG_SEC
+#   pauses     gaps between consecutive scrolls in the last PAUSE_SEC,
+#              histogrammed by PAUSE_EDGES: (<1s, 1-3s, 3-10s, 10-30s, 30s+)
+SHORT_SEC = 5.0
+LONG_SEC = 30.0
+PAUSE_SEC = 60.0
+PAUSE_EDGES = np.array([0.0, 1.0, 3.0, 10.0, 30.0, np.inf])
+
+
+@dataclass(slots=True)
+class ScrollStats:
+    scroll_short: float     # scrolls/s, last SHORT_SEC
+    scroll_long: float      # scrolls/s, last LONG_SEC
+    keys_long: int          # key events, last LONG_SEC
+    pauses: np.ndarray      # counts per PAUSE_EDGES bin
+
+
+def _count_since(ts: np.ndarray, t0: float) -> int:
+    # ts is sorted: one binary search instead of a scan
+    return len(ts) - int(np.searchsorted(ts, t0))
+
+
+def scroll_stats(scroll_ts: np.ndarray, key_ts: np.ndarray, now: float) -> ScrollStats:
+    recent = scroll_ts[np.searchsorted(scroll_ts, now - PAUSE_SEC):]
+    bins = np.searchsorted(PAUSE_EDGES, np.diff(recent), side="right") - 1
+    pauses = np.bincount(bins, minlength=len(PAUSE_EDGES) - 1)
+    return ScrollStats(
+        scroll_short=_count_since(scroll_ts, now - SHORT_SEC) / SHORT_SEC,
+        scroll_long=_count_since(scroll_ts, now - LONG_SEC) / LONG_SEC,
+        keys_long=_count_since(key_ts, now - LONG_SEC),
+        pauses=pauses,
+    )
+
+
+def doomscroll_score(stats: ScrollStats, dwell: float) -> Tuple[float, Tuple[str, ...]]:
+    """Doomscroll probability and reasons for a social / passive-media tab."""
+    pauses = stats.pauses
+    # keys_long <= LONG_SEC: at most one key per second on average
+    if stats.scroll_short >= 6 and stats.keys_long <= LONG_SEC and dwell >= 30:
+        return 0.9, _HIGH_SCROLL
+    if stats.scroll_short >= 4 and stats.keys_long == 0 and dwell >= 15:
+        return 0.7, _PASSIVE_SCROLL
+    # feed reading: many short glances between scrolls, no long break
+    if pauses[1] + pauses[2] >= 5 and pauses[3] + pauses[4] == 0 and stats.keys_long == 0 and dwell >= 30:
+        return 0.7, _FEED_RHYTHM
+    if dwell >= 60 and stats.keys_long == 0:
+        return 0.6, _LONG_DWELL
+    return 0.0, ()
 
 
 class BrowserIntentEngine:
@@ -30,76 +91,91 @@ class BrowserIntentEngine:
         self._domain_dwell = defaultdict(float)
         self._active_domain = ""
 
-        self._prev_scroll = 0
-        self._prev_keys = 0
-
-    def update(self, snap):
-        now = time.time()
+        # keyed by context_engine.symbols ids of the domain as sent:
+        # normalized domain (canonical str), and its category per rule set
+        self._normalized: Dict[int, str] = {}
+        self._categories: Dict[int, str] = {}
+        self._categories_rules = None
+        symbols.on_prune(self._drop_pruned)
+
+        # last inference result, returned again while nothing changes
+        self._last: BrowserIntent = NEUTRAL
+
+    def _drop_pruned(self, ids):
+        for sid in ids:
+            self._normalized.pop(sid, None)
+            self._categories.pop(sid, None)
+
+    def _domain(self, snap) -> str:
+        domain = self._normalized.get(snap.domain_id)
+        if domain is None:
+            normalized = normalize_domain(snap.domain)
+            domain = self._normalized[snap.domain_id] = symbols.string(symbols.intern(normalized))
+        return domain
+
+    def _category(self, snap, domain: str) -> str:
+        rules = rule_store.current
+        if rules is not self._categories_rules:
+            self._categories.clear()
+            self._categories_rules = rules
+        category = self._categories.get(snap.domain_id)
+        if category is None:
+            category = rules.domain_category(domain) if domain else None
+            if category is None:
+                category = "browser_other" if domain else "unknown"
+            self._categories[snap.domain_id] = category
+        return category
+
+    def update(self, snap, now: Optional[float] = None):
+        now = time.time() if now is None else now
         dt = max(0.0, now - self._last_ts)
         self._last_ts = now
 
-        domain = normalize_domain(snap.domain)
+        domain = self._domain(snap)
 
         if domain:
             self._domain_dwell[domain] += dt
             self._active_domain = domain
 
-    def infer(self, snap) -> BrowserIntent:
-        domain = normalize_domain(snap.domain)
-        reasons = []
-
-        # Delta interaction
-        dscroll = max(0, snap.scroll_count - self._prev_scroll)
-        dkeys = max(0, snap.key_count - self._prev_keys)
-
-        self._prev_scroll = snap.scroll_count
-        self._prev_keys = snap.key_count
-
-        scroll_rate = dscroll
-        key_rate = dkeys
+    def infer(self, snap, now: Optional[float] = None) -> BrowserIntent:
+        now = time.time() if now is None else now
+        domain = self._domain(snap)
         dwell = self._domain_dwell.get(domain, 0.0)
-
-        # Category
-        if domain in WORK_SUPPORT_DOMAINS:
-            category = "work_support"
-        elif domain in SEARCH_DOMAINS:
-            category = "search"
-        elif domain in SOCIAL_DOMAINS:
-            category = "social"
-        elif domain in VIDEO_DOMAINS:
-            category = "passive_media"
-        elif domain:
-            category = "browser_other"
-        else:
-            category = "unknown"
+        category = self._category(snap, domain)
 
         doom = 0.0
-
+        reasons = ()
         if category in ("social", "passive_media"):
-            if scroll_rate >= 6 and key_rate <= 1 and dwell >= 30:
-                doom = 0.9
-                reasons.append("High scrolling + low typing + long dwell")
-            elif scroll_rate >= 4 and key_rate == 0 and dwell >= 15:
-                doom = 0.7
-                reasons.append("Sustained passive scrolling")
-            elif dwell >= 60 and key_rate == 0:
-                doom = 0.6
-                reasons.append("Long dwell with no interaction")
-
-        if category in ("work_support", "search") and key_rate >= 1:
-            doom = min(doom, 0.1)
-
-        return BrowserIntent(
+            stats = scroll_stats(snap.scroll_ts, snap.key_ts, now)
+            doom, reasons = doomscroll_score(stats, dwell)
+
+        last = self._last
+        if (
+            last.domain == domain
+            and last.category == category
+            and last.doomscroll_prob == doom
+            and last.reasons == reasons
+        ):
+            return last
+        self._last = BrowserIntent(
             domain=domain,
             category=category,
             doomscroll_prob=doom,
             reasons=reasons,
         )
+        return self._last
+
+    def get_state(self) -> dict:
+        return {
+            "domain_dwell": dict(self._domain_dwell),
+            "active_domain": self._active_domain,
+        }
+
+    def set_state(self, state: dict):
+        self._domain_dwell = defaultdict(float, state["domain_dwell"])
+        self._active_domain = state["active_domain"]
+        # downtime is not dwell
+        self._last_ts = time.time()
 
     def neutral(self) -> BrowserIntent:
-        return BrowserIntent(
-            domain="",
-            category="non_browser",
-            doomscroll_prob=0.0,
-            reasons=[],
-        )
+        return NEUTRAL
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from features.rolling import RollingWindow
 import math
 
-@dataclass
+@dataclass(slots=True)
 class InputFeatures:
     keys_per_min: float
     mouse_dist_per_min: float
@@ -22,16 +22,30 @@ class InputFeatureExtractor:
         self.mouse.add(snapshot.mouse_distance)
         self.idle.add(min(1.0, snapshot.idle_seconds))
 
+    def get_state(self) -> dict:
+        return {
+            "keys": self.keys.get_state(),
+            "mouse": self.mouse.get_state(),
+            "idle": self.idle.get_state(),
+        }
+
+    def set_state(self, state: dict, elapsed: int = 0):
+        self.keys.set_state(state["keys"], elapsed)
+        self.mouse.set_state(state["mouse"], elapsed)
+        self.idle.set_state(state["idle"], elapsed)
+
     def extract(self) -> InputFeatures:
         keys_pm = self.keys.mean() 
         mouse_pm = self.mouse.mean() 
         idle_ratio = self.idle.mean()
 
+        keys_var = self.keys.var()
+
         # entropy proxy: variance of activity
-        entropy = min(1.0, math.log1p(self.keys.var() + self.mouse.var()) / 5)
+        entropy = min(1.0, math.log1p(keys_var + self.mouse.var()) / 5)
 
         # burst score: work happens in bursts, not constant trickle
-        burst = 1.0 - min(1.0, self.keys.var() / 50)
+        burst = 1.0 - min(1.0, keys_var / 50)
 
         return InputFeatures(
             keys_per_min=keys_pm,
@@ -0,0 +1,247 @@
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from context_engine.taxonomy import CONTEXTS, NUM_CONTEXTS
+
+# --------------------------------------------------
+# Declarative window feature registry
+# --------------------------------------------------
+#
+# Three kinds of entries:
+#
+#   TICK_FIELDS   per-tick values the aggregator records each sample,
+#                 read from the add_sample() sample dict
+#   intermediate  window-level values shared by several features
+#   feature       a column of TimeWindowFeatureRow
+#
+# Every intermediate/feature declares its inputs (tick fields or other
+# entries) and a reducer taking a WindowContext. The aggregator only records
+# the tick fields the requested features need, and WindowContext memoizes
+# every column and intermediate, so shared work is done once per window.
+#
+# Requesting a subset only saves work when every consumer reads a subset.
+# The app's consumers include the dataset logger and the online learner,
+# which read (nearly) full rows, so there every feature is computed each
+# window. The live_state frame (main.LiveState) is per tick and is not
+# built from this registry.
+#
+# TimeWindowFeatureRow (ml.time_window_schema) is generated from FEATURES,
+# in declaration order.
+
+TICK_FIELDS: Dict[str, Callable[[dict], float]] = {
+    "ts": lambda s: s["ts"],
+
+    # input
+    "keys": lambda s: s["input_f"].keys_per_min,
+    "mouse": lambda s: s["input_f"].mouse_dist_per_min,
+    "idle_ratio": lambda s: s["input_f"].idle_ratio,
+
+    # window
+    "app_switch_rate": lambda s: s["window_f"].app_switch_rate,
+    "app_changed": lambda s: s["app_changed"],
+
+    # browser
+    "doomscroll_prob": lambda s: s["browser_intent"].doomscroll_prob,
+    "is_browser": lambda s: s["is_browser"],
+    "tab_switches": lambda s: s["tab_switches"],
+    "background_media": lambda s: s["background_media"],   # seconds this tick
+
+    # semantic
+    "is_on_primary": lambda s: s["is_on_primary"],
+
+    # camera
+    "face_present": lambda s: s["cam"].face_present,
+    "gaze_on_screen": lambda s: s["cam"].gaze_on_screen,
+    "head_motion": lambda s: s["cam"].head_motion,
+}
+
+
+class Entry:
+    def __init__(self, name: str, inputs: Tuple[str, ...], fn: Callable, dtype: type = float):
+        self.name = name
+        self.inputs = inputs
+        self.fn = fn
+        self.dtype = dtype
+
+
+class WindowContext:
+    """Lazy, memoized view of one window for the reducers."""
+
+    def __init__(self, agg, now: float, session_start_ts: float, last_break_ts: float):
+        self.agg = agg
+        self.now = now
+        self.start_ts = agg.start_ts
+        self.session_start_ts = session_start_ts
+        self.last_break_ts = last_break_ts
+
+        self._cols: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, object] = {}
+
+    @property
+    def n(self) -> int:
+        return self.agg.num_samples
+
+    def col(self, name: str) -> np.ndarray:
+        arr = self._cols.get(name)
+        if arr is None:
+            # a copy: the aggregator's array("d") columns keep growing
+            arr = np.array(self.agg.columns[name], dtype=np.float64)
+            self._cols[name] = arr
+        return arr
+
+    def mean(self, name: str) -> float:
+        return float(self.col(name).mean()) if self.n else 0.0
+
+    def std(self, name: str) -> float:
+        return float(self.col(name).std()) if self.n > 1 else 0.0
+
+    def get(self, name: str):
+        if name in self._values:
+            return self._values[name]
+        entry = REGISTRY[name]
+        value = entry.fn(self)
+        self._values[name] = value
+        return value
+
+
+REGISTRY: Dict[str, Entry] = {}
+FEATURES: List[Entry] = []
+
+
+def intermediate(name: str, inputs: Iterable[str] = (), fn: Callable = None):
+    REGISTRY[name] = Entry(name, tuple(inputs), fn)
+
+
+def feature(name: str, inputs: Iterable[str], fn: Callable, dtype: type = float):
+    entry = Entry(name, tuple(inputs), fn, dtype)
+    REGISTRY[name] = entry
+    FEATURES.append(entry)
+
+
+# --------------------------------------------------
+# Intermediates
+# --------------------------------------------------
+
+def _longest_run(mask: np.ndarray) -> int:
+    best = run = 0
+    for v in mask:
+        run = run + 1 if v else 0
+        if run > best:
+            best = run
+    return best
+
+
+def _transition_summary(c: WindowContext) -> dict:
+    t = c.agg.transitions
+    total = int(t.sum())
+    stays = int(np.trace(t))
+    switches = total - stays
+
+    # entropy of where switches go (0 = always the same pair, 1 = uniform)
+    entropy = 0.0
+    if switches > 0:
+        off = t[~np.eye(NUM_CONTEXTS, dtype=bool)]
+        p = off[off > 0] / switches
+        entropy = float(-(p * np.log(p)).sum() / np.log(off.size))
+
+    cost = c.agg.switch_cost
+    return {
+        "semantic_switches": switches,
+        "weighted_switch_cost": float(cost),
+        "mean_switch_distance": float(cost / switches) if switches else 0.0,
+        "self_transition_ratio": float(stays / total) if total else 1.0,
+        "transition_entropy": entropy,
+    }
+
+
+intermediate("duration", (), lambda c: c.now - c.start_ts)
+intermediate("percent_on_primary", ("is_on_primary",), lambda c: c.mean("is_on_primary"))
+intermediate("browser_mask", ("is_browser",), lambda c: c.col("is_browser") > 0)
+intermediate("num_app_changes", ("app_changed",), lambda c: int(c.col("app_changed").sum()))
+intermediate("transitions", (), _transition_summary)
+
+# --------------------------------------------------
+# Features (column order of TimeWindowFeatureRow)
+# --------------------------------------------------
+
+feature("window_start_ts", (), lambda c: c.start_ts)
+feature("window_duration", ("duration",), lambda c: c.get("duration"))
+
+feature("keys_mean", ("keys",), lambda c: c.mean("keys"))
+feature("keys_std", ("keys",), lambda c: c.std("keys"))
+feature("mouse_mean", ("mouse",), lambda c: c.mean("mouse"))
+feature("idle_ratio_mean", ("idle_ratio",), lambda c: c.mean("idle_ratio"))
+feature("longest_idle_streak", ("idle_ratio",), lambda c: float(_longest_run(c.col("idle_ratio") > 0.9)))
+
+feature("percent_time_on_primary", ("percent_on_primary",), lambda c: c.get("percent_on_primary"))
+feature("num_context_switches", ("num_app_changes",), lambda c: c.get("num_app_changes"), int)
+feature(
+    "fragmentation_score",
+    ("num_app_changes", "duration"),
+    lambda c: c.get("num_app_changes") / c.get("duration") if c.get("duration") > 0 else 0.0,
+)
+feature(
+    "time_away_from_primary",
+    ("duration", "percent_on_primary"),
+    lambda c: float(c.get("duration") * (1 - c.get("percent_on_primary"))),
+)
+
+feature("semantic_switches", ("transitions",), lambda c: c.get("transitions")["semantic_switches"], int)
+for _name in ("weighted_switch_cost", "mean_switch_distance", "self_transition_ratio", "transition_entropy"):
+    feature(_name, ("transitions",), lambda c, _name=_name: c.get("transitions")[_name])
+
+# seconds (ticks) per semantic context, see context_engine.taxonomy.CONTEXTS
+for _i, _ctx in enumerate(CONTEXTS):
+    feature(f"dwell_{_ctx}", (), lambda c, _i=_i: float(c.agg.dwell[_i]))
+
+feature(
+    "percent_browser_time",
+    ("browser_mask",),
+    lambda c: float(c.get("browser_mask").sum() / max(c.n, 1)),
+)
+feature("doomscroll_prob_mean", ("doomscroll_prob",), lambda c: c.mean("doomscroll_prob"))
+feature(
+    "doomscroll_duration",
+    ("browser_mask", "doomscroll_prob"),
+    lambda c: float((c.get("browser_mask") & (c.col("doomscroll_prob") > 0.7)).sum()),
+)
+feature("num_tab_switches", ("tab_switches",), lambda c: int(c.col("tab_switches").sum()), int)
+feature("background_media_time", ("background_media",), lambda c: float(c.col("background_media").sum()))
+
+feature("face_present_ratio", ("face_present",), lambda c: c.mean("face_present"))
+feature("gaze_on_screen_ratio", ("gaze_on_screen",), lambda c: c.mean("gaze_on_screen"))
+feature("head_motion_mean", ("head_motion",), lambda c: c.mean("head_motion"))
+
+feature("session_elapsed_time", (), lambda c: float(c.now - c.session_start_ts))
+feature("time_since_last_break", (), lambda c: float(c.now - c.last_break_ts))
+
+FEATURE_NAMES: List[str] = [f.name for f in FEATURES]
+
+
+# --------------------------------------------------
+# Planning
+# --------------------------------------------------
+
+def tick_fields_for(names: Optional[Iterable[str]] = None) -> List[str]:
+    """Tick fields (transitively) needed to compute `names` (None = all features)."""
+    needed: Set[str] = set()
+    stack = list(FEATURE_NAMES if names is None else names)
+    seen: Set[str] = set()
+    while stack:
+        name = stack.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        if name in TICK_FIELDS:
+            needed.add(name)
+        elif name in REGISTRY:
+            stack.extend(REGISTRY[name].inputs)
+        else:
+            raise KeyError(f"unknown feature or input {name!r}")
+    # keep TICK_FIELDS order for stable column layout
+    return [f for f in TICK_FIELDS if f in needed]
+
+
+def compute(ctx: WindowContext, names: Iterable[str]) -> dict:
+    return {name: ctx.get(name) for name in names}
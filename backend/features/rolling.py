@@ -1,5 +1,6 @@
 from collections import deque
-from statistics import variance
+
+import numpy as np
 
 class RollingWindow:
     def __init__(self, size: int):
@@ -12,7 +13,89 @@ class RollingWindow:
         return sum(self.values) / len(self.values) if self.values else 0.0
 
     def var(self):
-        return variance(self.values) if len(self.values) > 1 else 0.0
+        # sample variance, two-pass in floats (statistics.variance works in
+        # exact fractions and dominated the cost of a tick)
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        m = sum(self.values) / n
+        return sum((v - m) * (v - m) for v in self.values) / (n - 1)
 
     def last(self):
         return self.values[-1] if self.values else 0.0
+
+    def get_state(self) -> list:
+        return list(self.values)
+
+    def set_state(self, values, elapsed: int = 0):
+        # `elapsed` ticks went by unobserved: they push the oldest values out
+        keep = max(0, self.values.maxlen - elapsed)
+        self.values.clear()
+        if keep:
+            self.values.extend(list(values)[-keep:])
+
+
+class EventTimes:
+    """
+    Timestamps of discrete events (scrolls, key presses) in a fixed-size
+    ring: the newest `capacity` events within `horizon` seconds are kept,
+    oldest first, as one float64 array.
+    """
+
+    def __init__(self, capacity: int = 1024, horizon: float = 120.0):
+        self.capacity = capacity
+        self.horizon = horizon
+        self._buf = np.zeros(capacity, dtype=np.float64)
+        self._start = 0     # index of the oldest event
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def last(self) -> float:
+        if not self._len:
+            return 0.0
+        return float(self._buf[(self._start + self._len - 1) % self.capacity])
+
+    def extend(self, ts, now: float):
+        """
+        Add event times (seconds); ones older than the newest kept event,
+        outside the horizon, or in the future are dropped.
+        """
+        ts = np.asarray(ts, dtype=np.float64)
+        if ts.size:
+            ts = np.sort(ts)
+            ts = ts[(ts >= max(self.last(), now - self.horizon)) & (ts <= now + 1.0)]
+            ts = ts[-self.capacity:]
+        n = ts.size
+        if n:
+            cap = self.capacity
+            end = (self._start + self._len) % cap
+            first = min(n, cap - end)
+            self._buf[end:end + first] = ts[:first]
+            self._buf[:n - first] = ts[first:]
+            overflow = max(0, self._len + n - cap)
+            self._start = (self._start + overflow) % cap
+            self._len = min(cap, self._len + n)
+        self._expire(now)
+
+    def _expire(self, now: float):
+        # events are ordered: drop the prefix older than the horizon
+        old = int(np.searchsorted(self.values(), now - self.horizon))
+        self._start = (self._start + old) % self.capacity
+        self._len -= old
+
+    def values(self) -> np.ndarray:
+        """The kept events, oldest first (a copy when the ring wraps)."""
+        end = self._start + self._len
+        if end <= self.capacity:
+            return self._buf[self._start:end]
+        return np.concatenate((self._buf[self._start:], self._buf[:end - self.capacity]))
+
+    def get_state(self) -> list:
+        return self.values().tolist()
+
+    def set_state(self, values, now: float):
+        self._start = 0
+        self._len = 0
+        self.extend(values, now)
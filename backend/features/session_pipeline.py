@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Optional
+
+from collectors.browser_collector import MAX_TABS, TabState
+from context_engine.symbols import symbols
+from context_engine.taxonomy import context_id, is_primary_context, map_ids_to_context
+from features.browser_intent import BrowserIntentEngine
+from features.input_features import InputFeatureExtractor
+from features.time_window_aggregator import TimeWindowAggregator
+from features.window_features import WindowFeatureExtractor
+
+# a longer silence between ticks means the source was down (warm restart)
+RESUME_GAP_SEC = 5.0
+
+
+class SessionPipeline:
+    """
+    The per-session part of the live tick loop in main.py, driven by raw
+    ticks (ml.raw_archive RAW_FIELDS dicts) and using their timestamps as
+    the clock. Used to replay the archive (ml.backfill) and for remote
+    agents' sessions (runtime.ingest).
+    """
+
+    def __init__(self, window_sec: int):
+        self.input_fx = InputFeatureExtractor()
+        self.window_fx = WindowFeatureExtractor()
+        self.browser_intent = BrowserIntentEngine()
+        # tab id -> event history, LRU like collectors.browser_collector
+        self.browser_tabs: "OrderedDict[int, TabState]" = OrderedDict()
+        self.agg = TimeWindowAggregator(window_sec)
+        self._sample = {"ctx_state": None}     # refilled per tick
+
+        self.session_start_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+
+    def feed(self, tick: dict) -> Optional[dict]:
+        """Add one tick; returns the window features when a window completes."""
+        ts = tick["ts"]
+        prev_ts = self.last_ts
+        if self.session_start_ts is None:
+            self.session_start_ts = ts
+            self.agg.reset(now=ts)
+        elif ts - self.last_ts > RESUME_GAP_SEC:
+            self._resume(ts, ts - self.last_ts)
+        self.last_ts = ts
+
+        snap = SimpleNamespace(**tick)
+        self.input_fx.update(snap)
+        self.window_fx.update(snap)
+        input_f = self.input_fx.extract()
+        window_f = self.window_fx.extract()
+
+        # browser events arrive whether or not the browser has focus
+        domain_id = symbols.intern(tick["domain"])
+        tab = self._tab(int(tick.get("tab_id", 0)))
+        if "scroll_events" in tick:
+            if prev_ts is None or ts - prev_ts > RESUME_GAP_SEC:
+                prev_ts = ts - 1.0
+            tab.add_event_counts(int(tick["scroll_events"]), int(tick["key_events"]), prev_ts, ts)
+        else:
+            # archived before per-tick counts: diff the counters per page
+            tab.add_counts(tick["scroll_count"], tick["key_count"], ts, page=domain_id)
+
+        if tick["is_browser"]:
+            browser_snap = SimpleNamespace(
+                domain=tick["domain"],
+                title=tick["browser_title"],
+                scroll_count=tick["scroll_count"],
+                key_count=tick["key_count"],
+                domain_id=domain_id,
+            )
+            # read in place: nothing else touches this tab
+            browser_snap.scroll_ts = tab.scroll.values()
+            browser_snap.key_ts = tab.keys.values()
+            self.browser_intent.update(browser_snap, now=ts)
+            browser_intent = self.browser_intent.infer(browser_snap, now=ts)
+        else:
+            browser_intent = self.browser_intent.neutral()
+
+        semantic_ctx = map_ids_to_context(
+            symbols.intern(tick["app"]),
+            symbols.intern(tick["title"]),
+            browser_intent.category,
+            tick["is_browser"],
+        )
+
+        sample = self._sample
+        sample["input_f"] = input_f
+        sample["window_f"] = window_f
+        sample["browser_intent"] = browser_intent
+        sample["cam"] = snap
+        sample["is_browser"] = tick["is_browser"]
+        sample["is_on_primary"] = is_primary_context(semantic_ctx)
+        sample["app_changed"] = tick["app_changed"]
+        # absent from segments archived before they were recorded
+        sample["tab_switches"] = tick.get("tab_switches", 0)
+        sample["background_media"] = tick.get("background_media_sec", 0.0)
+        sample["ts"] = ts
+        self.agg.add_sample(sample, context_id=context_id(semantic_ctx))
+
+        if not self.agg.is_complete(now=ts):
+            return None
+        features = self.agg.aggregate(
+            session_start_ts=self.session_start_ts,
+            last_break_ts=self.session_start_ts,
+            now=ts,
+        )
+        self.agg.reset(now=ts)
+        return features
+
+    def _tab(self, tab_id: int) -> TabState:
+        tabs = self.browser_tabs
+        tab = tabs.get(tab_id)
+        if tab is None:
+            tab = tabs[tab_id] = TabState()
+            if len(tabs) > MAX_TABS:
+                tabs.popitem(last=False)
+        else:
+            tabs.move_to_end(tab_id)
+        return tab
+
+    def _resume(self, ts: float, gap: float):
+        # same as restore_pipeline_state() in main.py
+        elapsed = int(gap)
+        self.input_fx.set_state(self.input_fx.get_state(), elapsed)
+        self.window_fx.set_state(self.window_fx.get_state(), elapsed)
+        self.browser_intent.set_state(self.browser_intent.get_state())
+        if self.agg.is_complete(now=ts):
+            self.agg.reset(now=ts)
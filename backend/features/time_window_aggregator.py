@@ -1,125 +1,131 @@
 import time
+from array import array
+from typing import Iterable, Optional
+
 import numpy as np
 
+from context_engine.taxonomy import DIST_MATRIX, NUM_CONTEXTS
+from features import registry
+
 
 class TimeWindowAggregator:
-    def __init__(self, window_sec: int):
+    """
+    Collects per-tick samples for one time window and reduces them to the
+    window features declared in features.registry.
+
+    aggregate() computes the features requested by the consumers (see
+    request_features), and only the tick fields those features need are
+    recorded.
+    """
+
+    def __init__(self, window_sec: int, features: Optional[Iterable[str]] = None):
         self.window_sec = window_sec
-        self.reset()
 
-    def reset(self):
-        self.start_ts = time.time()
-        self.samples = []
-
-    def add_sample(
-        self,
-        *,
-        input_f,
-        window_f,
-        browser_intent,
-        ctx_state,
-        cam,
-        is_browser: bool,
-        is_on_primary: bool,
-        app_changed: bool,
-        ts: float,
-    ):
-        self.samples.append(
-            {
-                "ts": ts,
-
-                # input
-                "keys": input_f.keys_per_min,
-                "mouse": input_f.mouse_dist_per_min,
-                "idle_ratio": input_f.idle_ratio,
-
-                # window
-                "app_switch_rate": window_f.app_switch_rate,
-                "app_changed": app_changed, 
-
-                # browser
-                "doomscroll_prob": browser_intent.doomscroll_prob,
-                "is_browser": is_browser,
-
-                # semantic
-                "is_on_primary": is_on_primary,
-
-                # camera
-                "face_present": cam.face_present,
-                "gaze_on_screen": cam.gaze_on_screen,
-                "head_motion": cam.head_motion,
-            }
-        )
+        self.requested = []
+        self._tick_fields = []
+        self.request_features(features)
 
+        # semantic transitions: python rows for O(1) scalar lookups per tick
+        self._dist = DIST_MATRIX.tolist()
+        # kept across reset() so a switch on the window boundary still counts
+        self._prev_ctx_id = None
 
-    def is_complete(self) -> bool:
-        return (time.time() - self.start_ts) >= self.window_sec
+        self.reset()
 
-    # --------------------------------------------------
-    # Aggregation helpers
-    # --------------------------------------------------
+    def request_features(self, names: Optional[Iterable[str]] = None, replace: bool = False):
+        """
+        Add features a consumer needs (None = every registered feature).
+        Takes effect fully from the next window.
+        """
+        names = registry.FEATURE_NAMES if names is None else list(names)
+        current = [] if replace else self.requested
+        wanted = set(current) | set(names)
+        self.requested = [n for n in registry.FEATURE_NAMES if n in wanted]
+        self._tick_fields = [(f, registry.TICK_FIELDS[f]) for f in registry.tick_fields_for(self.requested)]
+
+    # `now` defaults to the wall clock; replays (ml.backfill) pass tick time.
+
+    def reset(self, now: Optional[float] = None):
+        self.start_ts = time.time() if now is None else now
+        self.num_samples = 0
+        # tick field -> values, one float64 per sample (no float objects kept)
+        self.columns = {f: array("d") for f, _ in self._tick_fields}
+
+        # incremental per-window context counters (updated in add_sample)
+        self.transitions = np.zeros((NUM_CONTEXTS, NUM_CONTEXTS), dtype=np.int32)
+        self.dwell = [0] * NUM_CONTEXTS
+        self.switch_cost = 0.0
+
+    def add_sample(self, sample: Optional[dict] = None, *, context_id: int, **fields):
+        """
+        sample keys: input_f, window_f, browser_intent, ctx_state, cam,
+        is_browser, is_on_primary, app_changed, ts
+
+        The tick loop passes one dict it refills every tick; keyword
+        arguments are accepted too. Only values are read, nothing is kept.
+        """
+        if sample is None:
+            sample = fields
+        prev = self._prev_ctx_id
+        if prev is not None:
+            self.transitions[prev, context_id] += 1
+            self.switch_cost += self._dist[prev][context_id]
+        self._prev_ctx_id = context_id
+        self.dwell[context_id] += 1
+
+        columns = self.columns
+        for name, getter in self._tick_fields:
+            col = columns.get(name)
+            if col is None:  # field requested mid-window
+                col = columns[name] = array("d", bytes(8 * self.num_samples))
+            col.append(getter(sample))
+        self.num_samples += 1
+
+    def get_state(self) -> dict:
+        return {
+            "start_ts": self.start_ts,
+            "num_samples": self.num_samples,
+            "columns": {k: list(v) for k, v in self.columns.items()},
+            "transitions": self.transitions.tolist(),
+            "dwell": list(self.dwell),
+            "switch_cost": self.switch_cost,
+            "prev_ctx_id": self._prev_ctx_id,
+        }
 
-    def _mean(self, key):
-        vals = [s[key] for s in self.samples]
-        return float(np.mean(vals)) if vals else 0.0
+    def set_state(self, state: dict):
+        """Resume a half-filled window, unless it expired while we were down."""
+        self._prev_ctx_id = state["prev_ctx_id"]
+        if time.time() - state["start_ts"] >= self.window_sec:
+            self.reset()
+            return
+        transitions = np.asarray(state["transitions"], dtype=np.int32)
+        if transitions.shape != self.transitions.shape:
+            self.reset()  # context set changed since the checkpoint
+            return
+
+        n = state["num_samples"]
+        self.start_ts = state["start_ts"]
+        self.num_samples = n
+        self.columns = {
+            f: array("d", state["columns"].get(f, [0.0] * n)) for f, _ in self._tick_fields
+        }
+        self.transitions = transitions
+        self.dwell = list(state["dwell"])
+        self.switch_cost = state["switch_cost"]
 
-    def _std(self, key):
-        vals = [s[key] for s in self.samples]
-        return float(np.std(vals)) if len(vals) > 1 else 0.0
+    def is_complete(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return (now - self.start_ts) >= self.window_sec
 
     # --------------------------------------------------
     # Main aggregation
     # --------------------------------------------------
 
-    def aggregate(self, *, session_start_ts: float, last_break_ts: float) -> dict:
-        duration = time.time() - self.start_ts
-
-        idle_streak = 0
-        longest_idle_streak = 0
-
-        for s in self.samples:
-            if s["idle_ratio"] > 0.9:
-                idle_streak += 1
-                longest_idle_streak = max(longest_idle_streak, idle_streak)
-            else:
-                idle_streak = 0
-
-        percent_on_primary = np.mean([s["is_on_primary"] for s in self.samples])
-
-        browser_samples = [s for s in self.samples if s["is_browser"]]
-        doomscroll_duration = sum(
-            1 for s in browser_samples if s["doomscroll_prob"] > 0.7
+    def aggregate(self, *, session_start_ts: float, last_break_ts: float, now: Optional[float] = None) -> dict:
+        ctx = registry.WindowContext(
+            self,
+            now=time.time() if now is None else now,
+            session_start_ts=session_start_ts,
+            last_break_ts=last_break_ts,
         )
-
-        fragmentation = self._mean("app_switch_rate")
-        num_context_switches = sum(1 for s in self.samples if s["app_changed"])
-        fragmentation_score = (
-            num_context_switches / duration if duration > 0 else 0.0
-        )
-        return {
-            "window_start_ts": self.start_ts,
-            "window_duration": duration,
-
-            "keys_mean": self._mean("keys"),
-            "keys_std": self._std("keys"),
-            "mouse_mean": self._mean("mouse"),
-            "idle_ratio_mean": self._mean("idle_ratio"),
-            "longest_idle_streak": float(longest_idle_streak),
-
-            "percent_time_on_primary": float(percent_on_primary),
-            "num_context_switches": num_context_switches,
-            "fragmentation_score": fragmentation_score,
-            "time_away_from_primary": float(duration * (1 - percent_on_primary)),
-
-            "percent_browser_time": float(len(browser_samples) / max(len(self.samples), 1)),
-            "doomscroll_prob_mean": self._mean("doomscroll_prob"),
-            "doomscroll_duration": float(doomscroll_duration),
-
-            "face_present_ratio": self._mean("face_present"),
-            "gaze_on_screen_ratio": self._mean("gaze_on_screen"),
-            "head_motion_mean": self._mean("head_motion"),
-
-            "session_elapsed_time": float(time.time() - session_start_ts),
-            "time_since_last_break": float(time.time() - last_break_ts),
-        }
-
+        return registry.compute(ctx, self.requested)
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from features.rolling import RollingWindow
 import math
 
-@dataclass
+@dataclass(slots=True)
 class WindowFeatures:
     app_switch_rate: float
     focus_streak: int
@@ -27,6 +27,19 @@ class WindowFeatureExtractor:
         else:
             self.focus_streak += 1
 
+    def get_state(self) -> dict:
+        return {
+            "app_switches": self.app_switches.get_state(),
+            "title_changes": self.title_changes.get_state(),
+            "focus_streak": self.focus_streak,
+        }
+
+    def set_state(self, state: dict, elapsed: int = 0):
+        self.app_switches.set_state(state["app_switches"], elapsed)
+        self.title_changes.set_state(state["title_changes"], elapsed)
+        # we can't know whether the app changed while we were down
+        self.focus_streak = state["focus_streak"] if elapsed < self.app_switches.values.maxlen else 0
+
     def extract(self) -> WindowFeatures:
         return WindowFeatures(
             app_switch_rate=self.app_switches.mean() * 60,  
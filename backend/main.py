@@ -1,11 +1,14 @@
 import asyncio
 import json
+import os
+import threading
 import time
 import uuid
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from dataclasses import dataclass, asdict, fields, replace
 from datetime import datetime, timezone
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from context_engine.taxonomy import is_primary_context
@@ -13,10 +16,17 @@ from context_engine.taxonomy import is_primary_context
 # Collectors (raw signals)
 # ===============================
 
-from collectors.input_collector import InputCollector
-from collectors.window_collector import WindowCollector  # OS window
 from collectors.browser_collector import BrowserCollector
-from collectors.camera_collector import CameraCollector
+
+if os.environ.get("EARNBREAK_FAKE_COLLECTORS"):
+    # headless runs (runtime.loadtest): no OS hooks, no camera
+    from collectors.fake_collectors import FakeCameraCollector as CameraCollector
+    from collectors.fake_collectors import FakeInputCollector as InputCollector
+    from collectors.fake_collectors import FakeWindowCollector as WindowCollector
+else:
+    from collectors.input_collector import InputCollector
+    from collectors.window_collector import WindowCollector  # OS window
+    from collectors.camera_collector import CameraCollector
 
 # ===============================
 # Feature extractors (per-tick)
@@ -30,7 +40,8 @@ from features.browser_intent import BrowserIntentEngine
 # Context
 # ===============================
 
-from context_engine.taxonomy import map_to_context
+from context_engine.symbols import symbols
+from context_engine.taxonomy import BREAK, context_id, map_ids_to_context, rule_store
 
 # ===============================
 # Time-window pipeline (NEW)
@@ -38,35 +49,283 @@ from context_engine.taxonomy import map_to_context
 
 from features.time_window_aggregator import TimeWindowAggregator
 from ml.time_window_logger import TimeWindowLogger
-from ml.time_window_schema import TimeWindowFeatureRow
+from ml.time_window_schema import TimeWindowFeatureRow, feature_names
+from ml.inference import InferenceEngine
+from ml.online_learner import OnlineLearner
+from ml.raw_archive import RawArchiveWriter
+from ml.rollups import ROLLUP_COLUMNS, RollupEngine
+from runtime.state_checkpoint import StateCheckpointer
+from runtime.agent import IngestClient
+from runtime import log
+from runtime.duty_cycle import ACTIVE, SUSPENDED, DutyCycleController
+from runtime.live_stream import LiveStream
+from runtime.profiling import CProfileSession, MemoryTracker, SamplingProfiler
+from runtime.ws_broadcast import Broadcaster
 
 
 # =====================================================
 # GLOBAL STATE
 # =====================================================
 
+log.setup(level=os.environ.get("EARNBREAK_LOG_LEVEL", "INFO"))
+
 SESSION_ID = str(uuid.uuid4())
 SESSION_START_TS = time.time()
 LAST_BREAK_TS = SESSION_START_TS
 
-TIME_WINDOW_SEC = 60
+TIME_WINDOW_SEC = int(os.environ.get("EARNBREAK_TIME_WINDOW_SEC", "60"))
+# pipeline tick period; only shortened for load tests
+TICK_SEC = float(os.environ.get("EARNBREAK_TICK_SEC", "1"))
 
 # =====================================================
 # COLLECTORS & ENGINES
 # =====================================================
 
-input_collector = InputCollector()
+# reduced-cost input hooks: keystrokes + OS idle time only, no mouse-move
+# hook (mouse_distance is then always 0, so keep it off for model training)
+input_collector = InputCollector(track_mouse=not os.environ.get("EARNBREAK_REDUCED_INPUT"))
 os_window_collector = WindowCollector()
 browser_collector = BrowserCollector()
-camera_collector = CameraCollector(camera_index=0, fps=10)
+CAMERA_FPS = 10
+LOW_POWER_CAMERA_FPS = 2
+camera_collector = CameraCollector(camera_index=0, fps=CAMERA_FPS)
 
 input_fx = InputFeatureExtractor()
 os_window_fx = WindowFeatureExtractor()
 
 browser_intent_engine = BrowserIntentEngine()
 
-time_window_agg = TimeWindowAggregator(TIME_WINDOW_SEC)
+time_window_agg = TimeWindowAggregator(TIME_WINDOW_SEC, features=())
+# refilled every tick and handed to add_sample (which keeps only values)
+_sample = {"ctx_state": None}
+# refilled every tick: the archive encodes it on the spot (the ingest
+# client, which queues ticks, gets a copy)
+_raw_tick = {}
 time_window_logger = TimeWindowLogger()
+raw_archive = RawArchiveWriter()
+
+# agent mode: also stream raw ticks to a central server (runtime.ingest)
+INGEST_SERVER = os.environ.get("EARNBREAK_INGEST_SERVER")
+ingest_client = IngestClient(INGEST_SERVER) if INGEST_SERVER else None
+
+# derived from the columnar dataset, kept up to date as windows complete;
+# checkpointed so a restart only replays the windows logged since
+rollups = RollupEngine()
+rollup_checkpointer = StateCheckpointer("data/rollups.bin", interval=300.0)
+
+
+def restore_rollups():
+    loaded = rollup_checkpointer.load()
+    if loaded is not None and rollups.set_state(loaded[0]):
+        rollups.rebuild_from(time_window_logger.columnar_path, since_ts=rollups.through_ts)
+    else:
+        rollups.rebuild_from(time_window_logger.columnar_path)
+
+
+restore_rollups()
+
+inference_engine = InferenceEngine()
+online_learner = OnlineLearner()
+if online_learner.ready:
+    online_learner.apply_to(inference_engine)
+
+# Consumers of the window features. The logger writes full rows, so in
+# practice every registered feature is computed (see features.registry).
+time_window_agg.request_features(feature_names())              # logger: full rows
+time_window_agg.request_features(online_learner.features)      # labels -> learner
+time_window_agg.request_features(inference_engine.features)    # model
+time_window_agg.request_features(["window_start_ts"] + ROLLUP_COLUMNS)  # /history
+
+# =====================================================
+# DUTY CYCLING (active / low_power / suspended)
+# =====================================================
+
+# low_power: the OS window is polled every Nth tick
+LOW_POWER_WINDOW_EVERY = 5
+
+_suspended_at: Optional[float] = None
+_last_ctx = ""
+_last_os_win = None
+_window_poll_age = 0
+_last_browser_intent = None
+_last_browser_ts = 0.0
+
+
+def apply_power_state(old: str, new: str):
+    global _suspended_at
+
+    if new == SUSPENDED:
+        camera_collector.pause()
+        _suspended_at = time.time()
+    else:
+        camera_collector.set_fps(CAMERA_FPS if new == ACTIVE else LOW_POWER_CAMERA_FPS)
+        if old == SUSPENDED:
+            camera_collector.resume()
+    log.event("power.state", f"{old} -> {new}", old=old, new=new)
+
+
+duty_cycle = DutyCycleController(on_change=apply_power_state)
+
+
+def resume_after_suspend():
+    """Same gap handling as a warm restart (ml backfill replays it alike)."""
+    global _suspended_at, _last_os_win
+
+    gap = time.time() - (_suspended_at or time.time())
+    _suspended_at = None
+    _last_os_win = None
+
+    elapsed = int(gap)
+    input_fx.set_state(input_fx.get_state(), elapsed)
+    os_window_fx.set_state(os_window_fx.get_state(), elapsed)
+    browser_intent_engine.set_state(browser_intent_engine.get_state())
+    browser_collector.activity_and_reset()  # tab activity while suspended
+    if time_window_agg.is_complete():
+        time_window_agg.reset()  # the window expired while suspended
+
+
+# =====================================================
+# LIVE STREAM (per-client queues, pending labels)
+# =====================================================
+
+broadcaster = Broadcaster()
+# topic subscriptions (live_state / features / predictions / metrics)
+live_stream = LiveStream(broadcaster)
+
+# completed windows waiting for a human label, oldest first:
+# request_id -> (features, encoded label_request frame)
+pending_labels: Dict[int, tuple] = {}
+MAX_PENDING_LABELS = 32
+_last_label_request_id = 0
+
+# last model prediction, shown in live_state
+last_pred = None
+
+
+def log_window(features: dict, label: str, label_source: str):
+    time_window_logger.log(
+        TimeWindowFeatureRow(
+            session_id=SESSION_ID,
+            **features,
+            label=label,
+            label_source=label_source,
+        )
+    )
+
+
+def request_label(features: dict, pred, request_id: Optional[int] = None):
+    """Queue a window for labelling and ask every client; never waits."""
+    global _last_label_request_id
+
+    if request_id is None:
+        _last_label_request_id += 1
+        request_id = _last_label_request_id
+    frame = json.dumps(
+        {
+            "type": "label_request",
+            "request_id": request_id,
+            "features": features,
+            "prediction": asdict(pred) if pred else None,
+        }
+    )
+    pending_labels[request_id] = (features, frame)
+    broadcaster.publish("label_request", frame, coalesce=False)
+
+    # nobody is answering: keep the oldest windows, unlabeled, and tell the
+    # clients to drop them from their queues
+    while len(pending_labels) > MAX_PENDING_LABELS:
+        oldest = next(iter(pending_labels))
+        log_window(pending_labels.pop(oldest)[0], label="", label_source="unlabeled")
+        publish_label_resolved(oldest)
+
+
+def submit_label(label: str, request_id: Optional[int] = None):
+    # clients that don't send a request_id answer the oldest request
+    if request_id is None:
+        if not pending_labels:
+            return
+        request_id = next(iter(pending_labels))
+    entry = pending_labels.pop(request_id, None)
+    if entry is None:
+        return  # already answered by another client, or expired
+    features = entry[0]
+
+    # online learning from human labels only
+    online_learner.learn(features, label)
+    online_learner.maybe_checkpoint()
+    if online_learner.ready:
+        online_learner.apply_to(inference_engine)
+
+    log_window(features, label=label, label_source="human")
+    publish_label_resolved(request_id)
+
+
+def publish_label_resolved(request_id: int):
+    broadcaster.publish(
+        "label_resolved",
+        json.dumps({"type": "label_resolved", "request_id": request_id}),
+        coalesce=False,
+    )
+
+
+# =====================================================
+# WARM RESTART (state snapshot / restore)
+# =====================================================
+
+# beyond this gap a restart starts a fresh session
+MAX_RESUME_GAP_SEC = 30 * 60
+
+state_checkpointer = StateCheckpointer()
+
+
+def pipeline_state() -> dict:
+    return {
+        "session_id": SESSION_ID,
+        "session_start_ts": SESSION_START_TS,
+        "last_break_ts": LAST_BREAK_TS,
+        "input_fx": input_fx.get_state(),
+        "os_window_fx": os_window_fx.get_state(),
+        "browser_intent": browser_intent_engine.get_state(),
+        "time_window_agg": time_window_agg.get_state(),
+        "camera": camera_collector.get_state(),
+        "pending_labels": [[rid, features] for rid, (features, _) in pending_labels.items()],
+    }
+
+
+def restore_pipeline_state():
+    global SESSION_ID, SESSION_START_TS, LAST_BREAK_TS, _last_label_request_id
+
+    loaded = state_checkpointer.load()
+    if loaded is None:
+        return
+    state, gap = loaded
+    if gap > MAX_RESUME_GAP_SEC:
+        log.event("state.stale", f"pipeline state is {gap:.0f}s old, starting fresh", gap_sec=round(gap, 1))
+        return
+
+    try:
+        # 1 tick per second: the gap is how many ticks we missed
+        elapsed = int(gap)
+        input_fx.set_state(state["input_fx"], elapsed)
+        os_window_fx.set_state(state["os_window_fx"], elapsed)
+        browser_intent_engine.set_state(state["browser_intent"])
+        time_window_agg.set_state(state["time_window_agg"])
+        camera_collector.set_state(state["camera"])
+        for rid, features in state.get("pending_labels", []):
+            request_label(features, None, request_id=rid)
+
+        _last_label_request_id = max(pending_labels, default=0)
+        SESSION_ID = state["session_id"]
+        SESSION_START_TS = state["session_start_ts"]
+        LAST_BREAK_TS = state["last_break_ts"]
+    except (KeyError, TypeError, ValueError) as e:
+        log.event("state.incompatible", f"ignoring incompatible pipeline state: {e}", level="WARNING")
+        return
+
+    log.event("state.restored", "restored pipeline state", gap_sec=round(gap, 1))
+
+
+restore_pipeline_state()
 
 # =====================================================
 # FASTAPI SETUP
@@ -83,25 +342,52 @@ app.add_middleware(
 )
 
 
+pipeline_task: Optional[asyncio.Task] = None
+# thread running the event loop (and so the tick loop), for the sampler
+_loop_thread_ident: Optional[int] = None
+
+
 @app.on_event("startup")
-def startup():
-    print("Starting collectors...")
+async def startup():
+    global pipeline_task, _loop_thread_ident
+
+    log.event("app.start", "starting collectors", session_id=SESSION_ID)
     input_collector.start()
     camera_collector.start()
+    rule_store.start_watching()
+    if ingest_client:
+        ingest_client.start()
+    _loop_thread_ident = threading.get_ident()
+    pipeline_task = asyncio.create_task(pipeline_loop())
 
 
 @app.on_event("shutdown")
-def shutdown():
-    print("Stopping collectors...")
+async def shutdown():
+    log.event("app.stop", "stopping collectors")
+    if pipeline_task:
+        pipeline_task.cancel()
+        try:
+            await pipeline_task
+        except asyncio.CancelledError:
+            pass
     input_collector.stop()
     camera_collector.stop()
+    rule_store.stop_watching()
+    time_window_logger.close()
+    raw_archive.close()
+    if ingest_client:
+        ingest_client.close()
+    online_learner.checkpoint(wait=True)
+    state_checkpointer.save(pipeline_state(), wait=True)
+    rollup_checkpointer.save(rollups.get_state(), wait=True)
+    log.shutdown()
 
 
 # =====================================================
 # MODELS
 # =====================================================
 
-@dataclass
+@dataclass(slots=True)
 class LiveState:
     ts: str
 
@@ -117,12 +403,31 @@ class LiveState:
     gaze_on_screen: float
     head_motion: float
 
+    # last completed window, scored by the in-process model ("" if no model)
+    predicted_label: str
+    prediction_confidence: float
+    inference_latency_us: float
+
+
+# the live_state frame (LiveState's fields), refilled every tick: live_stream
+# keeps its own copy and the legacy frame is encoded on the spot
+_live = dict.fromkeys(f.name for f in fields(LiveState))
+
 
 class BrowserEvent(BaseModel):
     domain: str
     title: str
     scroll_count: int = 0
     key_count: int = 0
+    # per-tab event times (epoch ms) since the extension's previous POST;
+    # absent from older extensions (then the counters are used)
+    tab_id: int = 0
+    scroll_ts: Optional[List[float]] = None
+    key_ts: Optional[List[float]] = None
+    # tab activity since the previous POST (newer extensions)
+    tab_switches: Optional[int] = None
+    closed_tabs: List[int] = []
+    audible_tabs: List[int] = []
 
 
 # =====================================================
@@ -134,6 +439,22 @@ def health():
     return {"ok": True}
 
 
+@app.get("/history")
+async def history(start: float, end: Optional[float] = None, resolution: str = "auto"):
+    """
+    Focus / context / doomscroll history between two unix timestamps.
+    resolution: "minute" | "hour" | "day" | "auto" (finest that fits).
+    Runs on the event loop: the rollups are only mutated there.
+    """
+    end = end if end is not None else time.time()
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must be >= start")
+    try:
+        return rollups.query(start, end, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/telemetry/browser")
 def browser_telemetry(ev: BrowserEvent):
     browser_collector.update(
@@ -141,141 +462,444 @@ def browser_telemetry(ev: BrowserEvent):
         ev.title,
         ev.scroll_count,
         ev.key_count,
+        tab_id=ev.tab_id,
+        scroll_ts=[t / 1000.0 for t in ev.scroll_ts] if ev.scroll_ts is not None else None,
+        key_ts=[t / 1000.0 for t in ev.key_ts] if ev.key_ts is not None else None,
+        tab_switches=ev.tab_switches,
+        closed_tabs=ev.closed_tabs,
+        audible_tabs=ev.audible_tabs,
     )
     return {"ok": True}
 
 
-@app.websocket("/ws")
-async def ws_endpoint(ws: WebSocket):
-    await ws.accept()
-
-    try:
-        while True:
-            # -------------------------
-            # Collect raw snapshots
-            # -------------------------
+@app.get("/metrics/ws")
+async def ws_metrics():
+    """Per-client queue depth, lag and dropped (coalesced) frames, topic groups."""
+    return {
+        **broadcaster.stats(),
+        **live_stream.stats(),
+        "pending_labels": len(pending_labels),
+    }
 
-            inp = input_collector.snapshot_and_reset()
-            os_win = os_window_collector.snapshot()
 
-            input_fx.update(inp)
-            os_window_fx.update(os_win)
+@app.get("/metrics/power")
+async def power_metrics():
+    """Current duty-cycle state and time spent in each state."""
+    return duty_cycle.stats()
 
-            input_f = input_fx.extract()
-            os_window_f = os_window_fx.extract()
 
-            # -------------------------
-            # Browser intent (only if browser)
-            # -------------------------
+@app.websocket("/ws")
+async def ws_endpoint(ws: WebSocket):
+    await ws.accept()
 
-            browser_snap = browser_collector.snapshot()
-            if os_win.is_browser:
-                browser_intent_engine.update(browser_snap)
-                browser_intent = browser_intent_engine.infer(browser_snap)
-            else:
-                browser_intent = browser_intent_engine.neutral()
+    client = broadcaster.connect(ws)
+    log.event("ws.connect", client=client.client_id)
+    # label requests raised while nobody was connected (or before a reconnect)
+    for _, frame in list(pending_labels.values()):
+        client.put("label_request", frame, coalesce=False)
 
-            print(browser_intent.doomscroll_prob)
+    try:
+        while True:
+            msg = await ws.receive_json()
+            kind = msg.get("type")
+            if kind == "subscribe":
+                try:
+                    reply = live_stream.subscribe(client, msg.get("topics", {}), msg.get("encoding", "json"))
+                except (TypeError, ValueError) as e:
+                    reply = {"type": "error", "detail": str(e)}
+                client.put("control", json.dumps(reply), coalesce=False)
+            elif kind == "resync":
+                live_stream.resync(client)
+            elif "label" in msg:
+                submit_label(msg["label"], msg.get("request_id"))
+    except WebSocketDisconnect:
+        log.event("ws.disconnect", client=client.client_id)
+    finally:
+        live_stream.unsubscribe(client)
+        broadcaster.disconnect(client)
 
-            # -------------------------
-            # Context (semantic only)
-            # -------------------------
 
-            semantic_ctx = map_to_context(
-                app=os_win.app,
-                window_title=os_win.title,
-                browser_category=browser_intent.category,
-                is_browser=os_win.is_browser,
-            )
+# =====================================================
+# ADMIN (on-demand profiling, local clients only)
+# =====================================================
 
-            is_on_primary = semantic_ctx == "primary"
-            
-
-            is_on_primary = is_primary_context(semantic_ctx)
-            # -------------------------
-            # Camera
-            # -------------------------
-
-            cam = camera_collector.snapshot()
-
-            # -------------------------
-            # Add sample to TIME WINDOW
-            # -------------------------
-            time_window_agg.add_sample(
-                input_f=input_f,
-                window_f=os_window_f,
-                browser_intent=browser_intent,
-                ctx_state=None,
-                cam=cam,
-                is_browser=os_win.is_browser,
-                is_on_primary=is_on_primary,
-                app_changed=os_win.app_changed,
-                ts=time.time(),
+MAX_PROFILE_SEC = 300
+
+cprofile_session = CProfileSession()
+memory_tracker = MemoryTracker()
+_profile_lock = asyncio.Lock()
+
+
+def require_local(request: Request):
+    if request.client is None or request.client.host not in ("127.0.0.1", "::1", "localhost"):
+        raise HTTPException(status_code=403, detail="admin endpoints are local-only")
+
+
+def _profiled_threads() -> Dict[str, int]:
+    threads = {t.name: t.ident for t in threading.enumerate() if t.name == "camera" and t.ident}
+    if _loop_thread_ident is not None:
+        threads["tick_loop"] = _loop_thread_ident
+    return threads
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_local)])
+async def admin_profile(
+    seconds: float = 10.0,
+    mode: str = "sampling",
+    format: Optional[str] = None,
+    interval_ms: float = 5.0,
+    sort: str = "cumulative",
+):
+    """
+    Profile for `seconds`.
+    mode=sampling  -> tick loop and camera thread, collapsed stacks
+                      (format=collapsed, the default)
+    mode=cprofile  -> tick loop only, pstats file (format=pstats, the
+                      default) or format=text
+    """
+    if not 0 < seconds <= MAX_PROFILE_SEC:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_PROFILE_SEC}]")
+    if mode not in ("sampling", "cprofile"):
+        raise HTTPException(status_code=400, detail="mode must be sampling or cprofile")
+    format = format or ("collapsed" if mode == "sampling" else "pstats")
+    if (mode, format) not in (("sampling", "collapsed"), ("cprofile", "pstats"), ("cprofile", "text")):
+        raise HTTPException(status_code=400, detail=f"format {format!r} not available for {mode}")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="a profile is already running")
+
+    async with _profile_lock:
+        if mode == "sampling":
+            sampler = SamplingProfiler(_profiled_threads(), interval=interval_ms / 1000.0)
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                await asyncio.to_thread(sampler.stop)
+            return Response(
+                sampler.collapsed(),
+                media_type="text/plain",
+                headers={"Content-Disposition": "attachment; filename=profile.collapsed"},
             )
 
-            # -------------------------
-            # If TIME WINDOW is complete → ask for label
-            # -------------------------
+        cprofile_session.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stats = await asyncio.to_thread(cprofile_session.stop)
+        if cprofile_session.error:
+            raise HTTPException(status_code=503, detail=f"cProfile unavailable: {cprofile_session.error}")
+        if stats is None:
+            raise HTTPException(status_code=503, detail="no tick finished profiling during the capture")
+        if format == "text":
+            return Response(CProfileSession.report(stats, sort=sort), media_type="text/plain")
+        return Response(
+            CProfileSession.dump(stats),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": "attachment; filename=profile.pstats"},
+        )
+
+
+@app.post("/admin/memory/start", dependencies=[Depends(require_local)])
+def admin_memory_start(frames: int = 10):
+    """Start tracemalloc (allocations before this are not traced)."""
+    memory_tracker.start(frames)
+    return memory_tracker.snapshot()
+
+
+@app.post("/admin/memory/snapshot", dependencies=[Depends(require_local)])
+def admin_memory_snapshot():
+    try:
+        return memory_tracker.snapshot()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-            if time_window_agg.is_complete():
-                features = time_window_agg.aggregate(
-                    session_start_ts=SESSION_START_TS,
-                    last_break_ts=LAST_BREAK_TS,
-                )
 
-                # Ask frontend for label
-                await ws.send_text(
-                    json.dumps(
-                        {
-                            "type": "label_request",
-                            "features": features,
-                        }
-                    )
-                )
+@app.get("/admin/memory/diff", dependencies=[Depends(require_local)])
+def admin_memory_diff(base: int, current: Optional[int] = None, group_by: str = "lineno", limit: int = 30):
+    """Allocation growth between two snapshots (current defaults to a new one)."""
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    try:
+        if current is None:
+            current = memory_tracker.snapshot()["id"]
+        return memory_tracker.diff(base, current, group_by=group_by, limit=limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/admin/memory/stop", dependencies=[Depends(require_local)])
+def admin_memory_stop():
+    memory_tracker.stop()
+    return {"ok": True}
 
-                label_msg = await ws.receive_json()
-                label = label_msg["label"]
 
-                time_window_logger.log(
-                    TimeWindowFeatureRow(
-                        **features,
-                        label=label,
-                    )
-                )
+@app.post("/admin/log", dependencies=[Depends(require_local)])
+async def admin_log(level: Optional[str] = None, traces: Optional[bool] = None, trace_every: Optional[int] = None):
+    """Switch the log level and per-tick traces (kept 1 in trace_every)."""
+    if level is not None:
+        try:
+            log.set_level(level)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if traces is not None or trace_every is not None:
+        log.set_traces(log.traces.enabled if traces is None else traces, trace_every)
+    return log.stats()
 
-                time_window_agg.reset()
 
-            # -------------------------
-            # Lightweight live UI state
-            # -------------------------
+# =====================================================
+# PIPELINE (1 Hz tick loop, independent of clients)
+# =====================================================
 
-            live_state = LiveState(
-                ts=datetime.now(timezone.utc).isoformat(),
+# app / title / domain symbols unused for two of these periods are dropped
+SYMBOL_PRUNE_SEC = 10 * 60
+
+
+async def pipeline_loop():
+    late = 0.0
+    last_prune = time.monotonic()
+    while True:
+        t0 = time.perf_counter()
+        try:
+            cprofile_session.run(tick)
+        except Exception:
+            log.event("pipeline.error", "tick failed", level="ERROR", exc=True)
+
+        if live_stream.has_subscribers("metrics"):
+            live_stream.publish("metrics", pipeline_metrics(time.perf_counter() - t0, late))
+
+        state_checkpointer.maybe_save(pipeline_state)
+        rollup_checkpointer.maybe_save(rollups.get_state)
+
+        if time.monotonic() - last_prune >= SYMBOL_PRUNE_SEC:
+            symbols.prune()
+            last_prune = time.monotonic()
+
+        # how late the loop wakes up is the event loop's own backlog
+        due = time.perf_counter() + TICK_SEC
+        await asyncio.sleep(TICK_SEC)
+        late = max(0.0, time.perf_counter() - due)
+
+
+def pipeline_metrics(tick_sec: float, late_sec: float = 0.0) -> dict:
+    return {
+        "tick_ms": round(tick_sec * 1000, 2),
+        "loop_late_ms": round(late_sec * 1000, 2),
+        "clients": len(broadcaster.clients),
+        "pending_labels": len(pending_labels),
+        "frames_dropped": sum(c.dropped for c in broadcaster.clients.values()),
+        "clients_evicted": broadcaster.evicted,
+        "windows_dropped": time_window_logger.dropped,
+        "window_write_errors": time_window_logger.failed,
+        "inference_latency_us": round(last_pred.latency_us, 1) if last_pred else 0.0,
+        "power_state": duty_cycle.state,
+        "symbols": len(symbols),
+    }
+
+
+def tick():
+    global last_pred, _last_ctx, _last_os_win, _window_poll_age, _last_browser_intent, _last_browser_ts
+
+    # -------------------------
+    # Duty cycle: idle time + face decide how much of the tick runs
+    # -------------------------
+
+    inp = input_collector.snapshot_and_reset()
+    cam = camera_collector.snapshot_and_reset()
+
+    was_suspended = duty_cycle.state == SUSPENDED
+    power = duty_cycle.update(inp.idle_seconds, cam.face_present_max, on_break=_last_ctx == BREAK)
+    if power == SUSPENDED:
+        return
+    if was_suspended:
+        resume_after_suspend()
+    full_rate = power == ACTIVE
+
+    # -------------------------
+    # Collect raw snapshots
+    # -------------------------
+
+    if full_rate or _last_os_win is None or _window_poll_age >= LOW_POWER_WINDOW_EVERY - 1:
+        os_win = os_window_collector.snapshot()
+        _last_os_win = os_win
+        _window_poll_age = 0
+    else:
+        # low power: same window as last poll, nothing changed
+        os_win = replace(_last_os_win, app_changed=False, title_changed=False)
+        _window_poll_age += 1
+
+    input_fx.update(inp)
+    os_window_fx.update(os_win)
+
+    input_f = input_fx.extract()
+    os_window_f = os_window_fx.extract()
+
+    # -------------------------
+    # Browser intent (only if browser)
+    # -------------------------
+
+    browser_snap = browser_collector.snapshot()
+    tabs = browser_collector.activity_and_reset()
+    # outside the browser every playing tab is in the background
+    background_media = tabs.background_audible_sec if os_win.is_browser else tabs.audible_sec
+    if not os_win.is_browser:
+        browser_intent = browser_intent_engine.neutral()
+        _last_browser_intent = None
+    elif full_rate or _last_browser_intent is None or browser_snap.ts != _last_browser_ts:
+        browser_intent_engine.update(browser_snap)
+        browser_intent = browser_intent_engine.infer(browser_snap)
+        _last_browser_intent = browser_intent
+        _last_browser_ts = browser_snap.ts
+    else:
+        # low power: no new telemetry since the last inference
+        browser_intent = _last_browser_intent
+
+    # -------------------------
+    # Context (semantic only)
+    # -------------------------
+
+    semantic_ctx = map_ids_to_context(
+        os_win.app_id,
+        os_win.title_id,
+        browser_intent.category,
+        os_win.is_browser,
+    )
 
-                active_app=os_win.app,
-                active_title=os_win.title,
-                active_is_browser=os_win.is_browser,
+    is_on_primary = semantic_ctx == "primary"
+    
+
+    is_on_primary = is_primary_context(semantic_ctx)
+    _last_ctx = semantic_ctx
+
+    # -------------------------
+    # Raw per-tick archive
+    # -------------------------
+
+    raw_tick = _raw_tick
+    raw_tick["ts"] = time.time()
+    raw_tick["session_id"] = SESSION_ID
+    raw_tick["keystrokes"] = inp.keystrokes
+    raw_tick["mouse_distance"] = inp.mouse_distance
+    raw_tick["idle_seconds"] = inp.idle_seconds
+    raw_tick["app"] = os_win.app
+    raw_tick["title"] = os_win.title
+    raw_tick["is_browser"] = os_win.is_browser
+    raw_tick["app_changed"] = os_win.app_changed
+    raw_tick["title_changed"] = os_win.title_changed
+    raw_tick["domain"] = browser_snap.domain
+    raw_tick["browser_title"] = browser_snap.title
+    raw_tick["scroll_count"] = browser_snap.scroll_count
+    raw_tick["key_count"] = browser_snap.key_count
+    raw_tick["tab_id"] = browser_snap.tab_id
+    raw_tick["scroll_events"] = tabs.scroll_events
+    raw_tick["key_events"] = tabs.key_events
+    raw_tick["tab_switches"] = tabs.tab_switches
+    raw_tick["background_media_sec"] = background_media
+    raw_tick["face_present"] = cam.face_present
+    raw_tick["gaze_on_screen"] = cam.gaze_on_screen
+    raw_tick["head_motion"] = cam.head_motion
+    raw_tick["blink_rate_60s"] = cam.blink_rate_60s
+    raw_tick["yawn_prob"] = cam.yawn_prob
+    raw_archive.append(raw_tick)
+    if ingest_client:
+        ingest_client.send(dict(raw_tick))
+
+    # -------------------------
+    # Add sample to TIME WINDOW
+    # -------------------------
+    sample = _sample
+    sample["input_f"] = input_f
+    sample["window_f"] = os_window_f
+    sample["browser_intent"] = browser_intent
+    sample["cam"] = cam
+    sample["is_browser"] = os_win.is_browser
+    sample["is_on_primary"] = is_on_primary
+    sample["app_changed"] = os_win.app_changed
+    sample["tab_switches"] = tabs.tab_switches
+    sample["background_media"] = background_media
+    sample["ts"] = time.time()
+    time_window_agg.add_sample(sample, context_id=context_id(semantic_ctx))
+
+    # -------------------------
+    # If TIME WINDOW is complete → label it (model or human)
+    # -------------------------
+
+    if time_window_agg.is_complete():
+        try:
+            features = time_window_agg.aggregate(
+                session_start_ts=SESSION_START_TS,
+                last_break_ts=LAST_BREAK_TS,
+            )
 
-                browser_domain=browser_intent.domain,
-                browser_category=browser_intent.category,
-                doomscroll_prob=round(browser_intent.doomscroll_prob, 2),
+            pred = inference_engine.score(features)
+            if pred is not None:
+                last_pred = pred
 
-                face_present=round(cam.face_present, 2),
-                gaze_on_screen=round(cam.gaze_on_screen, 2),
-                head_motion=round(cam.head_motion, 2),
-            )
+            rollups.add(features)
 
-            await ws.send_text(
-                json.dumps(
-                    {
-                        "type": "live_state",
-                        "data": asdict(live_state),
-                    }
+            live_stream.publish("features", features)
+            if pred is not None:
+                live_stream.publish(
+                    "predictions",
+                    {"window_start_ts": features["window_start_ts"], **asdict(pred)},
                 )
-            )
-
-            await asyncio.sleep(1)
 
-    except WebSocketDisconnect:
-        print("WebSocket disconnected")
-        return
+            if inference_engine.is_uncertain(pred):
+                # Ask the frontend; logged once a client answers (submit_label)
+                request_label(features, pred)
+            else:
+                log_window(features, label=pred.label, label_source="model")
+        finally:
+            # a failing consumer must not keep the window (and its columns) growing
+            time_window_agg.reset()
+
+    # -------------------------
+    # Lightweight live UI state
+    # -------------------------
+
+    live = _live
+    live["ts"] = datetime.now(timezone.utc).isoformat()
+
+    live["active_app"] = os_win.app
+    live["active_title"] = os_win.title
+    live["active_is_browser"] = os_win.is_browser
+
+    live["browser_domain"] = browser_intent.domain
+    live["browser_category"] = browser_intent.category
+    live["doomscroll_prob"] = round(browser_intent.doomscroll_prob, 2)
+
+    live["face_present"] = round(cam.face_present, 2)
+    live["gaze_on_screen"] = round(cam.gaze_on_screen, 2)
+    live["head_motion"] = round(cam.head_motion, 2)
+
+    live["predicted_label"] = last_pred.label if last_pred else ""
+    live["prediction_confidence"] = round(last_pred.confidence, 2) if last_pred else 0.0
+    live["inference_latency_us"] = round(last_pred.latency_us, 1) if last_pred else 0.0
+
+    if log.traces.enabled:
+        log.traces.tick(
+            power=power,
+            keystrokes=inp.keystrokes,
+            idle_seconds=round(inp.idle_seconds, 1),
+            app=os_win.app,
+            context=semantic_ctx,
+            domain=browser_intent.domain,
+            doomscroll_prob=round(browser_intent.doomscroll_prob, 3),
+            face_present=cam.face_present,
+            window_samples=time_window_agg.num_samples,
+        )
+    live_stream.publish("live_state", live)
+
+    # legacy clients (no subscription): full frame, encoded once per tick;
+    # only the newest live_state matters to a client that is behind
+    broadcaster.publish(
+        "live_state",
+        json.dumps(
+            {
+                "type": "live_state",
+                "data": live,
+            }
+        ),
+        legacy_only=True,
+    )
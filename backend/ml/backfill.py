@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from context_engine.taxonomy import rule_store
+from features.session_pipeline import SessionPipeline
+from ml.columnar import ColumnarWriter, schema_columns
+from ml.raw_archive import decode_segment, list_segments, read_segment_bytes, read_segment_header
+from ml.time_window_schema import TimeWindowFeatureRow, feature_names
+from ml.window_query import query_windows
+
+# --------------------------------------------------
+# Bulk backfill of window features from the raw archive
+# --------------------------------------------------
+#
+# Replays archived ticks (ml.raw_archive) through the same extractors and
+# TimeWindowAggregator as the live loop in main.py, using tick timestamps as
+# the clock, and writes every window to a new versioned dataset:
+#
+#   data/datasets/v<N>/time_windows.ebcol   (+ .idx sidecar)
+#   data/datasets/v<N>/manifest.json
+#
+# Sessions are the unit of work: each worker process replays whole sessions
+# (a session's state never crosses processes), so the output does not depend
+# on the number of workers. Labels are carried over from the live dataset by
+# matching window start times within the same session.
+#
+# Usage (from backend/):
+#   python -m ml.backfill --workers 8
+
+DEFAULT_RAW_DIR = "data/raw"
+DEFAULT_OUT_DIR = "data/datasets"
+DEFAULT_LABELS = "data/time_windows.ebcol"
+
+def session_segments(raw_dir: str = DEFAULT_RAW_DIR) -> Dict[str, List[str]]:
+    """
+    session_id -> its segments in time order, from segment headers only.
+    Segments written before headers carried the session are under None.
+    """
+    out: Dict[Optional[str], List[str]] = {}
+    for path in list_segments(raw_dir):
+        try:
+            sid = read_segment_header(path).get("session_id")
+        except (OSError, ValueError):
+            continue
+        out.setdefault(sid, []).append(path)
+    return out
+
+
+def _load_labels(labels_path: Optional[str], session_id: str) -> Tuple[np.ndarray, list, list]:
+    if not labels_path or not os.path.exists(labels_path):
+        return np.empty(0), [], []
+    starts, labels, sources = [], [], []
+    for batch in query_windows(
+        labels_path,
+        session_id=session_id,
+        columns=["window_start_ts", "label", "label_source"],
+    ):
+        starts.append(batch["window_start_ts"])
+        labels.extend(batch["label"].tolist())
+        sources.extend(batch["label_source"].tolist())
+    if not starts:
+        return np.empty(0), [], []
+    starts = np.concatenate(starts)
+    order = np.argsort(starts, kind="stable")
+    return starts[order], [labels[i] for i in order], [sources[i] for i in order]
+
+
+def backfill_session(job: tuple) -> Tuple[str, List[dict], int]:
+    """
+    Worker entry point: replay one session.
+    job = (session_id, segment paths, labels dataset path, window_sec)
+    Returns (session_id, window rows, ticks replayed).
+    """
+    session_id, segments, labels_path, window_sec = job
+    rule_store.current  # compile/load the taxonomy once per process
+
+    replay = SessionPipeline(window_sec)
+    rows: List[dict] = []
+    ticks = 0
+    for path in segments:
+        for tick in decode_segment(read_segment_bytes(path)):
+            if tick["session_id"] != session_id:
+                continue
+            ticks += 1
+            features = replay.feed(tick)
+            if features is not None:
+                rows.append(features)
+
+    starts, labels, sources = _load_labels(labels_path, session_id)
+    for row in rows:
+        row["session_id"] = session_id
+        row["label"] = row["label_source"] = ""
+        if len(starts):
+            i = int(np.searchsorted(starts, row["window_start_ts"]))
+            best = min(
+                (j for j in (i - 1, i) if 0 <= j < len(starts)),
+                key=lambda j: abs(starts[j] - row["window_start_ts"]),
+            )
+            if abs(starts[best] - row["window_start_ts"]) < window_sec / 2:
+                row["label"] = labels[best]
+                row["label_source"] = sources[best]
+
+    return session_id, rows, ticks
+
+
+def _split_legacy_segments(paths: Iterable[str]) -> Dict[str, List[str]]:
+    """Segments without a session in their header: route by decoding."""
+    out: Dict[str, List[str]] = {}
+    for path in paths:
+        seen = set()
+        for tick in decode_segment(read_segment_bytes(path)):
+            sid = tick["session_id"]
+            if sid not in seen:
+                seen.add(sid)
+                out.setdefault(sid, []).append(path)
+    return out
+
+
+def _next_version_dir(out_dir: str) -> Tuple[str, int]:
+    os.makedirs(out_dir, exist_ok=True)
+    versions = [
+        int(name[1:]) for name in os.listdir(out_dir)
+        if name.startswith("v") and name[1:].isdigit()
+    ]
+    version = max(versions, default=0) + 1
+    return os.path.join(out_dir, f"v{version}"), version
+
+
+def run_backfill(
+    raw_dir: str = DEFAULT_RAW_DIR,
+    out_dir: str = DEFAULT_OUT_DIR,
+    labels_path: Optional[str] = DEFAULT_LABELS,
+    workers: Optional[int] = None,
+    window_sec: int = 60,
+) -> str:
+    """Replay every archived session and write a new dataset version. Returns its directory."""
+    t0 = time.perf_counter()
+
+    sessions = session_segments(raw_dir)
+    legacy = sessions.pop(None, [])
+    for sid, paths in _split_legacy_segments(legacy).items():
+        sessions[sid] = sorted(
+            set(sessions.get(sid, [])) | set(paths),
+            key=lambda p: int(os.path.basename(p).split(".")[0]),
+        )
+
+    # output order: by first segment, independent of scheduling
+    order = sorted(sessions, key=lambda sid: os.path.basename(sessions[sid][0]))
+    # biggest sessions first keeps the pool busy until the end
+    jobs = sorted(
+        ((sid, sessions[sid], labels_path, window_sec) for sid in order),
+        key=lambda job: -sum(os.path.getsize(p) for p in job[1]),
+    )
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        done = list(map(backfill_session, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(backfill_session, jobs))
+    results = {sid: rows for sid, rows, _ in done}
+    total_ticks = sum(ticks for _, _, ticks in done)
+
+    version_dir, version = _next_version_dir(out_dir)
+    tmp_dir = version_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    writer = ColumnarWriter(os.path.join(tmp_dir, "time_windows.ebcol"), chunk_rows=1024)
+    windows = 0
+    for sid in order:
+        for row in results[sid]:
+            writer.write_row(TimeWindowFeatureRow(**row))
+            windows += 1
+    writer.close()
+
+    elapsed = time.perf_counter() - t0
+    manifest = {
+        "version": version,
+        "created_at": time.time(),
+        "source": os.path.abspath(raw_dir),
+        "labels_from": labels_path,
+        "window_sec": window_sec,
+        "taxonomy_hash": rule_store.current.source_hash,
+        "features": feature_names(),
+        "columns": schema_columns(TimeWindowFeatureRow),
+        "sessions": len(order),
+        "ticks": total_ticks,
+        "windows": windows,
+        "workers": workers,
+        "elapsed_sec": round(elapsed, 3),
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_dir, version_dir)
+
+    print(
+        f"Backfilled {windows} windows from {total_ticks} ticks in {len(order)} sessions "
+        f"with {workers} workers in {elapsed:.1f}s ({total_ticks / max(elapsed, 1e-9):.0f} ticks/s) "
+        f"-> {version_dir}"
+    )
+    return version_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute window features from the raw archive.")
+    parser.add_argument("--raw", default=DEFAULT_RAW_DIR, help="raw archive directory")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="versioned dataset root")
+    parser.add_argument("--labels", default=DEFAULT_LABELS, help="dataset to carry labels over from ('' = none)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--window-sec", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    run_backfill(
+        raw_dir=args.raw,
+        out_dir=args.out,
+        labels_path=args.labels or None,
+        workers=args.workers,
+        window_sec=args.window_sec,
+    )
+
+
+if __name__ == "__main__":
+    main()
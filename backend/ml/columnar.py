@@ -0,0 +1,465 @@
+import json
+import mmap
+import os
+import struct
+import time
+import typing
+from dataclasses import fields
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from ml.file_rotation import rotate_out
+from ml.time_window_schema import TimeWindowFeatureRow
+
+# --------------------------------------------------
+# File layout (little endian, append-only)
+# --------------------------------------------------
+#
+#   file header:  MAGIC(8) | u32 schema_version | u32 header_len | header JSON
+#                 header JSON = {"columns": [[name, dtype], ...]}
+#
+#   chunk:        CHUNK_MAGIC(4) | u32 nrows | u64 body_len
+#                 body = column arrays (nrows fixed-width values each,
+#                        8-byte aligned, in header order)
+#                        footer JSON | u32 footer_len | FOOTER_MAGIC(4)
+#                 footer JSON = {"offsets": [...], "dict": {col: [new values]},
+#                                "ts_min": .., "ts_max": ..,
+#                                "sessions": {id: [ts_min, ts_max, rows]},
+#                                "labels": [distinct labels]}
+#
+#   sidecar index (<path>.idx): one JSON line per chunk with its position,
+#   offsets and footer summary, so readers can pick chunks by session, time
+#   range and label without touching the data file. It is only a cache of the
+#   footers: missing or trailing entries are rebuilt from the data file.
+#
+# String columns are dictionary-encoded as u32 codes. Each chunk footer only
+# carries the values first seen in that chunk, so the dictionary is rebuilt by
+# reading footers in order. A torn trailing chunk (crash mid-write) is
+# detected by its footer magic and ignored.
+
+MAGIC = b"EBCOLv1\0"
+CHUNK_MAGIC = b"EBCK"
+FOOTER_MAGIC = b"EBCF"
+
+# bump whenever TimeWindowFeatureRow changes incompatibly
+SCHEMA_VERSION = 3
+
+INDEX_SUFFIX = ".idx"
+
+_FILE_HEADER = struct.Struct("<8sII")
+_CHUNK_HEADER = struct.Struct("<4sIQ")
+_FOOTER_TRAILER = struct.Struct("<I4s")
+
+_DTYPES = {
+    float: "<f8",
+    int: "<i8",
+    bool: "<u1",
+    str: "<u4",  # dictionary code
+}
+
+
+def schema_columns(row_type=TimeWindowFeatureRow) -> List[List[str]]:
+    hints = typing.get_type_hints(row_type)
+    return [[f.name, _DTYPES[hints[f.name]]] for f in fields(row_type)]
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+class ColumnarWriter:
+    """
+    Buffers rows in memory and appends them as one typed chunk when
+    chunk_rows rows are pending or the oldest pending row is older than
+    chunk_interval seconds (checked by maybe_flush()).
+    """
+
+    def __init__(
+        self,
+        path: str = "data/time_windows.ebcol",
+        *,
+        chunk_rows: int = 256,
+        chunk_interval: float = 600.0,
+        row_type=TimeWindowFeatureRow,
+    ):
+        self.path = path
+        self.chunk_rows = max(1, chunk_rows)
+        self.chunk_interval = chunk_interval
+        self.row_type = row_type
+
+        self.columns = schema_columns(row_type)
+        self._names = [c[0] for c in self.columns]
+        self._string_cols = {c[0] for c in self.columns if c[1] == _DTYPES[str]}
+
+        self._pending: List[list] = []
+        self._pending_since = 0.0
+        self._dict: Dict[str, Dict[str, int]] = {c: {} for c in self._string_cols}
+
+        self._file = None
+        self._index_file = None
+        self.open()
+
+    # -------------------------
+    # Public
+    # -------------------------
+
+    def header_matches(self) -> bool:
+        return _read_file_header(self.path) == (SCHEMA_VERSION, self.columns)
+
+    def open(self):
+        """Open for append; a file written with another schema is rotated out."""
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self._pending = []
+        self._dict = {c: {} for c in self._string_cols}
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            if not self.header_matches():
+                rotate_out(self.path)
+            else:
+                self._open_existing()
+                return
+
+        self._write_index([])
+        self._file = open(self.path, "wb")
+        header = json.dumps({"columns": self.columns}).encode()
+        self._file.write(_FILE_HEADER.pack(MAGIC, SCHEMA_VERSION, len(header)))
+        self._file.write(header)
+        self._file.write(b"\0" * _pad8(_FILE_HEADER.size + len(header)))
+        self._file.flush()
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def size(self) -> int:
+        return self._file.tell() if self._file else 0
+
+    def write_row(self, row):
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append([getattr(row, name) for name in self._names])
+        if len(self._pending) >= self.chunk_rows:
+            self.flush()
+
+    def maybe_flush(self, sync: bool = False):
+        if self._pending and time.monotonic() - self._pending_since >= self.chunk_interval:
+            self.flush(sync=sync)
+
+    def flush(self, sync: bool = False):
+        if self._pending:
+            self._write_chunk(self._pending)
+            self._pending = []
+        self._file.flush()
+        self._index_file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush(sync=True)
+        self._file.close()
+        self._index_file.close()
+        self._file = None
+        self._index_file = None
+
+    # -------------------------
+    # Internals
+    # -------------------------
+
+    def _open_existing(self):
+        # rebuild dictionaries and drop a torn trailing chunk
+        reader = ColumnarReader(self.path)
+        valid_end = reader.valid_end
+        for col, values in reader.dictionaries.items():
+            if col in self._dict:
+                self._dict[col] = {v: i for i, v in enumerate(values)}
+        entries = [c.to_index() for c in reader.chunks]
+        reader.close()
+
+        self._file = open(self.path, "r+b")
+        self._file.truncate(valid_end)
+        self._file.seek(valid_end)
+        self._write_index(entries)
+
+    def _write_index(self, entries: List[dict]):
+        index_path = self.path + INDEX_SUFFIX
+        tmp = index_path + ".tmp"
+        with open(tmp, "w") as f:
+            for e in entries:
+                f.write(json.dumps(e) + "\n")
+        os.replace(tmp, index_path)
+        self._index_file = open(index_path, "a")
+
+    def _write_chunk(self, rows: List[list]):
+        nrows = len(rows)
+        cols = list(zip(*rows))
+
+        parts = []
+        offsets = []
+        new_values: Dict[str, List[str]] = {}
+        pos = 0
+
+        for (name, dtype), values in zip(self.columns, cols):
+            if name in self._string_cols:
+                codes = self._dict[name]
+                encoded = []
+                for v in values:
+                    v = "" if v is None else str(v)
+                    code = codes.get(v)
+                    if code is None:
+                        code = len(codes)
+                        codes[v] = code
+                        new_values.setdefault(name, []).append(v)
+                    encoded.append(code)
+                values = encoded
+
+            data = np.asarray(values, dtype=dtype).tobytes()
+            offsets.append(pos)
+            parts.append(data)
+            pad = _pad8(len(data))
+            if pad:
+                parts.append(b"\0" * pad)
+            pos += len(data) + pad
+
+        footer = {"offsets": offsets, "dict": new_values}
+        footer.update(self._summarize(cols))
+        footer_bytes = json.dumps(footer).encode()
+        # keep the next chunk 8-byte aligned (JSON ignores trailing spaces)
+        footer_bytes += b" " * _pad8(pos + len(footer_bytes) + _FOOTER_TRAILER.size)
+
+        body_len = pos + len(footer_bytes) + _FOOTER_TRAILER.size
+        chunk_pos = self._file.tell()
+        self._file.write(_CHUNK_HEADER.pack(CHUNK_MAGIC, nrows, body_len))
+        for p in parts:
+            self._file.write(p)
+        self._file.write(footer_bytes)
+        self._file.write(_FOOTER_TRAILER.pack(len(footer_bytes), FOOTER_MAGIC))
+
+        chunk = ColumnarChunk(chunk_pos, nrows, chunk_pos + _CHUNK_HEADER.size, body_len, footer)
+        self._index_file.write(json.dumps(chunk.to_index()) + "\n")
+
+    def _summarize(self, cols) -> dict:
+        by_name = dict(zip(self._names, cols))
+        summary = {}
+
+        ts = by_name.get("window_start_ts")
+        if ts:
+            summary["ts_min"] = float(min(ts))
+            summary["ts_max"] = float(max(ts))
+
+        sessions = by_name.get("session_id")
+        if sessions and ts:
+            ranges: Dict[str, list] = {}
+            for sid, t in zip(sessions, ts):
+                r = ranges.get(sid)
+                if r is None:
+                    ranges[sid] = [float(t), float(t), 1]
+                else:
+                    r[0] = min(r[0], t)
+                    r[1] = max(r[1], t)
+                    r[2] += 1
+            summary["sessions"] = ranges
+
+        labels = by_name.get("label")
+        if labels:
+            summary["labels"] = sorted(set(labels))
+
+        return summary
+
+
+def _read_file_header(path: str):
+    try:
+        with open(path, "rb") as f:
+            raw = f.read(_FILE_HEADER.size)
+            if len(raw) < _FILE_HEADER.size:
+                return None
+            magic, version, header_len = _FILE_HEADER.unpack(raw)
+            if magic != MAGIC:
+                return None
+            header = json.loads(f.read(header_len))
+    except (OSError, ValueError):
+        return None
+    return version, header["columns"]
+
+
+class ColumnarChunk:
+    def __init__(self, pos: int, nrows: int, body_start: int, body_len: int, footer: dict):
+        self.pos = pos
+        self.nrows = nrows
+        self.body_start = body_start
+        self.end = body_start + body_len
+        self.footer = footer
+
+        self.offsets: List[int] = footer["offsets"]
+        self.ts_min = footer.get("ts_min")
+        self.ts_max = footer.get("ts_max")
+        self.sessions: Dict[str, list] = footer.get("sessions", {})
+        self.labels: List[str] = footer.get("labels", [])
+
+    def to_index(self) -> dict:
+        return {
+            "pos": self.pos,
+            "nrows": self.nrows,
+            "body_len": self.end - self.body_start,
+            "footer": self.footer,
+        }
+
+    @classmethod
+    def from_index(cls, entry: dict) -> "ColumnarChunk":
+        pos = entry["pos"]
+        return cls(pos, entry["nrows"], pos + _CHUNK_HEADER.size, entry["body_len"], entry["footer"])
+
+
+class ColumnarReader:
+    """
+    Memory-maps a columnar file. Column reads are zero-copy np.frombuffer
+    views into the map; only string columns need the decoded dictionary.
+
+    Chunk metadata comes from the sidecar index when present, so opening
+    doesn't page through the data file.
+    """
+
+    def __init__(self, path: str = "data/time_windows.ebcol", use_index: bool = True):
+        self.path = path
+        self.use_index = use_index
+        self._f = open(path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+        self.schema_version = None
+        self.columns: List[List[str]] = []
+        self.dictionaries: Dict[str, List[str]] = {}
+        self.chunks: List[ColumnarChunk] = []
+        self.valid_end = 0
+
+        if self._mm is not None:
+            self._scan()
+
+        self._dtypes = {name: np.dtype(dt) for name, dt in self.columns}
+        self._index = {name: i for i, (name, _) in enumerate(self.columns)}
+
+    @property
+    def num_rows(self) -> int:
+        return sum(c.nrows for c in self.chunks)
+
+    def _scan(self):
+        mm = self._mm
+        size = len(mm)
+
+        magic, version, header_len = _FILE_HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: not a columnar time-window file")
+        self.schema_version = version
+        self.columns = json.loads(mm[_FILE_HEADER.size:_FILE_HEADER.size + header_len])["columns"]
+        self.dictionaries = {name: [] for name, dt in self.columns if dt == _DTYPES[str]}
+
+        pos = _FILE_HEADER.size + header_len
+        pos += _pad8(pos)
+        self.valid_end = pos
+
+        if self.use_index:
+            for chunk in self._load_index(size):
+                if chunk.pos != pos:
+                    break
+                self._add_chunk(chunk)
+                pos = chunk.end
+                self.valid_end = pos
+
+        # anything not (yet) in the sidecar is read from the chunk footers
+        while pos + _CHUNK_HEADER.size <= size:
+            cmagic, nrows, body_len = _CHUNK_HEADER.unpack_from(mm, pos)
+            body_start = pos + _CHUNK_HEADER.size
+            end = body_start + body_len
+            if cmagic != CHUNK_MAGIC or end > size:
+                break
+            footer_len, fmagic = _FOOTER_TRAILER.unpack_from(mm, end - _FOOTER_TRAILER.size)
+            if fmagic != FOOTER_MAGIC:
+                break
+            footer_start = end - _FOOTER_TRAILER.size - footer_len
+            footer = json.loads(mm[footer_start:end - _FOOTER_TRAILER.size])
+
+            self._add_chunk(ColumnarChunk(pos, nrows, body_start, body_len, footer))
+            pos = end
+            self.valid_end = end
+
+    def _add_chunk(self, chunk: ColumnarChunk):
+        for col, values in chunk.footer.get("dict", {}).items():
+            self.dictionaries.setdefault(col, []).extend(values)
+        self.chunks.append(chunk)
+
+    def _load_index(self, size: int) -> List[ColumnarChunk]:
+        chunks = []
+        try:
+            with open(self.path + INDEX_SUFFIX, "r") as f:
+                for line in f:
+                    try:
+                        chunk = ColumnarChunk.from_index(json.loads(line))
+                    except (ValueError, KeyError):
+                        break  # torn last line
+                    if chunk.end > size:
+                        break
+                    chunks.append(chunk)
+        except OSError:
+            return []
+
+        # cheap sanity check: the last indexed chunk must really end there
+        if chunks:
+            _, fmagic = _FOOTER_TRAILER.unpack_from(self._mm, chunks[-1].end - _FOOTER_TRAILER.size)
+            if fmagic != FOOTER_MAGIC:
+                return []
+        return chunks
+
+    def chunk_columns(self, chunk: ColumnarChunk, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        names = columns or [c[0] for c in self.columns]
+        out = {}
+        for name in names:
+            i = self._index[name]
+            out[name] = np.frombuffer(
+                self._mm,
+                dtype=self._dtypes[name],
+                count=chunk.nrows,
+                offset=chunk.body_start + chunk.offsets[i],
+            )
+        return out
+
+    def iter_chunks(self, columns: Optional[Sequence[str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+        for chunk in self.chunks:
+            yield self.chunk_columns(chunk, columns)
+
+    def read(self, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Column name -> array over all chunks. Zero-copy for single-chunk
+        files; otherwise one concatenation per requested column.
+        """
+        names = columns or [c[0] for c in self.columns]
+        per_chunk = list(self.iter_chunks(names))
+        out = {}
+        for name in names:
+            arrays = [c[name] for c in per_chunk]
+            if len(arrays) == 1:
+                out[name] = arrays[0]
+            elif arrays:
+                out[name] = np.concatenate(arrays)
+            else:
+                out[name] = np.empty(0, dtype=self._dtypes[name])
+        return out
+
+    def decode(self, column: str, codes: np.ndarray) -> np.ndarray:
+        """Dictionary codes -> string values (e.g. for the label column)."""
+        values = np.asarray(self.dictionaries[column], dtype=object)
+        return values[codes]
+
+    def close(self):
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # arrays handed out still view the map; it closes with them
+                pass
+            self._mm = None
+        self._f.close()
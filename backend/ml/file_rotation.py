@@ -0,0 +1,15 @@
+import os
+from datetime import datetime
+
+
+def rotate_out(path: str) -> str:
+    """Rename `path` to `<base>-<YYYYmmdd-HHMMSS>[-n]<ext>` and return the new name."""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    base, ext = os.path.splitext(path)
+    target = f"{base}-{stamp}{ext}"
+    n = 1
+    while os.path.exists(target):
+        target = f"{base}-{stamp}-{n}{ext}"
+        n += 1
+    os.replace(path, target)
+    return target
@@ -0,0 +1,274 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ml.time_window_schema import feature_names
+from runtime import log
+
+# --------------------------------------------------
+# Exported model format
+# --------------------------------------------------
+#
+# A single .npz file (see save_model) with:
+#   kind       "linear" | "trees" | "mlp"
+#   features   feature names, in column order of X
+#   classes    label names, in column order of the output
+#   mean/scale optional standardization applied before the model
+#
+#   linear: W (C, F), b (C,)                       -> softmax(X W^T + b)
+#   mlp:    W0, b0, W1, b1, ... (ReLU between)     -> softmax(last layer)
+#   trees:  node_feature (N,) int, -1 for leaves
+#           node_threshold (N,), node_left (N,), node_right (N,)
+#           node_value (N, C), roots (T,), max_depth
+#           aggregate "mean" (forest probabilities) | "logits" (boosting)
+
+DEFAULT_MODEL_PATH = "models/window_model.npz"
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class LinearModel:
+    def __init__(self, W: np.ndarray, b: np.ndarray):
+        self.W_t = np.ascontiguousarray(W.T)
+        self.b = b
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return _softmax(X @ self.W_t + self.b)
+
+
+class MLPModel:
+    def __init__(self, layers: List[tuple]):
+        self.layers = [(np.ascontiguousarray(W.T), b) for W, b in layers]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        h = X
+        last = len(self.layers) - 1
+        for i, (W_t, b) in enumerate(self.layers):
+            h = h @ W_t + b
+            if i < last:
+                np.maximum(h, 0.0, out=h)
+        return _softmax(h)
+
+
+class TreeEnsembleModel:
+    """All trees are walked together: one gather per depth level."""
+
+    def __init__(
+        self,
+        node_feature: np.ndarray,
+        node_threshold: np.ndarray,
+        node_left: np.ndarray,
+        node_right: np.ndarray,
+        node_value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        aggregate: str = "mean",
+    ):
+        self.feature = node_feature.astype(np.int64)
+        self.threshold = node_threshold.astype(np.float64)
+        self.left = node_left.astype(np.int64)
+        self.right = node_right.astype(np.int64)
+        self.value = node_value.astype(np.float64)
+        self.roots = roots.astype(np.int64)
+        self.max_depth = int(max_depth)
+        self.aggregate = aggregate
+
+        self._is_leaf = self.feature < 0
+        # leaves point at feature 0 so the gather below stays in bounds
+        self._safe_feature = np.where(self._is_leaf, 0, self.feature)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        n = X.shape[0]
+        idx = np.broadcast_to(self.roots, (n, self.roots.size)).copy()
+        rows = np.arange(n)[:, None]
+
+        for _ in range(self.max_depth):
+            leaf = self._is_leaf[idx]
+            if leaf.all():
+                break
+            x = X[rows, self._safe_feature[idx]]
+            nxt = np.where(x <= self.threshold[idx], self.left[idx], self.right[idx])
+            idx = np.where(leaf, idx, nxt)
+
+        out = self.value[idx].sum(axis=1)
+        if self.aggregate == "logits":
+            return _softmax(out)
+        return out / self.roots.size
+
+
+@dataclass
+class Prediction:
+    label: str
+    confidence: float
+    probs: Dict[str, float]
+    latency_us: float
+
+
+def save_model(path: str, kind: str, features: Sequence[str], classes: Sequence[str], **arrays):
+    """Write an exported model (see the format notes at the top of this file)."""
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    np.savez(
+        path,
+        kind=np.array(kind),
+        features=np.array(list(features)),
+        classes=np.array(list(classes)),
+        **arrays,
+    )
+
+
+def load_model(path: str):
+    with np.load(path, allow_pickle=False) as data:
+        return _model_from_arrays(path, data)
+
+
+def _model_from_arrays(path: str, data):
+    kind = str(data["kind"])
+
+    if kind == "linear":
+        model = LinearModel(data["W"], data["b"])
+    elif kind == "mlp":
+        layers = []
+        i = 0
+        while f"W{i}" in data:
+            layers.append((data[f"W{i}"], data[f"b{i}"]))
+            i += 1
+        model = MLPModel(layers)
+    elif kind == "trees":
+        model = TreeEnsembleModel(
+            data["node_feature"],
+            data["node_threshold"],
+            data["node_left"],
+            data["node_right"],
+            data["node_value"],
+            data["roots"],
+            int(data["max_depth"]),
+            str(data["aggregate"]) if "aggregate" in data else "mean",
+        )
+    else:
+        raise ValueError(f"{path}: unknown model kind {kind!r}")
+
+    mean = data["mean"] if "mean" in data else None
+    scale = data["scale"] if "scale" in data else None
+    features = [str(f) for f in data["features"]]
+    classes = [str(c) for c in data["classes"]]
+    return model, features, classes, mean, scale
+
+
+class InferenceEngine:
+    """
+    Scores TimeWindowFeatureRow-shaped records (dataclass or dict) with an
+    exported model. With no model file present, `ready` is False and every
+    window is treated as uncertain, i.e. sent to the human for a label.
+    """
+
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, confidence_threshold: float = 0.75):
+        self.model_path = model_path
+        self.confidence_threshold = confidence_threshold
+
+        self.model = None
+        self.features: List[str] = []
+        self.classes: List[str] = []
+        self._mean: Optional[np.ndarray] = None
+        self._scale: Optional[np.ndarray] = None
+
+        if os.path.exists(model_path):
+            try:
+                self.load(model_path)
+            except ValueError as e:
+                # e.g. trained before a registry change: stay model-less
+                log.event("model.rejected", str(e), level="ERROR", path=model_path)
+
+    @property
+    def ready(self) -> bool:
+        return self.model is not None
+
+    def load(self, path: str):
+        self.set_model(*load_model(path))
+        self.model_path = path
+
+    def set_model(self, model, features, classes, mean=None, scale=None):
+        """
+        Swap in a model built in-process (e.g. by the online learner).
+        Raises ValueError if it reads a feature features.registry doesn't
+        produce (scoring would fail on every window).
+        """
+        known = set(feature_names())
+        unknown = [f for f in features if f not in known]
+        if unknown:
+            raise ValueError(f"model reads unknown features: {', '.join(unknown)}")
+        self.features = list(features)
+        self.classes = list(classes)
+        self._mean = mean
+        self._scale = scale
+        self.model = model
+
+    # -------------------------
+    # Vectorization
+    # -------------------------
+
+    def vectorize(self, row) -> np.ndarray:
+        if isinstance(row, dict):
+            values = [row[f] for f in self.features]
+        else:
+            values = [getattr(row, f) for f in self.features]
+        return np.array(values, dtype=np.float64)
+
+    def vectorize_batch(self, rows) -> np.ndarray:
+        X = np.empty((len(rows), len(self.features)), dtype=np.float64)
+        for i, row in enumerate(rows):
+            X[i] = self.vectorize(row)
+        return X
+
+    def _prepare(self, X: np.ndarray) -> np.ndarray:
+        if self._mean is not None:
+            X = X - self._mean
+        if self._scale is not None:
+            X = X / self._scale
+        return X
+
+    # -------------------------
+    # Scoring
+    # -------------------------
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """(n, F) feature matrix -> (n, C) class probabilities."""
+        return self.model.predict_proba(self._prepare(np.atleast_2d(X)))
+
+    def score(self, row) -> Optional[Prediction]:
+        if self.model is None:
+            return None
+        t0 = time.perf_counter_ns()
+        p = self.predict_proba(self.vectorize(row)[None, :])[0]
+        k = int(p.argmax())
+        latency_us = (time.perf_counter_ns() - t0) / 1000.0
+        return Prediction(
+            label=self.classes[k],
+            confidence=float(p[k]),
+            probs={c: float(v) for c, v in zip(self.classes, p)},
+            latency_us=latency_us,
+        )
+
+    def score_batch(self, rows_or_X, chunk_rows: int = 65536):
+        """
+        Batch scoring for replays. Accepts a (n, F) matrix or a list of rows.
+        Returns (labels, confidences, probs) as arrays.
+        """
+        X = rows_or_X if isinstance(rows_or_X, np.ndarray) else self.vectorize_batch(rows_or_X)
+        probs = np.empty((X.shape[0], len(self.classes)), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_rows):
+            probs[start:start + chunk_rows] = self.predict_proba(X[start:start + chunk_rows])
+        k = probs.argmax(axis=1)
+        labels = np.asarray(self.classes, dtype=object)[k]
+        return labels, probs[np.arange(len(k)), k], probs
+
+    def is_uncertain(self, pred: Optional[Prediction]) -> bool:
+        return pred is None or pred.confidence < self.confidence_threshold
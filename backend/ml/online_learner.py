@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from ml.inference import LinearModel, save_model
+from ml.time_window_schema import model_feature_names
+
+DEFAULT_CHECKPOINT_PATH = "models/online_model.npz"
+
+
+class RunningNormalizer:
+    """Streaming per-feature mean / variance (Welford)."""
+
+    def __init__(self, num_features: int):
+        self.n = 0
+        self.mean = np.zeros(num_features, dtype=np.float64)
+        self.m2 = np.zeros(num_features, dtype=np.float64)
+
+    def update(self, x: np.ndarray):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def scale(self) -> np.ndarray:
+        if self.n < 2:
+            return np.ones_like(self.mean)
+        std = np.sqrt(self.m2 / (self.n - 1))
+        # constant features would divide by zero
+        return np.where(std > 1e-9, std, 1.0)
+
+    def transform(self, x: np.ndarray) -> np.ndarray:
+        return (x - self.mean) / self.scale
+
+
+class OnlineLearner:
+    """
+    Multinomial logistic regression trained by SGD, one labeled window at a
+    time. Inputs are standardized with running statistics, so the model is
+    exported in the same "linear" format (W, b, mean, scale) the
+    InferenceEngine loads. New labels add a class on the fly.
+
+    Cost per update is O(classes * features), independent of how many
+    windows have been seen; checkpoints are a few KB.
+    """
+
+    def __init__(
+        self,
+        checkpoint_path: str = DEFAULT_CHECKPOINT_PATH,
+        *,
+        learning_rate: float = 0.05,
+        l2: float = 1e-4,
+        min_updates: int = 20,
+        checkpoint_every: int = 10,
+        checkpoint_interval: float = 300.0,
+    ):
+        self.checkpoint_path = checkpoint_path
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.min_updates = min_updates
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+
+        self.features: List[str] = model_feature_names()
+        self.classes: List[str] = []
+        self.W = np.zeros((0, len(self.features)), dtype=np.float64)
+        self.b = np.zeros(0, dtype=np.float64)
+        self.norm = RunningNormalizer(len(self.features))
+        self.updates = 0
+
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        self._writer: Optional[threading.Thread] = None
+
+        if os.path.exists(checkpoint_path):
+            self.restore(checkpoint_path)
+
+    @property
+    def ready(self) -> bool:
+        return self.updates >= self.min_updates and len(self.classes) >= 2
+
+    # -------------------------
+    # Learning
+    # -------------------------
+
+    def _class_index(self, label: str) -> int:
+        try:
+            return self.classes.index(label)
+        except ValueError:
+            self.classes.append(label)
+            self.W = np.vstack([self.W, np.zeros((1, len(self.features)))])
+            self.b = np.append(self.b, 0.0)
+            return len(self.classes) - 1
+
+    def learn(self, row, label: str):
+        """One SGD step on a labeled window (dataclass or dict)."""
+        if isinstance(row, dict):
+            x = np.array([row[f] for f in self.features], dtype=np.float64)
+        else:
+            x = np.array([getattr(row, f) for f in self.features], dtype=np.float64)
+
+        k = self._class_index(label)
+        self.norm.update(x)
+        z = self.norm.transform(x)
+
+        logits = self.W @ z + self.b
+        logits -= logits.max()
+        p = np.exp(logits)
+        p /= p.sum()
+        p[k] -= 1.0  # dL/dlogits for cross-entropy
+
+        # 1/sqrt(t) decay keeps late updates from undoing what was learned
+        lr = self.learning_rate / np.sqrt(1.0 + self.updates / 100.0)
+        self.W -= lr * (np.outer(p, z) + self.l2 * self.W)
+        self.b -= lr * p
+
+        self.updates += 1
+        self._since_checkpoint += 1
+
+    def apply_to(self, engine):
+        """Install the current weights into an InferenceEngine."""
+        engine.set_model(
+            LinearModel(self.W.copy(), self.b.copy()),
+            self.features,
+            self.classes,
+            self.norm.mean.copy(),
+            self.norm.scale,
+        )
+
+    # -------------------------
+    # Checkpointing
+    # -------------------------
+
+    def maybe_checkpoint(self):
+        due = self._since_checkpoint >= self.checkpoint_every or (
+            self._since_checkpoint and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+        )
+        if due:
+            self.checkpoint()
+
+    def checkpoint(self, wait: bool = False):
+        """Snapshot the state and write it off-thread (tmp file + rename)."""
+        if self._writer and self._writer.is_alive():
+            if not wait:
+                return  # previous write still running; next call retries
+            self._writer.join()
+
+        arrays = dict(
+            W=self.W.copy(),
+            b=self.b.copy(),
+            mean=self.norm.mean.copy(),
+            scale=self.norm.scale,
+            m2=self.norm.m2.copy(),
+            n_seen=np.array(self.norm.n),
+            updates=np.array(self.updates),
+        )
+        features = list(self.features)
+        classes = list(self.classes)
+
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+        def write():
+            tmp = self.checkpoint_path + ".tmp.npz"
+            save_model(tmp, "linear", features, classes, **arrays)
+            os.replace(tmp, self.checkpoint_path)
+
+        self._writer = threading.Thread(target=write, daemon=True)
+        self._writer.start()
+        if wait:
+            self._writer.join()
+
+    def restore(self, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            features = [str(f) for f in data["features"]]
+            if features != self.features:
+                # schema changed since the checkpoint: start over
+                return
+            self.classes = [str(c) for c in data["classes"]]
+            self.W = data["W"].astype(np.float64)
+            self.b = data["b"].astype(np.float64)
+            self.norm.mean = data["mean"].astype(np.float64)
+            self.norm.m2 = data["m2"].astype(np.float64)
+            self.norm.n = int(data["n_seen"])
+            self.updates = int(data["updates"])
@@ -0,0 +1,398 @@
+import glob
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# --------------------------------------------------
+# Raw per-tick signal archive
+# --------------------------------------------------
+#
+# Ticks are written into fixed-duration segments under data/raw/:
+#   <start_ms>.seg    open segment, appended record by record
+#   <start_ms>.segz   closed segment (zlib of the .seg bytes)
+#
+# Segment = MAGIC(8) | u32 header_len | header JSON | records...
+#   header JSON = {"version": 1, "start_ms": .., "session_id": ..,
+#                  "fields": [[name, kind, scale], ...]}
+#
+# Records:
+#   0x01 TICK  then one value per field, in header order:
+#              num  -> zigzag varint of (round(v * scale) - previous value)
+#              str  -> varint dictionary code
+#              bool -> all bool fields packed into one varint bitmask
+#   0x02 DICT  varint field index | varint byte length | utf-8 bytes
+#              (assigns the next code for that field; written just before
+#               the first tick that uses it)
+#
+# Dictionaries and deltas restart in every segment, so each segment decodes
+# on its own. A torn last record (crash mid-append) is simply dropped.
+#
+# A segment never spans two sessions (a new session_id rolls the segment), so
+# readers can route whole segments by session from the header alone.
+
+MAGIC = b"EBRAW1\0\0"
+VERSION = 1
+
+TICK = 0x01
+DICT = 0x02
+
+# (name, kind, scale); scale is the fixed-point factor for "num" fields
+RAW_FIELDS: List[tuple] = [
+    ("ts", "num", 1000),              # ms
+    ("session_id", "str", 0),
+
+    ("keystrokes", "num", 1),
+    ("mouse_distance", "num", 1),     # px
+    ("idle_seconds", "num", 100),
+
+    ("app", "str", 0),
+    ("title", "str", 0),
+    ("is_browser", "bool", 0),
+    ("app_changed", "bool", 0),
+    ("title_changed", "bool", 0),
+
+    ("domain", "str", 0),
+    ("browser_title", "str", 0),
+    ("scroll_count", "num", 1),
+    ("key_count", "num", 1),
+    ("tab_id", "num", 1),
+    ("scroll_events", "num", 1),      # received since the previous tick
+    ("key_events", "num", 1),
+    ("tab_switches", "num", 1),
+    ("background_media_sec", "num", 100),
+
+    ("face_present", "num", 1000),
+    ("gaze_on_screen", "num", 1000),
+    ("head_motion", "num", 1000),
+    ("blink_rate_60s", "num", 10),
+    ("yawn_prob", "num", 1000),
+]
+
+# added after the first segments were written: readers default them
+OPTIONAL_RAW_FIELDS = {"tab_id", "scroll_events", "key_events", "tab_switches", "background_media_sec"}
+
+_U32 = struct.Struct("<I")
+
+
+def check_fields(fields) -> Optional[str]:
+    """
+    Why a header's field list can't be decoded into ticks SessionPipeline
+    can feed on (None if it can): every entry must be one of RAW_FIELDS,
+    with the same kind and scale, and only OPTIONAL_RAW_FIELDS may be left
+    out.
+    """
+    known = {f[0]: tuple(f) for f in RAW_FIELDS}
+    if not isinstance(fields, list):
+        return "fields is not a list"
+    seen = set()
+    for f in fields:
+        if not isinstance(f, (list, tuple)) or len(f) != 3 or not isinstance(f[0], str):
+            return f"malformed field {f!r}"
+        if known.get(f[0]) != tuple(f):
+            return f"unknown field {f!r}"
+        if f[0] in seen:
+            return f"duplicate field {f[0]!r}"
+        seen.add(f[0])
+    missing = set(known) - seen - OPTIONAL_RAW_FIELDS
+    if missing:
+        return f"missing fields {sorted(missing)}"
+    return None
+
+
+def _put_varint(out: bytearray, n: int):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 63)
+
+
+def _unzigzag(n: int) -> int:
+    return (n >> 1) ^ -(n & 1)
+
+
+class TickEncoder:
+    """
+    Encodes ticks as TICK/DICT records. Deltas and dictionaries are relative
+    to everything encoded since the last reset(), so a stream of records is
+    only decodable from its start (a segment, or one ingest connection).
+    """
+
+    def __init__(self, fields=RAW_FIELDS):
+        self.fields = list(fields)
+        self._str = [(i, f[0]) for i, f in enumerate(self.fields) if f[1] == "str"]
+        self._bool = [f[0] for f in self.fields if f[1] == "bool"]
+        self.reset()
+
+    def reset(self):
+        self._prev: Dict[str, int] = {}
+        self._codes: Dict[str, Dict[str, int]] = {name: {} for _, name in self._str}
+
+    def encode(self, tick: dict, buf: bytearray):
+        """Append the records for one tick to buf."""
+        # new dictionary entries first
+        values = []
+        for i, name in self._str:
+            v = tick.get(name) or ""
+            codes = self._codes[name]
+            code = codes.get(v)
+            if code is None:
+                code = len(codes)
+                codes[v] = code
+                raw = v.encode("utf-8")
+                buf.append(DICT)
+                _put_varint(buf, i)
+                _put_varint(buf, len(raw))
+                buf += raw
+            values.append(code)
+
+        buf.append(TICK)
+        codes_iter = iter(values)
+        prev = self._prev
+        for name, kind, scale in self.fields:
+            if kind == "num":
+                q = int(round((tick.get(name) or 0) * scale))
+                _put_varint(buf, _zigzag(q - prev.get(name, 0)))
+                prev[name] = q
+            elif kind == "str":
+                _put_varint(buf, next(codes_iter))
+
+        mask = 0
+        for bit, name in enumerate(self._bool):
+            if tick.get(name):
+                mask |= 1 << bit
+        _put_varint(buf, mask)
+
+
+class TickDecoder:
+    """Inverse of TickEncoder; keeps its state across decode() calls."""
+
+    def __init__(self, fields=RAW_FIELDS):
+        self.fields = [tuple(f) for f in fields]
+        self._str_names = {i: f[0] for i, f in enumerate(self.fields) if f[1] == "str"}
+        self._bool_names = [f[0] for f in self.fields if f[1] == "bool"]
+        self._dicts: Dict[str, List[str]] = {name: [] for name in self._str_names.values()}
+        self._prev = [0] * len(self.fields)
+
+    def decode(self, data: bytes, pos: int = 0) -> Iterator[dict]:
+        """Yield one dict per tick in data[pos:]; stops at a torn record."""
+        fields = self.fields
+        dicts = self._dicts
+        prev = self._prev
+        n = len(data)
+
+        def varint():
+            nonlocal pos
+            shift = 0
+            result = 0
+            while True:
+                b = data[pos]
+                pos += 1
+                result |= (b & 0x7F) << shift
+                if b < 0x80:
+                    return result
+                shift += 7
+
+        try:
+            while pos < n:
+                kind = data[pos]
+                pos += 1
+                if kind == DICT:
+                    name = self._str_names[varint()]
+                    length = varint()
+                    if pos + length > n:
+                        return
+                    dicts[name].append(data[pos:pos + length].decode("utf-8"))
+                    pos += length
+                elif kind == TICK:
+                    tick = {}
+                    for i, (name, fkind, scale) in enumerate(fields):
+                        if fkind == "num":
+                            prev[i] += _unzigzag(varint())
+                            tick[name] = prev[i] / scale if scale != 1 else prev[i]
+                        elif fkind == "str":
+                            tick[name] = dicts[name][varint()]
+                    mask = varint()
+                    for bit, name in enumerate(self._bool_names):
+                        tick[name] = bool(mask >> bit & 1)
+                    yield tick
+                else:
+                    return  # corrupt / torn tail
+        except IndexError:
+            return  # torn last record
+
+
+class RawArchiveWriter:
+    """
+    Appends per-tick raw signals to the current segment. A segment is closed
+    after `segment_sec` seconds of ticks; its compression runs on a
+    background thread so append() stays cheap. The open segment is flushed
+    to the OS every `flush_sec` seconds of ticks, so a crash loses at most
+    that much (the torn tail is dropped when the segment is read back).
+    """
+
+    def __init__(
+        self,
+        directory: str = "data/raw",
+        segment_sec: float = 900.0,
+        fields=RAW_FIELDS,
+        flush_sec: float = 5.0,
+    ):
+        self.directory = directory
+        self.segment_sec = segment_sec
+        self.flush_sec = flush_sec
+        self.fields = list(fields)
+
+        self._encoder = TickEncoder(self.fields)
+
+        self._file = None
+        self._path: Optional[str] = None
+        self._segment_start = 0.0
+        self._segment_session = ""
+        self._flushed_at = 0.0
+        self._buf = bytearray()
+        self._compressors: List[threading.Thread] = []
+
+        os.makedirs(directory, exist_ok=True)
+        # segments left open by a crash are closed out first
+        for path in sorted(glob.glob(os.path.join(directory, "*.seg"))):
+            self._compress_segment(path)
+
+    def append(self, tick: dict):
+        ts = tick["ts"]
+        session_id = tick.get("session_id") or ""
+        if (
+            self._file is None
+            or ts - self._segment_start >= self.segment_sec
+            or session_id != self._segment_session
+        ):
+            self._roll(ts, session_id)
+
+        buf = self._buf
+        buf.clear()
+        self._encoder.encode(tick, buf)
+        self._file.write(buf)
+        if ts - self._flushed_at >= self.flush_sec:
+            self._file.flush()
+            self._flushed_at = ts
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._close_segment()
+        for t in self._compressors:
+            t.join()
+        self._compressors = []
+
+    # -------------------------
+    # Segments
+    # -------------------------
+
+    def _roll(self, ts: float, session_id: str):
+        if self._file:
+            self._close_segment()
+
+        self._segment_start = ts
+        self._segment_session = session_id
+        self._flushed_at = ts
+        start_ms = int(ts * 1000)
+        self._path = os.path.join(self.directory, f"{start_ms}.seg")
+        self._encoder.reset()
+
+        header = json.dumps(
+            {"version": VERSION, "start_ms": start_ms, "session_id": session_id, "fields": self.fields}
+        ).encode()
+        self._file = open(self._path, "wb", buffering=64 * 1024)
+        self._file.write(MAGIC)
+        self._file.write(_U32.pack(len(header)))
+        self._file.write(header)
+
+    def _close_segment(self):
+        self._file.close()
+        self._file = None
+        t = threading.Thread(target=self._compress_segment, args=(self._path,), daemon=True)
+        t.start()
+        self._compressors = [c for c in self._compressors if c.is_alive()] + [t]
+
+    @staticmethod
+    def _compress_segment(path: str):
+        with open(path, "rb") as f:
+            data = f.read()
+        tmp = path + "z.tmp"
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(data, 6))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path + "z")
+        os.remove(path)
+
+
+def read_segment_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        data = f.read()
+    return zlib.decompress(data) if path.endswith(".segz") else data
+
+
+def read_segment_header(path: str) -> dict:
+    """Header JSON of a segment, decompressing only as much as it needs."""
+    with open(path, "rb") as f:
+        data = f.read(64 * 1024)
+    if path.endswith(".segz"):
+        d = zlib.decompressobj()
+        data = d.decompress(data, 12)
+        if len(data) == 12 and data[:8] == MAGIC:
+            (header_len,) = _U32.unpack_from(data, 8)
+            data += d.decompress(d.unconsumed_tail, header_len)
+    if data[:8] != MAGIC:
+        raise ValueError("not a raw archive segment")
+    (header_len,) = _U32.unpack_from(data, 8)
+    return json.loads(data[12:12 + header_len])
+
+
+def decode_segment(data: bytes) -> Iterator[dict]:
+    """Yield one dict per tick, in order."""
+    if data[:8] != MAGIC:
+        raise ValueError("not a raw archive segment")
+    (header_len,) = _U32.unpack_from(data, 8)
+    header = json.loads(data[12:12 + header_len])
+    return TickDecoder(header["fields"]).decode(data, 12 + header_len)
+
+
+def list_segments(directory: str = "data/raw") -> List[str]:
+    paths = glob.glob(os.path.join(directory, "*.segz")) + glob.glob(os.path.join(directory, "*.seg"))
+    return sorted(paths, key=lambda p: int(os.path.basename(p).split(".")[0]))
+
+
+def read_ticks(
+    directory: str = "data/raw",
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+    segments: Optional[Sequence[str]] = None,
+) -> Iterator[dict]:
+    """Sequentially decode every archived tick with start_ts <= ts < end_ts."""
+    paths = list(segments) if segments is not None else list_segments(directory)
+    for i, path in enumerate(paths):
+        seg_start = int(os.path.basename(path).split(".")[0]) / 1000.0
+        if end_ts is not None and seg_start >= end_ts:
+            break
+        # segments are time ordered: skip ones that end before start_ts
+        if start_ts is not None and i + 1 < len(paths):
+            next_start = int(os.path.basename(paths[i + 1]).split(".")[0]) / 1000.0
+            if next_start <= start_ts:
+                continue
+        for tick in decode_segment(read_segment_bytes(path)):
+            ts = tick["ts"]
+            if start_ts is not None and ts < start_ts:
+                continue
+            if end_ts is not None and ts >= end_ts:
+                return
+            yield tick
@@ -0,0 +1,231 @@
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from context_engine.taxonomy import CONTEXTS
+from ml.window_query import query_windows
+
+# --------------------------------------------------
+# Incremental time-series rollups of completed windows
+# --------------------------------------------------
+
+# level -> bucket size in seconds (buckets are aligned to local time)
+ROLLUP_LEVELS: Dict[str, int] = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+# how long each level is kept in memory (None = forever)
+ROLLUP_RETENTION: Dict[str, Optional[int]] = {
+    "minute": 7 * 86400,
+    "hour": 400 * 86400,
+    "day": None,
+}
+
+# (window column, reducer): "mean" averages over windows, "sum" adds up
+ROLLUP_METRICS: List[tuple] = [
+    ("percent_time_on_primary", "mean"),
+    ("idle_ratio_mean", "mean"),
+    ("doomscroll_prob_mean", "mean"),
+    ("doomscroll_duration", "sum"),
+    ("weighted_switch_cost", "sum"),
+    ("semantic_switches", "sum"),
+    ("window_duration", "sum"),
+] + [(f"dwell_{ctx}", "sum") for ctx in CONTEXTS]
+
+ROLLUP_COLUMNS = [m for m, _ in ROLLUP_METRICS]
+
+
+def _local_offset(ts: float) -> int:
+    return time.localtime(ts).tm_gmtoff
+
+
+# every UTC offset change happens on a quarter hour
+_OFFSET_STEP = 900
+
+
+def _local_offsets(ts: np.ndarray) -> np.ndarray:
+    """_local_offset for many timestamps, one localtime() per quarter hour."""
+    quarters, inv = np.unique((ts // _OFFSET_STEP).astype(np.int64), return_inverse=True)
+    offsets = np.array([_local_offset(float(q * _OFFSET_STEP)) for q in quarters.tolist()], dtype=np.float64)
+    return offsets[inv]
+
+
+class RollupEngine:
+    """
+    Keeps per-minute, per-hour and per-day aggregates of completed windows.
+    add() is O(levels); query() reads at most max_points buckets of the
+    cheapest level that satisfies the requested resolution.
+
+    get_state() / set_state() persist the buckets with the newest window
+    they include (through_ts), so a restart only replays the dataset's tail
+    (rebuild_from(since_ts=through_ts)) instead of the whole history.
+    """
+
+    def __init__(self, max_points: int = 2000):
+        self.max_points = max_points
+        # level -> bucket index -> [count, sum(metric)...]
+        self._buckets: Dict[str, Dict[int, List[float]]] = {lvl: {} for lvl in ROLLUP_LEVELS}
+        self._last_prune = 0.0
+        # window_start_ts of the newest window included
+        self.through_ts = 0.0
+
+    # -------------------------
+    # Ingest
+    # -------------------------
+
+    def add(self, features: dict):
+        ts = features["window_start_ts"]
+        self.through_ts = max(self.through_ts, ts)
+        local = ts + _local_offset(ts)
+        values = [float(features.get(m, 0.0)) for m in ROLLUP_COLUMNS]
+
+        for level, size in ROLLUP_LEVELS.items():
+            key = int(local // size)
+            b = self._buckets[level].get(key)
+            if b is None:
+                self._buckets[level][key] = [1.0] + values
+            else:
+                b[0] += 1.0
+                for i, v in enumerate(values, 1):
+                    b[i] += v
+
+        # pruning is rare and bounded, keep it off the per-window path
+        if ts - self._last_prune > 3600:
+            self.prune(now=ts)
+
+    def prune(self, now: Optional[float] = None):
+        now = now or time.time()
+        local = now + _local_offset(now)
+        for level, size in ROLLUP_LEVELS.items():
+            keep = ROLLUP_RETENTION[level]
+            if keep is None:
+                continue
+            cutoff = int((local - keep) // size)
+            buckets = self._buckets[level]
+            for key in [k for k in buckets if k < cutoff]:
+                del buckets[key]
+        self._last_prune = now
+
+    def rebuild_from(self, dataset_path: str = "data/time_windows.ebcol", since_ts: Optional[float] = None):
+        """
+        Recompute all rollups from the columnar window dataset (vectorized),
+        or with since_ts only add the windows that started after it.
+        """
+        if since_ts is None:
+            self._buckets = {lvl: {} for lvl in ROLLUP_LEVELS}
+            self.through_ts = 0.0
+        if not os.path.exists(dataset_path):
+            return
+
+        for batch in query_windows(
+            dataset_path, start_ts=since_ts, columns=["window_start_ts"] + ROLLUP_COLUMNS
+        ):
+            ts = batch["window_start_ts"]
+            values = np.stack([batch[m].astype(np.float64) for m in ROLLUP_COLUMNS], axis=1)
+            if since_ts is not None:
+                newer = ts > since_ts
+                ts, values = ts[newer], values[newer]
+            if not len(ts):
+                continue
+            self.through_ts = max(self.through_ts, float(ts.max()))
+            local = ts + _local_offsets(ts)
+
+            for level, size in ROLLUP_LEVELS.items():
+                keys = (local // size).astype(np.int64)
+                uniq, inv = np.unique(keys, return_inverse=True)
+                counts = np.bincount(inv).astype(np.float64)
+                sums = np.zeros((len(uniq), len(ROLLUP_COLUMNS)))
+                np.add.at(sums, inv, values)
+
+                buckets = self._buckets[level]
+                for key, c, row in zip(uniq.tolist(), counts, sums):
+                    b = buckets.get(key)
+                    if b is None:
+                        buckets[key] = [float(c)] + row.tolist()
+                    else:
+                        b[0] += c
+                        for i, v in enumerate(row, 1):
+                            b[i] += v
+
+        self.prune()
+
+    def get_state(self) -> dict:
+        # copies: the checkpoint is written off the event loop
+        return {
+            "levels": dict(ROLLUP_LEVELS),
+            "columns": list(ROLLUP_COLUMNS),
+            "through_ts": self.through_ts,
+            "buckets": {lvl: {k: list(b) for k, b in buckets.items()} for lvl, buckets in self._buckets.items()},
+        }
+
+    def set_state(self, state: dict) -> bool:
+        """Restore saved buckets; False if they were built with other levels / metrics."""
+        if state.get("levels") != ROLLUP_LEVELS or state.get("columns") != ROLLUP_COLUMNS:
+            return False
+        self._buckets = {lvl: dict(state["buckets"][lvl]) for lvl in ROLLUP_LEVELS}
+        self.through_ts = float(state["through_ts"])
+        self.prune()
+        return True
+
+    # -------------------------
+    # Query
+    # -------------------------
+
+    def pick_level(self, start_ts: float, end_ts: float, resolution: str = "auto", now: Optional[float] = None) -> str:
+        """
+        Requested level, coarsened until the range fits in max_points buckets
+        and the level's retention still reaches back to start_ts. An explicit
+        resolution that was pruned at start_ts is a ValueError.
+        """
+        now = now or time.time()
+        levels = list(ROLLUP_LEVELS)
+        idx = 0 if resolution == "auto" else levels.index(resolution)
+        if resolution != "auto" and not self._retained(levels[idx], start_ts, now):
+            raise ValueError(
+                f"{resolution} rollups are kept for {ROLLUP_RETENTION[resolution] // 86400} days; "
+                "use a coarser resolution or 'auto'"
+            )
+        span = max(0.0, end_ts - start_ts)
+        while idx < len(levels) - 1 and (
+            span / ROLLUP_LEVELS[levels[idx]] > self.max_points
+            or not self._retained(levels[idx], start_ts, now)
+        ):
+            idx += 1
+        return levels[idx]
+
+    @staticmethod
+    def _retained(level: str, start_ts: float, now: float) -> bool:
+        keep = ROLLUP_RETENTION[level]
+        return keep is None or start_ts >= now - keep
+
+    def query(self, start_ts: float, end_ts: float, resolution: str = "auto") -> dict:
+        if resolution != "auto" and resolution not in ROLLUP_LEVELS:
+            raise ValueError(f"unknown resolution {resolution!r}")
+
+        level = self.pick_level(start_ts, end_ts, resolution)
+        size = ROLLUP_LEVELS[level]
+        offset = _local_offset(start_ts)
+        first = int((start_ts + offset) // size)
+        last = int((end_ts + offset) // size)
+        buckets = self._buckets[level]
+
+        points = []
+        # bounded by max_points, except at the coarsest level
+        if last - first + 1 <= len(buckets):
+            keys = (k for k in range(first, last + 1) if k in buckets)
+        else:
+            keys = sorted(k for k in buckets if first <= k <= last)
+
+        for key in keys:
+            b = buckets[key]
+            count = b[0]
+            point = {"ts": key * size - offset, "windows": int(count)}
+            for i, (metric, reducer) in enumerate(ROLLUP_METRICS, 1):
+                point[metric] = b[i] / count if reducer == "mean" else b[i]
+            points.append(point)
+
+        return {"resolution": level, "bucket_sec": size, "points": points}
@@ -1,30 +1,301 @@
 import csv
+import io
 import os
-from dataclasses import asdict
-from typing import Optional
+import queue
+import threading
+import time
+from dataclasses import fields
+from datetime import datetime
+from typing import Iterable, Optional, Sequence
 
+from ml.columnar import ColumnarWriter
+from ml.file_rotation import rotate_out
 from ml.time_window_schema import TimeWindowFeatureRow
+from runtime import log
+
+FIELDNAMES = [f.name for f in fields(TimeWindowFeatureRow)]
+
+_STOP = object()
+
+
+class CsvWriter:
+    """Persistent, buffered CSV handle (one header line + one line per row)."""
+
+    def __init__(self, path: str = "data/time_windows.csv", buffer_size: int = 256 * 1024):
+        self.path = path
+        self.buffer_size = buffer_size
+
+        self._file = None
+        self._size = 0
+
+        # reusable line encoder (csv quoting without touching the file)
+        self._line_buf = io.StringIO()
+        self._line_writer = csv.writer(self._line_buf)
+
+        self.open()
+
+    def header_matches(self) -> bool:
+        with open(self.path, "r", newline="") as f:
+            header = next(csv.reader(f), None)
+        return header is None or header == FIELDNAMES
+
+    def open(self):
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+
+        if os.path.exists(self.path) and not self.header_matches():
+            rotate_out(self.path)
+
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", newline="", buffering=self.buffer_size)
+        self._size = os.path.getsize(self.path)
+
+        if new_file:
+            self._write_line(FIELDNAMES)
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def size(self) -> int:
+        return self._size
+
+    def write_row(self, row: TimeWindowFeatureRow) -> int:
+        return self._write_line([getattr(row, name) for name in FIELDNAMES])
+
+    def _write_line(self, values) -> int:
+        buf = self._line_buf
+        buf.seek(0)
+        buf.truncate()
+        self._line_writer.writerow(values)
+        line = buf.getvalue()
+
+        self._file.write(line)
+        self._size += len(line)
+        return len(line)
+
+    def maybe_flush(self, sync: bool = False):
+        self.flush(sync=sync)
+
+    def flush(self, sync: bool = False):
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush(sync=True)
+        self._file.close()
+        self._file = None
 
 
 class TimeWindowLogger:
-    def __init__(self, path: str = "data/time_windows.csv"):
+    """
+    Appends TimeWindowFeatureRow records to one or more formats:
+      - "csv":      data/time_windows.csv (human readable)
+      - "columnar": data/time_windows.ebcol (typed, memory-mappable,
+                    see ml.columnar)
+
+    log() only enqueues (at most max_pending rows; beyond that rows are
+    dropped and counted); a background thread owns persistent, buffered
+    file handles and flushes when any of these is reached:
+      - flush_rows rows pending
+      - flush_bytes bytes pending
+      - flush_interval seconds since the last flush
+    With fsync=True every flush is also fsync'ed. The CSV is what makes
+    rows crash-durable; the columnar writer keeps batching rows into chunks
+    of chunk_rows rows or chunk_interval seconds (see ColumnarWriter), so
+    its chunks stay large enough to scan.
+
+    Each file is rotated out (renamed with a timestamp suffix) when it
+    grows past rotate_bytes, when the day changes (rotate_daily), or when
+    its header doesn't match the current schema.
+
+    A failed write, rotation or flush is logged and counted (stats()) and
+    the thread carries on with the next row.
+    """
+
+    def __init__(
+        self,
+        path: str = "data/time_windows.csv",
+        *,
+        formats: Sequence[str] = ("csv", "columnar"),
+        columnar_path: Optional[str] = None,
+        flush_rows: int = 64,
+        flush_bytes: int = 64 * 1024,
+        flush_interval: float = 5.0,
+        chunk_rows: int = 256,
+        chunk_interval: float = 3600.0,
+        fsync: bool = False,
+        rotate_bytes: Optional[int] = None,
+        rotate_daily: bool = False,
+        buffer_size: int = 256 * 1024,
+        max_pending: int = 4096,
+    ):
         self.path = path
-        self._ensure_file()
+        self.columnar_path = columnar_path or os.path.splitext(path)[0] + ".ebcol"
+        self.flush_rows = max(1, flush_rows)
+        self.flush_bytes = max(1, flush_bytes)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.rotate_bytes = rotate_bytes
+        self.rotate_daily = rotate_daily
+
+        self._sinks = []
+        if "csv" in formats:
+            self._sinks.append(CsvWriter(self.path, buffer_size=buffer_size))
+        if "columnar" in formats:
+            self._sinks.append(ColumnarWriter(
+                self.columnar_path,
+                chunk_rows=chunk_rows,
+                chunk_interval=chunk_interval,
+            ))
+        if not self._sinks:
+            raise ValueError(f"no known formats in {formats!r}")
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending))
+        self._day = datetime.now().date()
+
+        self._pending_rows = 0
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
 
-    def _ensure_file(self):
-        if not os.path.exists(os.path.dirname(self.path)):
-            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
 
-        if not os.path.exists(self.path):
-            with open(self.path, "w", newline="") as f:
-                writer = csv.DictWriter(
-                    f, fieldnames=TimeWindowFeatureRow.__annotations__.keys()
-                )
-                writer.writeheader()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # -------------------------
+    # Producer side (hot path)
+    # -------------------------
 
     def log(self, row: TimeWindowFeatureRow):
-        with open(self.path, "a", newline="") as f:
-            writer = csv.DictWriter(
-                f, fieldnames=TimeWindowFeatureRow.__annotations__.keys()
-            )
-            writer.writerow(asdict(row))
+        if self._closed:
+            raise RuntimeError("TimeWindowLogger is closed")
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # the writer is stuck (slow or failing disk): don't grow without bound
+            self.dropped += 1
+            log.event("time_window_logger.dropped", "queue full", level="WARNING", dropped=self.dropped)
+
+    def log_many(self, rows: Iterable[TimeWindowFeatureRow]):
+        for row in rows:
+            self.log(row)
+
+    def close(self):
+        """Drain pending rows, flush, fsync and close every file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    # -------------------------
+    # Writer thread
+    # -------------------------
+
+    def _rotate_if_needed(self):
+        new_day = self.rotate_daily and datetime.now().date() != self._day
+        for sink in self._sinks:
+            if new_day or (self.rotate_bytes and sink.size() >= self.rotate_bytes):
+                try:
+                    sink.close()
+                    rotate_out(sink.path)
+                except Exception:
+                    # a failed rename keeps appending to the same file
+                    self._failed("rotate", sink)
+                self._reopen(sink)
+        self._day = datetime.now().date()
+
+    def _reopen(self, sink):
+        try:
+            sink.close()
+            sink.open()
+        except Exception:
+            self._failed("open", sink)
+
+    def _failed(self, what: str, sink):
+        self.failed += 1
+        log.event(
+            "time_window_logger.write_failed", f"{what} failed",
+            level="ERROR", exc=True, path=sink.path, failed=self.failed,
+        )
+
+    def _flush(self):
+        for sink in self._sinks:
+            try:
+                sink.maybe_flush(sync=self.fsync)
+            except Exception:
+                self._failed("flush", sink)
+        self._pending_rows = 0
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
+
+    def _close_aged_chunks(self):
+        # idle: nothing for the CSV, but a columnar chunk may have aged out
+        for sink in self._sinks:
+            if isinstance(sink, ColumnarWriter):
+                try:
+                    sink.maybe_flush(sync=self.fsync)
+                except Exception:
+                    self._failed("flush", sink)
+
+    def _flush_due(self) -> bool:
+        return (
+            self._pending_rows >= self.flush_rows
+            or self._pending_bytes >= self.flush_bytes
+            or (self._pending_rows and time.monotonic() - self._last_flush >= self.flush_interval)
+        )
+
+    def _write(self, row: TimeWindowFeatureRow):
+        self._rotate_if_needed()
+        ok = True
+        for sink in self._sinks:
+            if sink.closed:
+                # an earlier open failed: retry once per row
+                self._reopen(sink)
+            try:
+                self._pending_bytes += sink.write_row(row) or 0
+            except Exception:
+                ok = False
+                self._failed("write", sink)
+        self._pending_rows += 1
+        self.written += ok
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                break
+
+            if item is not None:
+                self._write(item)
+
+            if self._flush_due():
+                self._flush()
+            elif item is None:
+                self._close_aged_chunks()
+
+        for sink in self._sinks:
+            try:
+                sink.close()
+            except Exception:
+                self._failed("close", sink)
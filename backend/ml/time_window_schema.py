@@ -1,31 +1,38 @@
-from dataclasses import dataclass
+from dataclasses import fields, make_dataclass
 
+from features.registry import FEATURES
 
-@dataclass
-class TimeWindowFeatureRow:
-    window_start_ts: float
-    window_duration: float
+# Generated from features.registry: identifiers first, then every registered
+# window feature in declaration order, then the label columns.
+#
+#   session_id    SESSION_ID of the backend run that produced the window
+#   <features>    see features/registry.py
+#   label         the window's label
+#   label_source  "human" (label_request) or "model" (confident prediction)
+TimeWindowFeatureRow = make_dataclass(
+    "TimeWindowFeatureRow",
+    [("session_id", str)]
+    + [(f.name, f.dtype) for f in FEATURES]
+    + [("label", str), ("label_source", str)],
+)
+TimeWindowFeatureRow.__module__ = __name__
 
-    keys_mean: float
-    keys_std: float
-    mouse_mean: float
-    idle_ratio_mean: float
-    longest_idle_streak: float
 
-    percent_time_on_primary: float
-    num_context_switches: int
-    fragmentation_score: float
-    time_away_from_primary: float
+# identifiers / targets, not model inputs
+NON_FEATURE_FIELDS = {"session_id", "label", "label_source"}
 
-    percent_browser_time: float
-    doomscroll_prob_mean: float
-    doomscroll_duration: float
 
-    face_present_ratio: float
-    gaze_on_screen_ratio: float
-    head_motion_mean: float
+# features that are clocks, not behaviour: an absolute epoch and time since
+# session start / last break grow without bound, so every new value lies
+# outside what a model (and its running normalizer) has seen
+NON_MODEL_FEATURES = {"window_start_ts", "session_elapsed_time", "time_since_last_break"}
 
-    session_elapsed_time: float
-    time_since_last_break: float
 
-    label: str
+def feature_names() -> list:
+    """Every feature column of TimeWindowFeatureRow."""
+    return [f.name for f in fields(TimeWindowFeatureRow) if f.name not in NON_FEATURE_FIELDS]
+
+
+def model_feature_names() -> list:
+    """The model inputs (ml.online_learner, exported models): features minus clocks."""
+    return [name for name in feature_names() if name not in NON_MODEL_FEATURES]
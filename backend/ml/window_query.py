@@ -0,0 +1,153 @@
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from ml.columnar import ColumnarChunk, ColumnarReader
+
+DEFAULT_DATASET = "data/time_windows.ebcol"
+
+
+def _chunk_may_match(
+    chunk: ColumnarChunk,
+    start_ts: Optional[float],
+    end_ts: Optional[float],
+    session_id: Optional[str],
+    labels: Optional[set],
+) -> bool:
+    lo, hi = chunk.ts_min, chunk.ts_max
+    if session_id is not None:
+        r = chunk.sessions.get(session_id)
+        if r is None:
+            return False
+        lo, hi = r[0], r[1]
+
+    if start_ts is not None and hi is not None and hi < start_ts:
+        return False
+    if end_ts is not None and lo is not None and lo >= end_ts:
+        return False
+    if labels is not None and chunk.labels and not labels.intersection(chunk.labels):
+        return False
+    return True
+
+
+def query_windows(
+    path: str = DEFAULT_DATASET,
+    *,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+    session_id: Optional[str] = None,
+    labels: Optional[Iterable[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    batch_rows: int = 4096,
+    decode_strings: bool = True,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Stream logged windows matching all filters as column batches.
+
+      start_ts <= window_start_ts < end_ts
+      session_id == session_id
+      label in labels
+
+    Chunks are skipped using the sidecar index (session ranges, ts range,
+    distinct labels), and only the projected + filter columns of the
+    remaining chunks are touched in the memory map. Each yielded batch maps
+    column name -> array of at most batch_rows rows. String columns are
+    decoded to object arrays unless decode_strings=False (then raw codes).
+
+    Example:
+        for batch in query_windows(session_id=sid, start_ts=t0, end_ts=t1,
+                                   labels=["break"], columns=["keys_mean"]):
+            ...
+    """
+    label_set = set(labels) if labels is not None else None
+
+    reader = ColumnarReader(path)
+    try:
+        all_columns = [c[0] for c in reader.columns]
+        out_cols = list(columns) if columns else all_columns
+        unknown = [c for c in out_cols if c not in all_columns]
+        if unknown:
+            raise KeyError(f"unknown columns: {unknown}")
+
+        filter_cols = []
+        if start_ts is not None or end_ts is not None:
+            filter_cols.append("window_start_ts")
+        if session_id is not None:
+            filter_cols.append("session_id")
+        if label_set is not None:
+            filter_cols.append("label")
+        read_cols = list(dict.fromkeys(out_cols + filter_cols))
+
+        # filter values -> dictionary codes (a value never seen matches nothing)
+        session_code = None
+        if session_id is not None:
+            sessions = reader.dictionaries.get("session_id", [])
+            if session_id not in sessions:
+                return
+            session_code = sessions.index(session_id)
+
+        label_codes = None
+        if label_set is not None:
+            known = reader.dictionaries.get("label", [])
+            label_codes = np.array([i for i, v in enumerate(known) if v in label_set])
+            if label_codes.size == 0:
+                return
+
+        string_cols = set(reader.dictionaries)
+
+        for chunk in reader.chunks:
+            if not _chunk_may_match(chunk, start_ts, end_ts, session_id, label_set):
+                continue
+
+            cols = reader.chunk_columns(chunk, read_cols)
+
+            mask = None
+            if start_ts is not None:
+                mask = cols["window_start_ts"] >= start_ts
+            if end_ts is not None:
+                m = cols["window_start_ts"] < end_ts
+                mask = m if mask is None else mask & m
+            if session_code is not None:
+                m = cols["session_id"] == session_code
+                mask = m if mask is None else mask & m
+            if label_codes is not None:
+                m = np.isin(cols["label"], label_codes)
+                mask = m if mask is None else mask & m
+
+            if mask is not None:
+                if not mask.any():
+                    continue
+                if mask.all():
+                    mask = None
+
+            selected = {}
+            for name in out_cols:
+                arr = cols[name] if mask is None else cols[name][mask]
+                if decode_strings and name in string_cols:
+                    arr = reader.decode(name, arr)
+                selected[name] = arr
+
+            n = len(next(iter(selected.values()))) if selected else 0
+            for start in range(0, n, batch_rows):
+                yield {name: arr[start:start + batch_rows] for name, arr in selected.items()}
+    finally:
+        reader.close()
+
+
+def list_sessions(path: str = DEFAULT_DATASET) -> Dict[str, list]:
+    """session_id -> [ts_min, ts_max, rows], from the index only."""
+    reader = ColumnarReader(path)
+    try:
+        out: Dict[str, list] = {}
+        for chunk in reader.chunks:
+            for sid, (lo, hi, n) in chunk.sessions.items():
+                r = out.get(sid)
+                if r is None:
+                    out[sid] = [lo, hi, n]
+                else:
+                    r[0] = min(r[0], lo)
+                    r[1] = max(r[1], hi)
+                    r[2] += n
+        return out
+    finally:
+        reader.close()
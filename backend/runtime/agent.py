@@ -0,0 +1,166 @@
+import json
+import socket
+import struct
+import threading
+from collections import deque
+from typing import Optional
+
+from ml.raw_archive import RAW_FIELDS, TickEncoder
+from runtime.ingest import DEFAULT_PORT, INGEST_MAGIC, INGEST_VERSION, MAX_FRAME
+
+# --------------------------------------------------
+# Agent mode: stream raw ticks to a central ingest server
+# --------------------------------------------------
+#
+# Enabled in main.py by EARNBREAK_INGEST_SERVER=host[:port]. The tick loop
+# hands each raw tick to send(), which only appends to a bounded buffer; a
+# background thread connects, encodes (runtime.ingest protocol) and sends.
+# While the server is unreachable the newest max_buffer ticks are kept and
+# sent after reconnecting, in frames of at most FRAME_BYTES (the server drops
+# a connection whose frame exceeds MAX_FRAME). A single tick too large for
+# any frame is dropped.
+
+_U32 = struct.Struct("<I")
+
+FRAME_BYTES = MAX_FRAME // 4
+
+
+def parse_address(address: str):
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, DEFAULT_PORT
+    return host, int(port)
+
+
+class IngestClient:
+    def __init__(
+        self,
+        address: str,
+        agent: Optional[str] = None,
+        max_buffer: int = 3600,
+        reconnect_sec: float = 5.0,
+    ):
+        self.host, self.port = parse_address(address)
+        self.agent = agent or socket.gethostname()
+        self.reconnect_sec = reconnect_sec
+
+        self._buffer: deque = deque(maxlen=max_buffer)
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._sock: Optional[socket.socket] = None
+        self._session: Optional[str] = None
+        self._encoder = TickEncoder(RAW_FIELDS)
+        self._batch_sent = 0
+
+        self.sent = 0
+        self.dropped = 0
+        self.connected = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, tick: dict):
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(tick)
+            self._cond.notify()
+
+    def close(self, timeout: float = 2.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        self._disconnect()
+
+    # -------------------------
+    # Sender thread
+    # -------------------------
+
+    def _connect(self, session_id: str):
+        sock = socket.create_connection((self.host, self.port), timeout=10)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        header = json.dumps(
+            {"version": INGEST_VERSION, "session_id": session_id, "agent": self.agent, "fields": RAW_FIELDS}
+        ).encode()
+        sock.sendall(INGEST_MAGIC + _U32.pack(len(header)) + header)
+        self._sock = sock
+        self._session = session_id
+        self._encoder.reset()
+        self.connected = True
+
+    def _disconnect(self):
+        if self._sock:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._session = None
+        self.connected = False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._stop:
+                    self._cond.wait()
+                if self._stop and not self._buffer:
+                    return
+                batch = list(self._buffer)
+                self._buffer.clear()
+
+            try:
+                self._send_batch(batch)
+            except OSError:
+                self._disconnect()
+                with self._cond:
+                    # unsent ticks go back in front of newer ones; the
+                    # oldest are dropped if that overflows the buffer
+                    unsent = batch[self._batch_sent:] + list(self._buffer)
+                    self.dropped += max(0, len(unsent) - self._buffer.maxlen)
+                    self._buffer = deque(unsent, maxlen=self._buffer.maxlen)
+                    if self._stop:
+                        return
+                    self._cond.wait(self.reconnect_sec)
+
+    def _send_batch(self, batch: list):
+        self._batch_sent = 0
+        while self._batch_sent < len(batch):
+            session_id = batch[self._batch_sent].get("session_id") or ""
+            if self._sock is None or session_id != self._session:
+                self._disconnect()
+                self._connect(session_id)
+
+            # frames of up to FRAME_BYTES per run of ticks from the same session
+            buf = bytearray()
+            record = bytearray()
+            start = end = self._batch_sent
+            while end < len(batch) and (batch[end].get("session_id") or "") == session_id:
+                record.clear()
+                self._encoder.encode(batch[end], record)
+                if len(record) > MAX_FRAME:
+                    # never accepted; the encoder's state now includes it, so
+                    # the rest goes on a fresh connection
+                    self._send_frame(buf, start, end)
+                    self.dropped += 1
+                    self._batch_sent = end + 1
+                    self._disconnect()
+                    break
+                if buf and len(buf) + len(record) > FRAME_BYTES:
+                    self._send_frame(buf, start, end)
+                    buf.clear()
+                    start = end
+                buf += record
+                end += 1
+            else:
+                self._send_frame(buf, start, end)
+
+    def _send_frame(self, buf: bytearray, start: int, end: int):
+        if buf:
+            self._sock.sendall(_U32.pack(len(buf)) + buf)
+        self.sent += end - start
+        self._batch_sent = end
@@ -0,0 +1,114 @@
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# --------------------------------------------------
+# Steady-state allocation benchmark of the tick loop
+# --------------------------------------------------
+#
+# Imports main.py with fake collectors in a scratch directory (removed
+# afterwards) and calls tick() directly, as fast as it runs. The time window is made long enough
+# that no window completes during the run, so what is measured is the
+# per-tick steady state:
+#
+#   retained_bytes_per_tick   net growth of traced memory (what a tick
+#                             leaves behind: the window's column values)
+#   peak_bytes_per_tick       mean of the per-tick high-water mark above the
+#                             starting point (transient garbage)
+#   blocks_per_tick           net change of live allocator blocks
+#   top                       source lines that retained the most
+#
+# Usage (from backend/):
+#   python -m runtime.alloc_bench --ticks 2000
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_main(workdir: str):
+    os.environ.setdefault("EARNBREAK_FAKE_COLLECTORS", "1")
+    os.environ.setdefault("EARNBREAK_TIME_WINDOW_SEC", str(24 * 3600))
+    os.environ.setdefault("EARNBREAK_LOG_LEVEL", "WARNING")
+    os.chdir(workdir)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import main
+    return main
+
+
+def run(ticks: int, warmup: int, top: int) -> dict:
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="earnbreak-alloc-")
+    try:
+        main = load_main(workdir)
+        try:
+            return _measure(main, ticks, top, warmup)
+        finally:
+            main.time_window_logger.close()
+            main.raw_archive.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _measure(main, ticks: int, top: int, warmup: int) -> dict:
+
+    for _ in range(warmup):
+        main.tick()
+
+    gc.collect()
+    gc.disable()
+    try:
+        tracemalloc.start(1)
+        base_snap = tracemalloc.take_snapshot()
+        base_mem, _ = tracemalloc.get_traced_memory()
+        base_blocks = sys.getallocatedblocks()
+
+        peaks = 0
+        t0 = time.perf_counter()
+        for _ in range(ticks):
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+            main.tick()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks += peak - start
+        elapsed = time.perf_counter() - t0
+
+        gc.collect()    # retained = still reachable, not garbage awaiting a pass
+        end_mem, _ = tracemalloc.get_traced_memory()
+        end_blocks = sys.getallocatedblocks()
+        stats = tracemalloc.take_snapshot().compare_to(base_snap, "lineno")
+        tracemalloc.stop()
+    finally:
+        gc.enable()
+
+    return {
+        "ticks": ticks,
+        "tick_us": round(elapsed / ticks * 1e6, 1),   # includes tracemalloc overhead
+        "retained_bytes_per_tick": round((end_mem - base_mem) / ticks, 1),
+        "peak_bytes_per_tick": round(peaks / ticks, 1),
+        "blocks_per_tick": round((end_blocks - base_blocks) / ticks, 2),
+        "top": [
+            {"where": str(s.traceback[-1]), "size_diff": s.size_diff, "count_diff": s.count_diff}
+            for s in stats[:top]
+            if s.size_diff > 0
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-tick allocation benchmark of the tick loop.")
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.ticks, args.warmup, args.top), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import time
+from typing import Callable, Dict, Optional
+
+# --------------------------------------------------
+# Power-aware duty cycling of the tick pipeline
+# --------------------------------------------------
+#
+#   active      everything at full rate
+#   low_power   camera at a low frame rate, window polled every few ticks,
+#               browser intent only re-inferred on fresh telemetry
+#   suspended   camera released, nothing collected, logged or aggregated;
+#               each tick only reads the OS idle counter
+#
+# The state is re-decided every tick from the OS idle time, the camera's
+# face_present and whether the last context was a break (which shortens the
+# idle time before low_power). Moving down takes the thresholds below; any
+# input brings it back to active on the next tick. A locked screen shows up
+# as growing idle time (the OS counter keeps running), so it ends up
+# suspended like any other absence.
+
+ACTIVE = "active"
+LOW_POWER = "low_power"
+SUSPENDED = "suspended"
+STATES = (ACTIVE, LOW_POWER, SUSPENDED)
+
+
+class DutyCycleController:
+    def __init__(
+        self,
+        low_power_idle_sec: float = 60.0,
+        suspend_idle_sec: float = 5 * 60.0,
+        no_face_sec: float = 30.0,
+        break_idle_sec: float = 10.0,
+        resume_idle_sec: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_change: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.low_power_idle_sec = low_power_idle_sec
+        self.suspend_idle_sec = suspend_idle_sec
+        self.no_face_sec = no_face_sec
+        self.break_idle_sec = break_idle_sec
+        self.resume_idle_sec = resume_idle_sec
+        self.clock = clock
+        self.on_change = on_change
+
+        now = clock()
+        self.state = ACTIVE
+        self.since = now
+        self.seconds: Dict[str, float] = {s: 0.0 for s in STATES}
+        self.transitions = 0
+        self._last_update = now
+        self._face_seen = now
+
+    def decide(self, idle_seconds: float, face_present: float, on_break: bool, now: float) -> str:
+        if face_present >= 0.5:
+            self._face_seen = now
+        no_face = now - self._face_seen >= self.no_face_sec
+
+        if idle_seconds < self.resume_idle_sec:
+            return ACTIVE   # input since the last tick
+        if idle_seconds >= self.suspend_idle_sec and no_face:
+            return SUSPENDED
+        low_after = self.break_idle_sec if on_break else self.low_power_idle_sec
+        if idle_seconds >= low_after or (no_face and idle_seconds >= self.no_face_sec):
+            return LOW_POWER
+        return ACTIVE
+
+    def update(self, idle_seconds: float, face_present: float, on_break: bool = False) -> str:
+        """Account the time since the last call and move to the new state."""
+        now = self.clock()
+        self.seconds[self.state] += now - self._last_update
+        self._last_update = now
+
+        new = self.decide(idle_seconds, face_present, on_break, now)
+        if new != self.state:
+            old, self.state = self.state, new
+            self.since = now
+            self.transitions += 1
+            if self.on_change:
+                self.on_change(old, new)
+        return self.state
+
+    def stats(self) -> dict:
+        now = self.clock()
+        seconds = dict(self.seconds)
+        seconds[self.state] += now - self._last_update
+        total = sum(seconds.values()) or 1.0
+        return {
+            "state": self.state,
+            "in_state_sec": round(now - self.since, 1),
+            "transitions": self.transitions,
+            "seconds": {s: round(v, 1) for s, v in seconds.items()},
+            "share": {s: round(v / total, 3) for s, v in seconds.items()},
+        }
@@ -0,0 +1,415 @@
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import queue
+import struct
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from context_engine.symbols import symbols
+from context_engine.taxonomy import rule_store
+from features.session_pipeline import SessionPipeline
+from ml.inference import InferenceEngine
+from ml.raw_archive import RAW_FIELDS, TickDecoder, check_fields
+from ml.time_window_logger import TimeWindowLogger
+from ml.time_window_schema import TimeWindowFeatureRow
+from runtime import log
+
+# --------------------------------------------------
+# Multi-agent ingestion server
+# --------------------------------------------------
+#
+# Agents (runtime.agent) stream raw ticks over TCP; one connection carries
+# one session:
+#
+#   hello:  INGEST_MAGIC(8) | u32 header_len | header JSON
+#           header JSON = {"version": 1, "session_id": .., "agent": ..,
+#                          "fields": [[name, kind, scale], ...]}
+#   frames: u32 len | TICK/DICT records (the ml.raw_archive record format;
+#           dictionaries and deltas run from the start of the connection)
+#
+# The acceptor process only frames bytes. Each session is owned by one
+# shard process (crc32(session_id) % shards) that decodes its frames and
+# keeps its SessionPipeline, so per-session state never crosses processes
+# and throughput scales with the number of shards. Completed windows are
+# scored with the exported model (if any) and written per shard to
+# <out_dir>/shard-<i>.ebcol.
+#
+# A hello whose fields don't match ml.raw_archive.RAW_FIELDS is refused. A
+# stream that still fails to decode or feed drops only its own connection
+# and session. Shard inboxes are bounded: when a shard falls behind, the
+# acceptor stops reading that shard's connections (TCP pushes back on the
+# agents) instead of queueing without limit.
+#
+# There is no authentication: the server listens on 127.0.0.1 unless told
+# otherwise (--host), and should only be exposed on a trusted network.
+#
+# Usage (from backend/):
+#   python -m runtime.ingest --port 8765 --shards 8
+
+INGEST_MAGIC = b"EBING1\0\0"
+INGEST_VERSION = 1
+DEFAULT_PORT = 8765
+DEFAULT_OUT_DIR = "data/ingest"
+
+# shards drop app / title / domain symbols of sessions that went away
+SYMBOL_PRUNE_SEC = 10 * 60
+
+MAX_HEADER = 64 * 1024
+MAX_FRAME = 1 << 20
+# batches queued per shard before the acceptor waits for it
+INBOX_BATCHES = 64
+
+_U32 = struct.Struct("<I")
+
+# shard inbox messages: (op, conn_id, payload)
+OPEN = 0    # payload: header dict
+DATA = 1    # payload: record bytes
+CLOSE = 2   # payload: None
+
+
+def shard_of(session_id: str, shards: int) -> int:
+    return zlib.crc32(session_id.encode("utf-8")) % shards
+
+
+# --------------------------------------------------
+# Shard worker (one process per shard)
+# --------------------------------------------------
+
+class _Shard:
+    def __init__(self, index: int, out_dir: str, window_sec: int, idle_sec: float, model_path: str):
+        self.index = index
+        self.window_sec = window_sec
+        self.idle_sec = idle_sec
+
+        self.logger = TimeWindowLogger(
+            os.path.join(out_dir, f"shard-{index}.csv"),
+            formats=("columnar",),
+        )
+        self.engine = InferenceEngine(model_path)
+
+        self.sessions: Dict[str, SessionPipeline] = {}
+        self.last_seen: Dict[str, float] = {}
+        self.decoders: Dict[int, Tuple[str, TickDecoder]] = {}
+
+        self.ticks = 0
+        self.windows = 0
+        self.evicted = 0
+        self.failed = 0
+
+    def handle(self, op: int, conn_id: int, payload):
+        if op == DATA:
+            entry = self.decoders.get(conn_id)
+            if entry is None:
+                return
+            session_id, decoder = entry
+            pipeline = self.sessions.get(session_id)
+            if pipeline is None:
+                pipeline = self.sessions[session_id] = SessionPipeline(self.window_sec)
+            self.last_seen[session_id] = time.monotonic()
+
+            for tick in decoder.decode(payload):
+                self.ticks += 1
+                features = pipeline.feed(tick)
+                if features is not None:
+                    self._log(session_id, features)
+        elif op == OPEN:
+            self.decoders[conn_id] = (payload["session_id"], TickDecoder(payload["fields"]))
+        elif op == CLOSE:
+            self.decoders.pop(conn_id, None)
+
+    def fail(self, conn_id: int):
+        """Forget a connection whose stream broke, and its session."""
+        entry = self.decoders.pop(conn_id, None)
+        if entry is not None:
+            session_id = entry[0]
+            self.sessions.pop(session_id, None)
+            self.last_seen.pop(session_id, None)
+        self.failed += 1
+
+    def _log(self, session_id: str, features: dict):
+        pred = self.engine.score(features)
+        if self.engine.is_uncertain(pred):
+            label, label_source = "", "unlabeled"
+        else:
+            label, label_source = pred.label, "model"
+        self.logger.log(
+            TimeWindowFeatureRow(
+                session_id=session_id,
+                **features,
+                label=label,
+                label_source=label_source,
+            )
+        )
+        self.windows += 1
+
+    def evict_idle(self):
+        """Drop sessions that went quiet; a half-filled window goes with them."""
+        cutoff = time.monotonic() - self.idle_sec
+        live = {sid for sid, _ in self.decoders.values()}
+        for sid in [s for s, t in self.last_seen.items() if t < cutoff and s not in live]:
+            del self.sessions[sid]
+            del self.last_seen[sid]
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        return {
+            "shard": self.index,
+            "sessions": len(self.sessions),
+            "connections": len(self.decoders),
+            "ticks": self.ticks,
+            "windows": self.windows,
+            "evicted": self.evicted,
+            "failed": self.failed,
+            "windows_dropped": self.logger.dropped,
+            "window_write_errors": self.logger.failed,
+        }
+
+
+def _shard_main(index: int, inbox, stats_out, out_dir: str, window_sec: int, idle_sec: float, model_path: str):
+    log.setup(log_dir=None)
+    rule_store.current  # compile/load the taxonomy once per process
+    shard = _Shard(index, out_dir, window_sec, idle_sec, model_path)
+    last_report = last_prune = time.monotonic()
+    try:
+        while True:
+            try:
+                batch = inbox.get(timeout=1.0)
+            except queue.Empty:
+                batch = []
+            if batch is None:
+                break
+            for op, conn_id, payload in batch:
+                try:
+                    shard.handle(op, conn_id, payload)
+                except Exception:
+                    log.event(
+                        "ingest.stream_failed",
+                        "dropping connection",
+                        level="ERROR",
+                        exc=True,
+                        shard=index,
+                        conn_id=conn_id,
+                    )
+                    shard.fail(conn_id)
+
+            now = time.monotonic()
+            if now - last_report >= 5.0:
+                shard.evict_idle()
+                stats_out.put(shard.stats())
+                last_report = now
+            if now - last_prune >= SYMBOL_PRUNE_SEC:
+                symbols.prune()
+                last_prune = now
+    finally:
+        shard.logger.close()
+        stats_out.put(shard.stats())
+        log.shutdown()
+
+
+# --------------------------------------------------
+# Acceptor (asyncio, main process)
+# --------------------------------------------------
+
+class IngestServer:
+    """
+    Accepts agent connections and routes their frames to shard processes.
+    Messages to a shard are batched (up to batch_interval seconds or
+    batch_size messages) so queue overhead stays off the per-tick path.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        shards: Optional[int] = None,
+        out_dir: str = DEFAULT_OUT_DIR,
+        window_sec: int = 60,
+        idle_sec: float = 30 * 60,
+        model_path: str = "models/window_model.npz",
+        batch_interval: float = 0.02,
+        batch_size: int = 512,
+    ):
+        self.host = host
+        self.port = port
+        self.num_shards = shards or os.cpu_count() or 1
+        self.out_dir = out_dir
+        self.window_sec = window_sec
+        self.idle_sec = idle_sec
+        self.model_path = model_path
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+
+        self._inboxes: List = []
+        self._procs: List[mp.Process] = []
+        self._stats_q = None
+        self._pending: List[list] = []
+        self._next_conn = 0
+
+        self.connections = 0
+        self.shard_stats: Dict[int, dict] = {}
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+
+    def start_shards(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        ctx = mp.get_context("spawn")
+        self._stats_q = ctx.Queue()
+        for i in range(self.num_shards):
+            inbox = ctx.Queue(maxsize=INBOX_BATCHES)
+            proc = ctx.Process(
+                target=_shard_main,
+                args=(i, inbox, self._stats_q, self.out_dir, self.window_sec, self.idle_sec, self.model_path),
+                daemon=True,
+            )
+            proc.start()
+            self._inboxes.append(inbox)
+            self._procs.append(proc)
+        self._pending = [[] for _ in range(self.num_shards)]
+
+    def stop_shards(self):
+        for shard, pending in enumerate(self._pending):
+            if pending:
+                self._inboxes[shard].put(pending)  # may block: shutting down
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for proc in self._procs:
+            proc.join()
+        self._collect_stats()
+
+    async def serve_forever(self):
+        self.start_shards()
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        flusher = asyncio.create_task(self._flush_loop())
+        log.event("ingest.start", host=self.host, port=self.port, shards=self.num_shards)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            self.stop_shards()
+
+    # -------------------------
+    # Routing
+    # -------------------------
+
+    def _route(self, shard: int, msg: tuple):
+        pending = self._pending[shard]
+        pending.append(msg)
+        if len(pending) >= self.batch_size:
+            self._push(shard)
+
+    def _push(self, shard: int):
+        # never blocks the event loop: a full inbox keeps the batch pending
+        # (and _backpressure() holds the shard's readers)
+        try:
+            self._inboxes[shard].put_nowait(self._pending[shard])
+        except queue.Full:
+            return
+        self._pending[shard] = []
+
+    def _flush(self):
+        for shard, pending in enumerate(self._pending):
+            if pending:
+                self._push(shard)
+
+    async def _backpressure(self, shard: int):
+        while len(self._pending[shard]) >= 2 * self.batch_size:
+            if not self._procs[shard].is_alive():
+                raise ConnectionError(f"shard {shard} is gone")
+            await asyncio.sleep(self.batch_interval)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            self._flush()
+            self._collect_stats()
+
+    def _collect_stats(self):
+        while True:
+            try:
+                s = self._stats_q.get_nowait()
+            except queue.Empty:
+                return
+            self.shard_stats[s["shard"]] = s
+
+    def stats(self) -> dict:
+        shards = [self.shard_stats.get(i, {}) for i in range(self.num_shards)]
+        return {
+            "connections": self.connections,
+            "sessions": sum(s.get("sessions", 0) for s in shards),
+            "ticks": sum(s.get("ticks", 0) for s in shards),
+            "windows": sum(s.get("windows", 0) for s in shards),
+            "shards": shards,
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._next_conn += 1
+        conn_id = self._next_conn
+        shard = None
+        try:
+            magic = await reader.readexactly(8)
+            (header_len,) = _U32.unpack(await reader.readexactly(4))
+            if magic != INGEST_MAGIC or header_len > MAX_HEADER:
+                return
+            header = json.loads(await reader.readexactly(header_len))
+            if not isinstance(header, dict):
+                return
+            session_id = str(header["session_id"])
+            fields = header.get("fields", RAW_FIELDS)
+            error = check_fields(fields)
+            if error:
+                log.event("ingest.rejected", error, level="WARNING", session_id=session_id)
+                return
+
+            shard = shard_of(session_id, self.num_shards)
+            self.connections += 1
+            self._route(shard, (OPEN, conn_id, {"session_id": session_id, "fields": fields}))
+
+            while True:
+                (n,) = _U32.unpack(await reader.readexactly(4))
+                if n > MAX_FRAME:
+                    break
+                self._route(shard, (DATA, conn_id, await reader.readexactly(n)))
+                await self._backpressure(shard)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, KeyError, TypeError):
+            pass
+        finally:
+            if shard is not None:
+                self.connections -= 1
+                self._route(shard, (CLOSE, conn_id, None))
+            writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Central ingestion server for EarnBreak agents.")
+    parser.add_argument("--host", default="127.0.0.1", help="no authentication: keep it on a trusted network")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--shards", type=int, default=None, help="shard processes (default: all cores)")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR)
+    parser.add_argument("--window-sec", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    log.setup(log_dir=None)
+    server = IngestServer(
+        host=args.host,
+        port=args.port,
+        shards=args.shards,
+        out_dir=args.out,
+        window_sec=args.window_sec,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log.shutdown()
+
+
+if __name__ == "__main__":
+    main()
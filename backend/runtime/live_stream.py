@@ -0,0 +1,249 @@
+import json
+import struct
+from typing import Callable, Dict, List, Optional
+
+from runtime.ws_broadcast import Broadcaster, ClientQueue
+
+# --------------------------------------------------
+# Topic subscriptions with delta-encoded frames
+# --------------------------------------------------
+#
+# A client opts in by sending
+#
+#   {"type": "subscribe", "encoding": "json" | "binary",
+#    "topics": {"live_state": 1, "metrics": 5, ...}}
+#
+# where each number means "every Nth update of that topic". Clients that
+# never subscribe keep receiving the legacy full {"type": "live_state"} JSON.
+#
+# Subscribers with the same (topic, every, encoding) share one group: each
+# update is delta-encoded once per group and the same frame object is queued
+# for every member. A frame is either a keyframe (every field) or a delta
+# (only fields that changed since the group's previous frame); a keyframe is
+# sent every KEYFRAME_EVERY frames, to new members, after a "resync"
+# request, and in place of an unsent delta that a slow client's queue
+# coalesces away, so a client's state is always reconstructible.
+#
+# JSON frames (text):
+#   {"topic": .., "seq": n, "key": true|false, "data": {field: value}}
+#
+# Binary frames (bytes, little endian):
+#   u8 flags (bit 0 = keyframe) | u8 topic index (TOPICS) | varint seq |
+#   varint nfields | fields
+#     keyframe field: varint name_len | utf-8 name | value
+#     delta field:    varint index into the last keyframe's names | value
+#   value: u8 tag | payload
+#     0 null  1 false  2 true  3 int (zigzag varint)  4 f64
+#     5 str (varint len | utf-8)  6 other (varint len | JSON)
+#
+# Label requests and control replies stay JSON text frames.
+
+TOPICS = ["live_state", "features", "predictions", "metrics"]
+ENCODINGS = ("json", "binary")
+
+KEYFRAME_EVERY = 30
+
+_F64 = struct.Struct("<d")
+
+
+def _put_varint(out: bytearray, n: int):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _put_value(out: bytearray, v):
+    if v is None:
+        out.append(0)
+    elif v is True or v is False:
+        out.append(2 if v else 1)
+    elif isinstance(v, int):
+        out.append(3)
+        _put_varint(out, (v << 1) ^ (v >> 63))
+    elif isinstance(v, float):
+        out.append(4)
+        out += _F64.pack(v)
+    elif isinstance(v, str):
+        raw = v.encode("utf-8")
+        out.append(5)
+        _put_varint(out, len(raw))
+        out += raw
+    else:
+        raw = json.dumps(v, separators=(",", ":")).encode("utf-8")
+        out.append(6)
+        _put_varint(out, len(raw))
+        out += raw
+
+
+class _Group:
+    """Subscribers sharing one (topic, every, encoding) stream."""
+
+    def __init__(self, topic: str, every: int, encoding: str):
+        self.topic = topic
+        self.topic_index = TOPICS.index(topic)
+        self.every = every
+        self.encoding = encoding
+
+        self.members: Dict[int, ClientQueue] = {}
+        self.updates = 0
+        self.seq = 0
+        self.since_key = 0
+        self.state: Optional[dict] = None
+        self.names: List[str] = []      # binary field table of the last keyframe
+        self._index: Dict[str, int] = {}
+
+        self.frames_encoded = 0
+        self.bytes_encoded = 0
+
+    def encode(self, data: dict, key: bool):
+        self.frames_encoded += 1
+        if self.encoding == "json":
+            frame = json.dumps(
+                {"topic": self.topic, "seq": self.seq, "key": key, "data": data},
+                separators=(",", ":"),
+            )
+            self.bytes_encoded += len(frame)
+            return frame
+
+        out = bytearray((1 if key else 0, self.topic_index))
+        _put_varint(out, self.seq)
+        _put_varint(out, len(data))
+        for name, v in data.items():
+            if key:
+                raw = name.encode("utf-8")
+                _put_varint(out, len(raw))
+                out += raw
+            else:
+                _put_varint(out, self._index[name])
+            _put_value(out, v)
+        frame = bytes(out)
+        self.bytes_encoded += len(frame)
+        return frame
+
+    def _new_table(self, data: dict):
+        self.names = list(data)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.since_key = 0
+
+    def keyframe_encoder(self) -> Callable:
+        """Encodes the current state as a keyframe at most once."""
+        cache = []
+
+        def encode():
+            if not cache:
+                cache.append(self.encode(self.state, key=True))
+            return cache[0]
+
+        return encode
+
+    def publish(self, data: dict, pending_keys: set):
+        self.updates += 1
+        if (self.updates - 1) % self.every:
+            return
+
+        prev = self.state
+        key_due = (
+            prev is None
+            or self.since_key >= KEYFRAME_EVERY - 1
+            or any(name not in self._index for name in data)
+        )
+        if key_due:
+            changed = data
+        else:
+            changed = {k: v for k, v in data.items() if prev.get(k) != v}
+            if not changed:
+                return  # nothing new for this group
+
+        self.seq += 1
+        self.state = dict(data)
+        if key_due:
+            self._new_table(data)
+        else:
+            self.since_key += 1
+
+        keyframe = self.keyframe_encoder()
+        frame = keyframe() if key_due else self.encode(changed, key=False)
+
+        for cid, client in list(self.members.items()):
+            if cid in pending_keys:
+                pending_keys.discard(cid)
+                client.put(self.topic, keyframe(), coalesce=True)
+            else:
+                client.put(self.topic, frame, coalesce=True, resync=keyframe)
+
+
+class LiveStream:
+    """Topic groups on top of a Broadcaster's per-client queues."""
+
+    def __init__(self, broadcaster: Broadcaster):
+        self.broadcaster = broadcaster
+        self._groups: Dict[tuple, _Group] = {}
+        # topic -> client ids whose next frame of that topic must be a keyframe
+        self._pending_keys: Dict[str, set] = {t: set() for t in TOPICS}
+
+    def subscribe(self, client: ClientQueue, topics: Dict[str, int], encoding: str = "json") -> dict:
+        if encoding not in ENCODINGS:
+            raise ValueError(f"unknown encoding {encoding!r}")
+        unknown = [t for t in topics if t not in TOPICS]
+        if unknown:
+            raise ValueError(f"unknown topics {unknown}")
+
+        self.unsubscribe(client)
+        accepted = {}
+        for topic, every in topics.items():
+            every = max(1, int(every))
+            group = self._groups.get((topic, every, encoding))
+            if group is None:
+                group = self._groups[(topic, every, encoding)] = _Group(topic, every, encoding)
+            group.members[client.client_id] = client
+            accepted[topic] = every
+
+            # catch up right away instead of waiting for the next update
+            if group.state is not None:
+                client.put(topic, group.keyframe_encoder()(), coalesce=True)
+            else:
+                self._pending_keys[topic].add(client.client_id)
+
+        client.subscribed = bool(accepted)
+        return {"type": "subscribed", "encoding": encoding, "topics": accepted, "topic_ids": TOPICS}
+
+    def unsubscribe(self, client: ClientQueue):
+        for key, group in list(self._groups.items()):
+            group.members.pop(client.client_id, None)
+            if not group.members:
+                del self._groups[key]
+        for ids in self._pending_keys.values():
+            ids.discard(client.client_id)
+        client.subscribed = False
+
+    def resync(self, client: ClientQueue):
+        """Client lost track (seq gap): next frame of every topic is a keyframe."""
+        for group in self._groups.values():
+            if client.client_id in group.members:
+                self._pending_keys[group.topic].add(client.client_id)
+
+    def has_subscribers(self, topic: str) -> bool:
+        return any(g.topic == topic for g in self._groups.values())
+
+    def publish(self, topic: str, data: dict):
+        pending = self._pending_keys[topic]
+        for group in list(self._groups.values()):
+            if group.topic == topic:
+                group.publish(data, pending)
+
+    def stats(self) -> dict:
+        return {
+            "groups": [
+                {
+                    "topic": g.topic,
+                    "every": g.every,
+                    "encoding": g.encoding,
+                    "members": len(g.members),
+                    "seq": g.seq,
+                    "frames_encoded": g.frames_encoded,
+                    "bytes_encoded": g.bytes_encoded,
+                }
+                for g in self._groups.values()
+            ]
+        }
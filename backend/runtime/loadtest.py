@@ -0,0 +1,350 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import psutil
+import websockets
+
+# --------------------------------------------------
+# Local load-generation harness for main.py
+# --------------------------------------------------
+#
+# Starts the app under uvicorn with fake collectors (collectors.fake_collectors)
+# in a scratch working directory, then drives it with:
+#
+#   N WebSocket consumers   fast, slow (read with a per-frame delay) and
+#                           labelers (answer label requests after a delay)
+#   1 metrics subscriber    per-tick tick_ms / loop_late_ms (runtime.live_stream)
+#   M browser producers     POST /telemetry/browser at a fixed rate each
+#
+# and reports throughput, p50/p99 tick and delivery latency, telemetry
+# latency and the server's RSS over time.
+#
+# Usage (from backend/):
+#   python -m runtime.loadtest --clients 50 --slow 10 --labelers 2 \
+#       --producers 20 --rate 5 --duration 60 --tick-sec 0.2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+def _summary(values: List[float], scale: float = 1000.0) -> dict:
+    return {
+        "n": len(values),
+        "p50_ms": round(percentile(values, 50) * scale, 2),
+        "p99_ms": round(percentile(values, 99) * scale, 2),
+        "max_ms": round(max(values) * scale, 2) if values else 0.0,
+    }
+
+
+class Stats:
+    def __init__(self):
+        self.frames: Dict[str, int] = {}
+        self.delivery: Dict[str, List[float]] = {}
+        self.label_requests = 0
+        self.labels_sent = 0
+        self.disconnects = 0
+
+        self.tick_ms: List[float] = []
+        self.loop_late_ms: List[float] = []
+
+        self.telemetry_ok = 0
+        self.telemetry_errors = 0
+        self.telemetry_latency: List[float] = []
+
+        self.memory: List[tuple] = []    # (t, rss_mb)
+
+
+# -------------------------
+# Server process
+# -------------------------
+
+def start_server(port: int, workdir: str, tick_sec: float, window_sec: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(
+        {
+            "PYTHONPATH": BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+            "EARNBREAK_FAKE_COLLECTORS": "1",
+            "EARNBREAK_TICK_SEC": str(tick_sec),
+            "EARNBREAK_TIME_WINDOW_SEC": str(window_sec),
+        }
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+    )
+
+
+async def http_request(reader, writer, method: str, path: str, body: bytes = b"") -> tuple:
+    """Minimal HTTP/1.1 keep-alive request; returns (status, body)."""
+    head = (
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode()
+    writer.write(head + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def http_get_json(port: int, path: str):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        _, body = await http_request(reader, writer, "GET", path)
+        return json.loads(body)
+    finally:
+        writer.close()
+
+
+async def wait_ready(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await http_get_json(port, "/health")
+            return
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not come up")
+
+
+# -------------------------
+# Load generators
+# -------------------------
+
+async def consumer(url: str, kind: str, stats: Stats, read_delay: float, label_delay: float):
+    labels = ["focused", "distracted", "break"]
+    try:
+        async with websockets.connect(url, max_queue=1 if read_delay else 32) as ws:
+
+            async def answer(msg):
+                await asyncio.sleep(label_delay)
+                try:
+                    await ws.send(json.dumps({"label": random.choice(labels), "request_id": msg.get("request_id")}))
+                except websockets.ConnectionClosed:
+                    return
+                stats.labels_sent += 1
+
+            async for raw in ws:
+                now = time.time()
+                msg = json.loads(raw)
+                if msg.get("type") == "live_state":
+                    stats.frames[kind] = stats.frames.get(kind, 0) + 1
+                    sent_at = datetime.fromisoformat(msg["data"]["ts"]).timestamp()
+                    stats.delivery.setdefault(kind, []).append(now - sent_at)
+                elif msg.get("type") == "label_request":
+                    stats.label_requests += 1
+                    if kind == "labeler":
+                        asyncio.create_task(answer(msg))
+                if read_delay:
+                    await asyncio.sleep(read_delay)
+    except (websockets.ConnectionClosed, OSError):
+        stats.disconnects += 1
+
+
+async def metrics_subscriber(url: str, stats: Stats):
+    try:
+        async with websockets.connect(url) as ws:
+            await ws.send(json.dumps({"type": "subscribe", "encoding": "json", "topics": {"metrics": 1}}))
+            state: dict = {}
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg.get("topic") != "metrics":
+                    continue
+                # deltas only carry changed fields
+                state = dict(msg["data"]) if msg["key"] else {**state, **msg["data"]}
+                stats.tick_ms.append(state.get("tick_ms", 0.0))
+                stats.loop_late_ms.append(state.get("loop_late_ms", 0.0))
+    except (websockets.ConnectionClosed, OSError):
+        stats.disconnects += 1
+
+
+async def browser_producer(port: int, rate: float, stats: Stats, seed: int):
+    rng = random.Random(seed)
+    domains = ["github.com", "stackoverflow.com", "youtube.com", "reddit.com"]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    scrolls = 0
+    period = 1.0 / rate
+    next_at = time.perf_counter()
+    try:
+        while True:
+            n = rng.randint(0, 8)
+            scrolls += n
+            now_ms = time.time() * 1000
+            body = json.dumps({
+                "domain": rng.choice(domains),
+                "title": "page",
+                "scroll_count": scrolls,
+                "key_count": 0,
+                "tab_id": seed,
+                "scroll_ts": sorted(now_ms - rng.random() * period * 1000 for _ in range(n)),
+                "key_ts": [],
+            }).encode()
+            t0 = time.perf_counter()
+            try:
+                status, _ = await http_request(reader, writer, "POST", "/telemetry/browser", body)
+            except (OSError, asyncio.IncompleteReadError):
+                stats.telemetry_errors += 1
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                continue
+            stats.telemetry_latency.append(time.perf_counter() - t0)
+            if status == 200:
+                stats.telemetry_ok += 1
+            else:
+                stats.telemetry_errors += 1
+
+            next_at += period
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    finally:
+        writer.close()
+
+
+async def sample_memory(pid: int, stats: Stats, t0: float, interval: float = 1.0):
+    proc = psutil.Process(pid)
+    while True:
+        stats.memory.append((round(time.monotonic() - t0, 1), proc.memory_info().rss / 1e6))
+        await asyncio.sleep(interval)
+
+
+# -------------------------
+# Run + report
+# -------------------------
+
+async def run(args) -> dict:
+    # the server's data/ (archive, logs, checkpoints) goes with it
+    with tempfile.TemporaryDirectory(prefix="earnbreak-load-") as workdir:
+        return await _run(args, workdir)
+
+
+async def _run(args, workdir: str) -> dict:
+    server = start_server(args.port, workdir, args.tick_sec, args.window_sec)
+    stats = Stats()
+    tasks: List[asyncio.Task] = []
+    try:
+        await wait_ready(args.port)
+        url = f"ws://127.0.0.1:{args.port}/ws"
+        t0 = time.monotonic()
+
+        tasks.append(asyncio.create_task(sample_memory(server.pid, stats, t0)))
+        tasks.append(asyncio.create_task(metrics_subscriber(url, stats)))
+        for i in range(args.clients):
+            if i < args.slow:
+                kind, delay = "slow", args.slow_delay
+            elif i < args.slow + args.labelers:
+                kind, delay = "labeler", 0.0
+            else:
+                kind, delay = "fast", 0.0
+            tasks.append(asyncio.create_task(consumer(url, kind, stats, delay, args.label_delay)))
+        for i in range(args.producers):
+            tasks.append(asyncio.create_task(browser_producer(args.port, args.rate, stats, seed=i)))
+
+        last = 0.0
+        while time.monotonic() - t0 < args.duration:
+            await asyncio.sleep(1.0)
+            elapsed = time.monotonic() - t0
+            if elapsed - last >= args.report_every:
+                last = elapsed
+                rss = stats.memory[-1][1] if stats.memory else 0.0
+                print(
+                    f"t={elapsed:5.0f}s frames={sum(stats.frames.values()):7d} "
+                    f"telemetry={stats.telemetry_ok:7d} tick p99={percentile(stats.tick_ms, 99):6.2f}ms "
+                    f"rss={rss:6.1f}MB"
+                )
+
+        server_ws = await http_get_json(args.port, "/metrics/ws")
+        elapsed = time.monotonic() - t0
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+    rss = [m for _, m in stats.memory]
+    return {
+        "config": vars(args),
+        "duration_sec": round(elapsed, 1),
+        "live_frames": {
+            kind: {"frames": n, "per_sec": round(n / elapsed, 1), "delivery": _summary(stats.delivery.get(kind, []))}
+            for kind, n in stats.frames.items()
+        },
+        "tick": {
+            "tick_ms_p50": percentile(stats.tick_ms, 50),
+            "tick_ms_p99": percentile(stats.tick_ms, 99),
+            "loop_late_ms_p50": percentile(stats.loop_late_ms, 50),
+            "loop_late_ms_p99": percentile(stats.loop_late_ms, 99),
+            "ticks_observed": len(stats.tick_ms),
+        },
+        "telemetry": {
+            "ok": stats.telemetry_ok,
+            "errors": stats.telemetry_errors,
+            "per_sec": round(stats.telemetry_ok / elapsed, 1),
+            "latency": _summary(stats.telemetry_latency),
+        },
+        "labels": {"requests_seen": stats.label_requests, "answered": stats.labels_sent},
+        "client_disconnects": stats.disconnects,
+        "memory_mb": {
+            "start": round(rss[0], 1) if rss else 0.0,
+            "max": round(max(rss), 1) if rss else 0.0,
+            "end": round(rss[-1], 1) if rss else 0.0,
+            "timeline": [(t, round(m, 1)) for t, m in stats.memory[:: max(1, args.report_every)]],
+        },
+        "server_ws": server_ws,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the backend locally with fake collectors.")
+    parser.add_argument("--port", type=int, default=8865)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--clients", type=int, default=10, help="WebSocket consumers in total")
+    parser.add_argument("--slow", type=int, default=2, help="of which slow readers")
+    parser.add_argument("--slow-delay", type=float, default=2.0, help="seconds a slow reader spends per frame")
+    parser.add_argument("--labelers", type=int, default=1, help="of which answer label requests")
+    parser.add_argument("--label-delay", type=float, default=3.0)
+    parser.add_argument("--producers", type=int, default=5, help="browser-extension producers")
+    parser.add_argument("--rate", type=float, default=2.0, help="telemetry posts per second per producer")
+    parser.add_argument("--tick-sec", type=float, default=1.0)
+    parser.add_argument("--window-sec", type=int, default=10, help="time window length (short to exercise labels)")
+    parser.add_argument("--report-every", type=int, default=5)
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
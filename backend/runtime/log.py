@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+# --------------------------------------------------
+# Structured, rate-limited logging off the event loop
+# --------------------------------------------------
+#
+# Every message is an event with a dotted kind ("ws.disconnect") and
+# fields. Callers never touch stdout: loguru sinks are added with
+# enqueue=True, so the calling thread only puts the record on a queue and
+# a background thread formats and writes it to
+#
+#   stderr                  human-readable, one line per event
+#   data/logs/events.jsonl  one JSON object per event (rotated)
+#
+# Before anything is queued an event may be dropped by
+#   RATE_LIMITS   token bucket per kind (the next one that passes carries
+#                 suppressed=<n>)
+#   SAMPLE_EVERY  keep one in N of that kind
+#
+# Per-tick debug traces go through `traces`: callers check traces.enabled
+# before building any fields, so while they're off a tick pays one
+# attribute read. Level and traces can be switched at runtime (main.py
+# POST /admin/log).
+
+LOG_DIR = "data/logs"
+
+# kind -> (events per second, burst)
+RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "ws.connect": (2.0, 20),
+    "ws.disconnect": (2.0, 20),
+    "pipeline.error": (0.2, 3),
+    "taxonomy.reload_failed": (0.1, 1),
+    "ingest.rejected": (1.0, 10),
+    "ingest.stream_failed": (1.0, 10),
+    "time_window_logger.write_failed": (0.2, 3),
+    "time_window_logger.dropped": (0.2, 3),
+}
+
+# kind -> keep 1 in N
+SAMPLE_EVERY: Dict[str, int] = {
+    "tick": 1,
+}
+
+_CONSOLE_FORMAT = (
+    "<green>{time:HH:mm:ss.SSS}</green> <level>{level: <7}</level> "
+    "<cyan>{extra[kind]}</cyan> {message}"
+)
+
+
+class _Limiter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, list] = {}     # kind -> [tokens, last refill]
+        self._seen: Dict[str, int] = {}
+        self.suppressed: Dict[str, int] = {}
+        self.dropped = 0
+
+    def admit(self, kind: str) -> Optional[int]:
+        """None to drop, else the number suppressed since the last admit."""
+        with self._lock:
+            every = SAMPLE_EVERY.get(kind, 1)
+            if every > 1:
+                n = self._seen.get(kind, 0)
+                self._seen[kind] = n + 1
+                if n % every:
+                    self.dropped += 1
+                    return None
+
+            limit = RATE_LIMITS.get(kind)
+            if limit is None:
+                return 0
+            rate, burst = limit
+            now = time.monotonic()
+            bucket = self._buckets.get(kind)
+            if bucket is None:
+                bucket = self._buckets[kind] = [burst, now]
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                self.suppressed[kind] = self.suppressed.get(kind, 0) + 1
+                self.dropped += 1
+                return None
+            bucket[0] -= 1.0
+            return self.suppressed.pop(kind, 0)
+
+
+class _Traces:
+    """Switchable per-tick debug traces (kind "tick", level TRACE)."""
+
+    def __init__(self):
+        self.enabled = False
+
+    def tick(self, **fields):
+        event("tick", "tick", level="TRACE", **fields)
+
+
+_limiter = _Limiter()
+_level = {"no": logger.level("INFO").no, "name": "INFO"}
+traces = _Traces()
+
+
+def _filter(record) -> bool:
+    if record["level"].no >= _level["no"]:
+        return True
+    return traces.enabled and record["extra"].get("kind") == "tick"
+
+
+def setup(level: str = "INFO", log_dir: Optional[str] = LOG_DIR, console: bool = True):
+    """Replace loguru's default sink with queued console / JSON-lines sinks."""
+    set_level(level)
+    logger.remove()
+    logger.configure(extra={"kind": "-"})
+    if console:
+        logger.add(sys.stderr, level="TRACE", format=_CONSOLE_FORMAT, filter=_filter, enqueue=True)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        logger.add(
+            os.path.join(log_dir, "events.jsonl"),
+            level="TRACE",
+            filter=_filter,
+            serialize=True,
+            enqueue=True,
+            rotation="10 MB",
+            retention=5,
+        )
+
+
+def shutdown():
+    """Drain the queues and close the sinks."""
+    logger.remove()
+
+
+def set_level(level: str):
+    _level["no"] = logger.level(level.upper()).no
+    _level["name"] = level.upper()
+
+
+def set_traces(enabled: bool, every: Optional[int] = None):
+    traces.enabled = enabled
+    if every is not None:
+        SAMPLE_EVERY["tick"] = max(1, every)
+
+
+def event(kind: str, message: str = "", level: str = "INFO", exc: bool = False, **fields):
+    suppressed = _limiter.admit(kind)
+    if suppressed is None:
+        return
+    if suppressed:
+        fields["suppressed"] = suppressed
+    if fields:
+        message = f"{message} {fields}" if message else str(fields)
+    logger.bind(kind=kind, **fields).opt(exception=exc, depth=1).log(level, message or kind)
+
+
+def stats() -> dict:
+    return {
+        "level": _level["name"],
+        "traces": traces.enabled,
+        "dropped": _limiter.dropped,
+        "suppressed": dict(_limiter.suppressed),
+        "rate_limits": {k: list(v) for k, v in RATE_LIMITS.items()},
+        "sample_every": dict(SAMPLE_EVERY),
+    }
@@ -0,0 +1,237 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+# --------------------------------------------------
+# On-demand profiling of a running backend
+# --------------------------------------------------
+#
+# Served by the /admin endpoints in main.py, so a sluggish install can be
+# profiled in the field without restarting it.
+#
+#   SamplingProfiler   a background thread snapshots the stacks of the named
+#                      threads (tick loop, camera) every few ms; output is
+#                      collapsed stacks ("a;b;c <count>") for flamegraph.pl /
+#                      speedscope. Low overhead, sees C calls as their caller.
+#   CProfileSession    deterministic cProfile of the tick loop: run() wraps
+#                      each tick. Only one cProfile.Profile is ever enabled
+#                      (from Python 3.12 cProfile sits on sys.monitoring and
+#                      a second enable() raises), so other threads (camera)
+#                      are profiled by sampling. If enabling fails anyway
+#                      (another profiler / debugger is active) the session
+#                      ends with `error` set and ticks run unprofiled.
+#                      Output is a pstats file (or its text report).
+#   MemoryTracker      tracemalloc snapshots by id and the diff between two
+#                      of them, to find what keeps growing.
+
+
+# -------------------------
+# Sampling
+# -------------------------
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, threads: Dict[str, int], interval: float = 0.005):
+        self.threads = threads          # name -> thread ident
+        self.interval = max(0.001, interval)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        wanted = {ident: name for name, ident in self.threads.items()}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, name in wanted.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+# -------------------------
+# cProfile
+# -------------------------
+
+class CProfileSession:
+    """
+    One profile per session, enabled only around run() calls on the thread
+    that makes them. stop() waits for a run() in progress before reading it.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.error: Optional[str] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._running = 0
+        self._cond = threading.Condition()
+
+    def start(self):
+        with self._cond:
+            self._profile = cProfile.Profile()
+            self.error = None
+            self.active = True
+
+    def run(self, fn: Callable, *args):
+        """Call fn, profiled while a session is active."""
+        if not self.active:
+            return fn(*args)
+        with self._cond:
+            prof = self._profile if self.active else None
+            if prof is not None:
+                self._running += 1
+        if prof is None:
+            return fn(*args)
+        try:
+            try:
+                prof.enable()
+            except ValueError as e:     # another profiling tool is active
+                with self._cond:
+                    self.error = str(e)
+                    self.active = False
+                return fn(*args)
+            try:
+                return fn(*args)
+            finally:
+                prof.disable()
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    def stop(self, timeout: float = 2.0) -> Optional[pstats.Stats]:
+        with self._cond:
+            self.active = False
+            idle = self._cond.wait_for(lambda: self._running == 0, timeout)
+            prof, self._profile = self._profile, None
+        if not idle or prof is None:
+            return None     # still enabled by a run(): unsafe to read
+        prof.create_stats()
+        if not prof.stats:
+            return None
+        return pstats.Stats(prof)
+
+    @staticmethod
+    def dump(stats: pstats.Stats) -> bytes:
+        """The pstats file format (what Stats.dump_stats writes)."""
+        return marshal.dumps(stats.stats)
+
+    @staticmethod
+    def report(stats: pstats.Stats, sort: str = "cumulative", limit: int = 60) -> str:
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+# -------------------------
+# tracemalloc
+# -------------------------
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryTracker:
+    def __init__(self, max_snapshots: int = 8):
+        self.max_snapshots = max_snapshots
+        self.snapshots: Dict[int, tuple] = {}   # id -> (wall ts, snapshot)
+        self._next_id = 0
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def snapshot(self) -> dict:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snap = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        self._next_id += 1
+        self.snapshots[self._next_id] = (time.time(), snap)
+        while len(self.snapshots) > self.max_snapshots:
+            del self.snapshots[next(iter(self.snapshots))]
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "id": self._next_id,
+            "ts": self.snapshots[self._next_id][0],
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def _get(self, snapshot_id: int):
+        entry = self.snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(f"no snapshot {snapshot_id} (have {list(self.snapshots)})")
+        return entry
+
+    def diff(self, base: int, current: int, group_by: str = "lineno", limit: int = 30) -> dict:
+        """Top allocation growth from snapshot `base` to `current`."""
+        base_ts, base_snap = self._get(base)
+        cur_ts, cur_snap = self._get(current)
+        stats = cur_snap.compare_to(base_snap, group_by)
+
+        top: List[dict] = []
+        for s in stats[:limit]:
+            entry = {
+                "where": str(s.traceback[-1]),   # allocation site (newest frame)
+                "size_diff_kb": round(s.size_diff / 1024, 1),
+                "size_kb": round(s.size / 1024, 1),
+                "count_diff": s.count_diff,
+                "count": s.count,
+            }
+            if group_by == "traceback":
+                entry["traceback"] = s.traceback.format()
+            top.append(entry)
+
+        return {
+            "base": base,
+            "current": current,
+            "seconds": round(cur_ts - base_ts, 1),
+            "total_diff_kb": round(sum(s.size_diff for s in stats) / 1024, 1),
+            "top": top,
+        }
@@ -0,0 +1,91 @@
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Optional, Tuple
+
+# --------------------------------------------------
+# Pipeline state checkpoint
+# --------------------------------------------------
+#
+# File: MAGIC(8) | u32 version | f64 saved_at | zlib(pickle(state dict))
+#
+# The state dict only holds plain Python values (numbers, strings, lists,
+# dicts) produced by each component's get_state(), so a checkpoint survives
+# code changes that don't rename fields.
+
+MAGIC = b"EBSTATE1"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sId")
+
+
+class StateCheckpointer:
+    """
+    Writes the pipeline state every `interval` seconds, atomically
+    (tmp file + rename) and off the hot path: the tick loop only builds
+    the state dict, a background thread pickles, compresses and writes it.
+    """
+
+    def __init__(self, path: str = "data/pipeline_state.bin", interval: float = 15.0):
+        self.path = path
+        self.interval = interval
+
+        self._last_save = time.monotonic()
+        self._writer: Optional[threading.Thread] = None
+
+    def maybe_save(self, collect: Callable[[], dict]):
+        if time.monotonic() - self._last_save < self.interval:
+            return
+        if self._writer and self._writer.is_alive():
+            return  # previous write still in flight
+        self.save(collect())
+
+    def save(self, state: dict, wait: bool = False):
+        self._last_save = time.monotonic()
+        saved_at = time.time()
+
+        if self._writer and self._writer.is_alive():
+            self._writer.join()
+
+        self._writer = threading.Thread(target=self._write, args=(state, saved_at), daemon=True)
+        self._writer.start()
+        if wait:
+            self._writer.join()
+
+    def _write(self, state: dict, saved_at: float):
+        payload = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, saved_at))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def load(self) -> Optional[Tuple[dict, float]]:
+        """(state, gap_seconds) or None if there is no usable checkpoint."""
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        if len(raw) < _HEADER.size:
+            return None
+
+        magic, version, saved_at = _HEADER.unpack_from(raw)
+        if magic != MAGIC or version != VERSION:
+            return None
+        try:
+            state = pickle.loads(zlib.decompress(raw[_HEADER.size:]))
+        except Exception:
+            return None
+
+        return state, max(0.0, time.time() - saved_at)
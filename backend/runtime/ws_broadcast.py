@@ -0,0 +1,179 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Union
+
+# --------------------------------------------------
+# Per-client outbound queues for the WebSocket stream
+# --------------------------------------------------
+#
+# The tick loop publishes already-encoded frames and never waits on a
+# client. Each client has its own sender task draining a bounded queue:
+#
+#   coalesced frames  (live_state, topic streams): one slot per kind, a
+#                     newer frame replaces an unsent one (counted as
+#                     dropped); delta frames pass a `resync` callable whose
+#                     keyframe is queued instead, so no delta is lost
+#   reliable frames   (label_request): FIFO, never dropped. A client that
+#                     lets max_reliable of them pile up is disconnected
+#                     instead; pending label requests are resent on
+#                     reconnect by the caller.
+#
+# Frames go out oldest first across both kinds. A frame is a str (text
+# message) or bytes (binary message).
+
+
+class ClientQueue:
+    def __init__(self, ws, client_id: int, max_reliable: int = 64):
+        self.ws = ws
+        self.client_id = client_id
+        self.max_reliable = max_reliable
+
+        self._reliable: deque = deque()            # (enqueued_at, frame)
+        self._latest: Dict[str, tuple] = {}        # kind -> (enqueued_at, frame)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.evicted = False
+        # subscribed to topic streams (runtime.live_stream), not legacy frames
+        self.subscribed = False
+
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.max_lag_sec = 0.0
+        self.last_lag_sec = 0.0
+
+    # -------------------------
+    # Producer side (never blocks)
+    # -------------------------
+
+    def put(
+        self,
+        kind: str,
+        frame: Union[str, bytes],
+        coalesce: bool,
+        resync: Optional[Callable[[], Union[str, bytes]]] = None,
+    ) -> bool:
+        """False if the client has fallen too far behind and must go."""
+        if self.closed:
+            return False
+        now = time.monotonic()
+        if coalesce:
+            prev = self._latest.get(kind)
+            if prev is not None:
+                # replace the frame, keep the slot's place (and age) in line
+                self.dropped += 1
+                now = prev[0]
+                if resync is not None:
+                    frame = resync()
+            self._latest[kind] = (now, frame)
+        else:
+            if len(self._reliable) >= self.max_reliable:
+                self.evicted = True
+                return False
+            self._reliable.append((now, frame))
+        self._wakeup.set()
+        return True
+
+    def depth(self) -> int:
+        return len(self._reliable) + len(self._latest)
+
+    def lag_sec(self) -> float:
+        """Age of the oldest unsent frame."""
+        oldest = [t for t, _ in self._latest.values()]
+        if self._reliable:
+            oldest.append(self._reliable[0][0])
+        return time.monotonic() - min(oldest) if oldest else 0.0
+
+    # -------------------------
+    # Consumer side (sender task)
+    # -------------------------
+
+    def _next(self) -> Optional[tuple]:
+        kind = min(self._latest, key=lambda k: self._latest[k][0], default=None)
+        if self._reliable and (kind is None or self._reliable[0][0] <= self._latest[kind][0]):
+            return self._reliable.popleft()
+        if kind is not None:
+            return self._latest.pop(kind)
+        return None
+
+    async def run(self):
+        try:
+            while not self.closed:
+                item = self._next()
+                if item is None:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                enqueued_at, frame = item
+                try:
+                    if isinstance(frame, bytes):
+                        await self.ws.send_bytes(frame)
+                    else:
+                        await self.ws.send_text(frame)
+                except Exception:
+                    break  # connection gone; the receive side cleans up
+                self.sent += 1
+                self.last_lag_sec = time.monotonic() - enqueued_at
+                self.max_lag_sec = max(self.max_lag_sec, self.last_lag_sec)
+        finally:
+            self.closed = True
+
+    async def _evict(self):
+        try:
+            await self.ws.close(code=1013)  # "try again later"
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "client_id": self.client_id,
+            "connected_sec": round(time.time() - self.connected_at, 1),
+            "queued": self.depth(),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "lag_sec": round(self.lag_sec(), 3),
+            "last_lag_sec": round(self.last_lag_sec, 3),
+            "max_lag_sec": round(self.max_lag_sec, 3),
+        }
+
+
+class Broadcaster:
+    """Fan-out of encoded frames to every connected client's queue."""
+
+    def __init__(self, max_reliable: int = 64):
+        self.max_reliable = max_reliable
+        self.clients: Dict[int, ClientQueue] = {}
+        self._next_id = 0
+        self.evicted = 0
+
+    def connect(self, ws) -> ClientQueue:
+        """Register a client and start its sender task (call on the event loop)."""
+        self._next_id += 1
+        client = ClientQueue(ws, self._next_id, self.max_reliable)
+        self.clients[client.client_id] = client
+        client._task = asyncio.create_task(client.run())
+        return client
+
+    def disconnect(self, client: ClientQueue):
+        client.closed = True
+        if client._task:
+            client._task.cancel()  # may be stuck in a send to a dead peer
+        if client.evicted:
+            asyncio.create_task(client._evict())
+        self.clients.pop(client.client_id, None)
+
+    def publish(self, kind: str, frame: Union[str, bytes], coalesce: bool = True, legacy_only: bool = False):
+        for client in list(self.clients.values()):
+            if legacy_only and client.subscribed:
+                continue
+            if not client.put(kind, frame, coalesce):
+                self.evicted += 1
+                self.disconnect(client)
+
+    def stats(self) -> dict:
+        return {
+            "clients": [c.stats() for c in self.clients.values()],
+            "evicted": self.evicted,
+        }
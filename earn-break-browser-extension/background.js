@@ -14,6 +14,13 @@ function getDomain(url) {
   try { return new URL(url).hostname; } catch { return ""; }
 }
 
+// tab activity since the last POST
+let tabSwitches = 0;
+let closedTabs = [];
+
+chrome.tabs.onActivated.addListener(() => { tabSwitches++; });
+chrome.tabs.onRemoved.addListener((tabId) => { closedTabs.push(tabId); });
+
 async function tick() {
   const [tab] = await chrome.tabs.query({ active: true, lastFocusedWindow: true });
   if (!tab?.id) return;
@@ -28,11 +35,24 @@ async function tick() {
     // content script not available (chrome pages, pdf viewer, etc.)
   }
 
+  const audible = await chrome.tabs.query({ audible: true });
+
+  const switches = tabSwitches;
+  const closed = closedTabs;
+  tabSwitches = 0;
+  closedTabs = [];
+
   await postTelemetry({
     domain,
     title: counts?.title || tab.title || "",
     scroll_count: counts?.scrollCount || 0,
     key_count: counts?.keyCount || 0,
+    tab_id: tab.id,
+    scroll_ts: counts?.scrollTimes || [],
+    key_ts: counts?.keyTimes || [],
+    tab_switches: switches,
+    closed_tabs: closed,
+    audible_tabs: audible.map((t) => t.id).filter((id) => id !== undefined),
   });
 }
 
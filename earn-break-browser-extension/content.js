@@ -1,11 +1,24 @@
 let scrollCount = 0;
 let keyCount = 0;
 
-window.addEventListener("scroll", () => { scrollCount++; }, { passive: true });
-window.addEventListener("keydown", () => { keyCount++; });
+// Event times (epoch ms) since the last EARN_BREAK_GET_COUNTS; the backend
+// keeps the per-tab history. Capped so a tab nobody polls can't grow them.
+const MAX_PENDING = 512;
+let scrollTimes = [];
+let keyTimes = [];
+
+function record(times) {
+  times.push(Date.now());
+  if (times.length > MAX_PENDING) times.shift();
+}
+
+window.addEventListener("scroll", () => { scrollCount++; record(scrollTimes); }, { passive: true });
+window.addEventListener("keydown", () => { keyCount++; record(keyTimes); });
 
 chrome.runtime.onMessage.addListener((msg, sender, sendResponse) => {
   if (msg?.type === "EARN_BREAK_GET_COUNTS") {
-    sendResponse({ scrollCount, keyCount, title: document.title });
+    sendResponse({ scrollCount, keyCount, title: document.title, scrollTimes, keyTimes });
+    scrollTimes = [];
+    keyTimes = [];
   }
 });
@@ -1,5 +1,5 @@
 <script lang="ts">
-import { ref, onMounted } from "vue";
+import { ref, computed, onMounted } from "vue";
 
 export type LiveState = {
   ts: string;
@@ -19,9 +19,25 @@ export type LiveState = {
 
 type LabelRequestMsg = {
   type: "label_request";
+  request_id: number;
   features: Record<string, number>;
 };
 
+// the backend keeps at most this many unanswered requests (oldest first)
+export const MAX_PENDING_LABELS = 32;
+
+// Unanswered label requests, oldest first, one per request_id: the backend
+// replays its whole queue on connect, and each answer / label_resolved
+// removes just that request.
+export function addLabelRequest<T extends { request_id: number }>(queue: T[], msg: T): T[] {
+  if (queue.some((r) => r.request_id === msg.request_id)) return queue;
+  return [...queue, msg].slice(-MAX_PENDING_LABELS);
+}
+
+export function removeLabelRequest<T extends { request_id: number }>(queue: T[], requestId: number): T[] {
+  return queue.filter((r) => r.request_id !== requestId);
+}
+
 type LiveStateMsg = {
   type: "live_state";
   data: LiveState;
@@ -30,21 +46,24 @@ type LiveStateMsg = {
 export default {
   setup() {
     const liveState = ref<LiveState | null>(null);
-    const pendingLabel = ref<LabelRequestMsg | null>(null);
+    const labelQueue = ref<LabelRequestMsg[]>([]);
+    const pendingLabel = computed(() => labelQueue.value[0] ?? null);
     const ws = ref<WebSocket | null>(null);
 
     const timeWindowSec = 30; // keep in sync with backend
 
     function submitLabel(label: string) {
-      if (!ws.value) return;
+      const request = pendingLabel.value;
+      if (!ws.value || !request) return;
 
       ws.value.send(
         JSON.stringify({
           label,
+          request_id: request.request_id,
         })
       );
 
-      pendingLabel.value = null;
+      labelQueue.value = removeLabelRequest(labelQueue.value, request.request_id);
     }
 
     onMounted(() => {
@@ -59,7 +78,12 @@ export default {
           }
 
           if (msg.type === "label_request") {
-            pendingLabel.value = msg;
+            labelQueue.value = addLabelRequest(labelQueue.value, msg);
+          }
+
+          // answered from another window, or expired on the backend
+          if (msg.type === "label_resolved") {
+            labelQueue.value = removeLabelRequest(labelQueue.value, msg.request_id);
           }
         } catch (e) {
           console.error("Bad WS message", e);
@@ -72,6 +96,7 @@ export default {
 
     return {
       liveState,
+      labelQueue,
       pendingLabel,
       submitLabel,
       timeWindowSec,